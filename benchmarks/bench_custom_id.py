@@ -0,0 +1,91 @@
+"""
+bench_custom_id.py
+
+Compares parsing role button custom_ids with the legacy named-group template against the compact codec.
+
+Every button click is matched against DynamicButton's template by discord.py and then parsed by from_custom_id,
+so this is the per-click cost of working out what a button does.
+
+Run from the repository root:
+    python -m benchmarks.bench_custom_id
+
+Depends on: CustomId
+"""
+# import libraries
+import re
+import timeit
+
+# import local modules
+from ptn.buttonrolebot.modules.CustomId import CUSTOM_ID_TEMPLATE, encode_custom_id, decode_custom_id
+
+
+ROLE_ID = 800813079164665876
+MESSAGE_ID = 1204150217428611122
+ACTION = 'toggle'
+
+LEGACY_TEMPLATE = re.compile(r'button:role:(?P<role_id>[0-9]+):message:(?P<message_id>[0-9]+):action:(?P<action>[a-z]+)')
+CURRENT_TEMPLATE = re.compile(CUSTOM_ID_TEMPLATE)
+
+LEGACY_CUSTOM_ID = f'button:role:{ROLE_ID}:message:{MESSAGE_ID}:action:{ACTION}'
+CURRENT_CUSTOM_ID = encode_custom_id(ACTION, ROLE_ID, MESSAGE_ID)
+
+
+def parse_legacy_regex(custom_id: str = LEGACY_CUSTOM_ID):
+    # what DynamicButton did before the codec: fullmatch, then pull out the groups
+    match = LEGACY_TEMPLATE.fullmatch(custom_id)
+    return str(match['action']), int(match['role_id']), int(match['message_id'])
+
+
+def parse_current(custom_id: str = CURRENT_CUSTOM_ID):
+    CURRENT_TEMPLATE.fullmatch(custom_id)
+    decoded = decode_custom_id(custom_id)
+    return decoded.action, decoded.role_id, decoded.message_id
+
+
+def parse_legacy_codec(custom_id: str = LEGACY_CUSTOM_ID):
+    CURRENT_TEMPLATE.fullmatch(custom_id)
+    decoded = decode_custom_id(custom_id)
+    return decoded.action, decoded.role_id, decoded.message_id
+
+
+def parse_current_uncached(custom_id: str = CURRENT_CUSTOM_ID):
+    # first click on a button since startup, before decode_custom_id has cached it
+    CURRENT_TEMPLATE.fullmatch(custom_id)
+    decoded = decode_custom_id.__wrapped__(custom_id)
+    return decoded.action, decoded.role_id, decoded.message_id
+
+
+def encode_current():
+    return encode_custom_id(ACTION, ROLE_ID, MESSAGE_ID)
+
+
+def encode_current_uncached():
+    return encode_custom_id.__wrapped__(ACTION, ROLE_ID, MESSAGE_ID)
+
+
+CASES = {
+    'legacy id, named-group regex': parse_legacy_regex,
+    'legacy id, codec': parse_legacy_codec,
+    'current id, codec': parse_current,
+    'current id, codec (uncached)': parse_current_uncached,
+    'current id, encode': encode_current,
+    'current id, encode (uncached)': encode_current_uncached
+}
+
+
+def main(number: int = 200000, repeat: int = 5):
+    # sanity check before timing anything: every parser must agree
+    expected = (ACTION, ROLE_ID, MESSAGE_ID)
+    assert parse_legacy_regex() == parse_legacy_codec() == parse_current() == parse_current_uncached() == expected
+
+    print(f"legacy custom_id:  {LEGACY_CUSTOM_ID} ({len(LEGACY_CUSTOM_ID)} chars)")
+    print(f"current custom_id: {CURRENT_CUSTOM_ID} ({len(CURRENT_CUSTOM_ID)} chars)")
+    print()
+
+    for name, function in CASES.items():
+        best = min(timeit.repeat(function, number=number, repeat=repeat)) / number
+        print(f"{name:<30} {best * 1e9:>8.0f} ns/call")
+
+
+if __name__ == '__main__':
+    main()
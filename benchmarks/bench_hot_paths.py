@@ -0,0 +1,278 @@
+"""
+bench_hot_paths.py
+
+Times the pure functions that run on every click or editor interaction, and measures what each call allocates, so
+their cost can be compared between versions.
+
+For each case we report:
+    ns_per_call: the best of several timed runs, divided by the calls in a run
+    peak_bytes_per_call: the most memory a single call had allocated at once, from tracemalloc
+    net_blocks_per_call: memory blocks still allocated after a call, which should be 0 for anything that doesn't
+        cache or leak
+Timing runs with tracemalloc off, as it slows every allocation down.
+
+The JSON output (--json) has sorted keys and a fixed layout, with the Python and discord.py versions alongside the
+results, so two runs can be compared with a plain diff or a small script.
+
+Run from the repository root:
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --json results.json --filter embed
+
+Depends on: bot, EmbedData, RoleButtonData, CustomId, Embeds, Helpers, ButtonConfig
+"""
+# import libraries
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+# the bot's imported along with the helpers; keep anything it writes out of the real data directory
+os.environ.setdefault('PTN_BRB_DATA_DIR', tempfile.mkdtemp(prefix='brb-bench-'))
+
+# import discord
+import discord
+
+# import bot
+from ptn.buttonrolebot.bot import DynamicButton
+
+# import local classes
+from ptn.buttonrolebot.classes.EmbedData import EmbedData
+from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
+
+# import local modules
+from ptn.buttonrolebot.modules.CustomId import encode_custom_id
+from ptn.buttonrolebot.modules.Embeds import _color_hex_to_int, _generate_embed_from_dict
+from ptn.buttonrolebot.modules.Helpers import _format_embed_dict, _get_embed_from_message, is_valid_extension
+from ptn.buttonrolebot.ui_elements.ButtonConfig import _find_lowest_available_row, _order_buttons_by_row
+
+
+SCHEMA_VERSION = 1 # bump if the JSON layout changes
+
+ROLE_IDS = (800813079164665876, 800813079164665877)
+MESSAGE_ID = 1204150217428611122
+
+IMAGE_URL = 'https://pilotstradenetwork.com/wp-content/uploads/2023/01/ptn-banner.png'
+NOT_AN_IMAGE_URL = 'https://pilotstradenetwork.com/fleet-carriers/'
+
+
+def run_coroutine(coroutine):
+    # runs a coroutine that never actually waits, without the cost of an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Benchmarked coroutine tried to wait on something")
+
+
+# fixtures, built once
+
+def make_embed() -> discord.Embed:
+    # a role message embed with everything the editor lets you set
+    embed = discord.Embed(
+        title='🚀 Pick your roles',
+        description='Click a button below to give yourself a role, and click it again to take it away.\n\n'
+                    '> 🟢 **Trader**: get pinged for new trade routes\n> 🔵 **Explorer**: get pinged for expeditions',
+        color=0x00a8e8
+    )
+    embed.set_footer(text='Pilots Trade Network')
+    embed.set_image(url=IMAGE_URL)
+    embed.set_thumbnail(url=IMAGE_URL)
+    embed.set_author(name='PTN Council', icon_url=IMAGE_URL)
+    embed.add_field(name='Need help?', value='Ask in #help', inline=False)
+    return embed
+
+
+EMBED = make_embed()
+MESSAGE = SimpleNamespace(embeds=[EMBED]) # _get_embed_from_message only looks at a message's embeds
+EMBED_JSON = _format_embed_dict(EMBED)
+
+EMBED_FIELDS = {
+    'embed_title': EMBED.title,
+    'embed_description': EMBED.description,
+    'embed_image_url': EMBED.image.url,
+    'embed_footer': EMBED.footer.text,
+    'embed_thumbnail_url': EMBED.thumbnail.url,
+    'embed_author_name': EMBED.author.name,
+    'embed_author_avatar_url': EMBED.author.icon_url,
+    'embed_color': '#00a8e8',
+    'embed_json': EMBED_JSON
+}
+
+BUTTON_FIELDS = {
+    'role_id': ROLE_IDS[0],
+    'role_ids': list(ROLE_IDS),
+    'button_label': 'Trader',
+    'button_emoji': '🟢',
+    'button_row': 1,
+    'unique_id': 'c5b1a3f0-6f1e-4c1b-9d0e-2f3a4b5c6d7e',
+    'button_style': discord.ButtonStyle.success,
+    'button_action': 'toggle'
+}
+BUTTON_DATA = RoleButtonData(BUTTON_FIELDS)
+EMBED_DATA = EmbedData(EMBED_FIELDS)
+
+# a full editor: 20 buttons over four rows, as they are after one's been moved down a row
+BUTTONS = [RoleButtonData({**BUTTON_FIELDS, 'unique_id': str(index), 'button_row': (index * 7) % 4}) for index in range(20)]
+# rows 0-2 full, one button in the bottom row
+BUSY_ROWS = [RoleButtonData({**BUTTON_FIELDS, 'unique_id': str(index), 'button_row': min(index // 5, 3)}) for index in range(16)]
+
+CUSTOM_ID = encode_custom_id('toggle', ROLE_IDS, MESSAGE_ID, group='1', required=(ROLE_IDS[1],))
+LEGACY_CUSTOM_ID = f'button:role:{ROLE_IDS[0]}:message:{MESSAGE_ID}:action:toggle'
+BUTTON_ITEM = discord.ui.Button(custom_id=CUSTOM_ID)
+LEGACY_BUTTON_ITEM = discord.ui.Button(custom_id=LEGACY_CUSTOM_ID)
+TEMPLATE = DynamicButton.__discord_ui_compiled_template__
+
+
+# cases
+
+def parse_custom_id(item: discord.ui.Button = BUTTON_ITEM):
+    # what discord.py does with a click on one of our buttons before calling back
+    match = TEMPLATE.fullmatch(item.custom_id)
+    return run_coroutine(DynamicButton.from_custom_id(None, item, match))
+
+
+def parse_legacy_custom_id():
+    return parse_custom_id(LEGACY_BUTTON_ITEM)
+
+
+def generate_embed_from_dict():
+    # the editor regenerates the embed from a fresh copy of its JSON every time a field changes
+    return run_coroutine(_generate_embed_from_dict(EmbedData(EMBED_FIELDS)))
+
+
+def generate_embed_from_json():
+    return run_coroutine(_generate_embed_from_dict(EmbedData(EMBED_FIELDS), from_json=True))
+
+
+CASES: Dict[str, Callable] = {
+    'custom_id: DynamicButton.from_custom_id': parse_custom_id,
+    'custom_id: DynamicButton.from_custom_id (legacy)': parse_legacy_custom_id,
+    'embeds: _generate_embed_from_dict': generate_embed_from_dict,
+    'embeds: _generate_embed_from_dict (from_json)': generate_embed_from_json,
+    'embeds: _format_embed_dict': lambda: _format_embed_dict(EMBED),
+    'embeds: _color_hex_to_int (hex)': lambda: run_coroutine(_color_hex_to_int('#00a8e8')),
+    'embeds: _color_hex_to_int (int)': lambda: run_coroutine(_color_hex_to_int(0x00a8e8)),
+    'embeds: _get_embed_from_message': lambda: _get_embed_from_message(MESSAGE),
+    'buttons: _find_lowest_available_row': lambda: _find_lowest_available_row(BUSY_ROWS),
+    'buttons: _reposition_button regrouping': lambda: _order_buttons_by_row(BUTTONS),
+    'urls: is_valid_extension (image)': lambda: is_valid_extension(IMAGE_URL),
+    'urls: is_valid_extension (not an image)': lambda: is_valid_extension(NOT_AN_IMAGE_URL),
+    'classes: RoleButtonData()': lambda: RoleButtonData(BUTTON_FIELDS),
+    'classes: RoleButtonData.to_dictionary': BUTTON_DATA.to_dictionary,
+    'classes: EmbedData()': lambda: EmbedData(EMBED_FIELDS),
+    'classes: EmbedData.to_dictionary': EMBED_DATA.to_dictionary
+}
+
+
+# measuring
+
+def time_per_call(function: Callable, repeat: int, target: float) -> (float, int):
+    """
+    :returns: The best time per call, in seconds, and how many calls each timed run made.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    # autorange settles on at least 0.2s a run; scale that to the target
+    number = max(1, int(number * target / elapsed))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return best, number
+
+
+def _net_blocks(function: Callable, calls: int) -> int:
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(calls):
+        function()
+    gc.collect()
+    return sys.getallocatedblocks() - blocks_before
+
+
+def allocations_per_call(function: Callable, calls: int = 200) -> (int, float):
+    """
+    :returns: The highest peak allocation over a number of single calls, in bytes, and the blocks left allocated per
+        call once they've all run.
+    """
+    function() # warm any caches first, so they don't count against every call
+    # less what the measuring itself leaves behind
+    net_blocks = (_net_blocks(function, calls) - _net_blocks(lambda: None, calls)) / calls
+
+    tracemalloc.start()
+    try:
+        peak = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            function()
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak, net_blocks
+
+
+def run(filter_text: str = '', repeat: int = 5, target: float = 0.2) -> dict:
+    results = {}
+    for name, function in CASES.items():
+        if filter_text.lower() not in name.lower():
+            continue
+        seconds, number = time_per_call(function, repeat, target)
+        peak, net_blocks = allocations_per_call(function)
+        results[name] = {
+            'ns_per_call': round(seconds * 1e9, 1),
+            'calls_per_run': number,
+            'runs': repeat,
+            'peak_bytes_per_call': peak,
+            'net_blocks_per_call': round(net_blocks, 2)
+        }
+    return {
+        'schema': SCHEMA_VERSION,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'discord.py': discord.__version__,
+        'machine': platform.machine(),
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the bot's hot pure functions and measures their allocations.")
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON to PATH, or - for stdout")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case; the best is reported")
+    parser.add_argument('--target', type=float, default=0.2, help="roughly how many seconds each timed run takes")
+    args = parser.parse_args()
+
+    # sanity check before timing anything: the fixtures must go through the code we think they do
+    assert parse_custom_id().role_ids == ROLE_IDS and parse_legacy_custom_id().role_ids == ROLE_IDS[:1]
+    embed = generate_embed_from_dict()
+    assert (embed.title, embed.description, embed.color, embed.fields) == (EMBED.title, EMBED.description, EMBED.color, EMBED.fields)
+    assert is_valid_extension(IMAGE_URL) and not is_valid_extension(NOT_AN_IMAGE_URL)
+    assert _find_lowest_available_row(BUSY_ROWS) == 3
+    assert [button.button_row for button in _order_buttons_by_row(BUTTONS)] == sorted(button.button_row for button in BUTTONS)
+
+    summary = run(args.filter, args.repeat, args.target)
+
+    if args.json:
+        text = json.dumps(summary, indent=2, sort_keys=True, ensure_ascii=False)
+        if args.json == '-':
+            print(text)
+            return
+        with open(args.json, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+    print(f"Python {summary['python']}, discord.py {summary['discord.py']}")
+    print(f"{'case':<50} {'ns/call':>10} {'peak B/call':>12} {'net blocks':>11}")
+    for name, result in summary['results'].items():
+        print(f"{name:<50} {result['ns_per_call']:>10.0f} {result['peak_bytes_per_call']:>12} "
+              f"{result['net_blocks_per_call']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+fake_discord.py
+
+An in-process stand-in for the parts of Discord the bot talks to when answering role clicks, so the click path can
+be driven hard without a network, a token or a test server.
+
+FakeDiscord serves Discord's HTTP API on a local port and points discord.py at it. It answers the requests a click
+makes (interaction responses, original response edits, member role edits, bot-spam messages) from a small in-memory
+guild, after a configurable latency, and can be told to answer a fraction of them with 429s or 5xx errors instead.
+Nothing goes over the gateway: the guild is handed to the bot's connection state directly, and clicks are delivered
+the way discord.py delivers them, through DynamicButton.from_custom_id and then callback.
+
+Every request is counted per route, and every interaction's first response and final embed are kept, so a caller
+can work out when each click was acknowledged and how it ended.
+
+Used by the load generator (load_clicks.py) and the replayer (replay_interactions.py). Import the bot only after setting PTN_BRB_DATA_DIR, or it'll write its
+databases and traces to the real data directory.
+
+Depends on: Constants, CustomId, HttpStats
+"""
+# import libraries
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Set, Union
+
+from aiohttp import web
+
+# import discord
+import discord
+
+# import local constants
+from ptn.buttonrolebot.constants import bot_guild, channel_botspam, channel_botdev, role_brb
+
+# import local modules
+from ptn.buttonrolebot.modules.CustomId import encode_custom_id
+from ptn.buttonrolebot.modules.HttpStats import route_template
+
+
+BOT_USER_ID = 100000000000000001
+APPLICATION_ID = BOT_USER_ID
+CHANNEL_ID = 100000000000000002 # where the role buttons are
+MESSAGE_ID = 100000000000000003 # the message the role buttons are on
+FIRST_ROLE_ID = 100000000000001000 # button roles are numbered up from here
+FIRST_MEMBER_ID = 100000000001000000 # members are numbered up from here
+
+INTERACTION_CALLBACK_PATH = re.compile(r'/interactions/(\d+)/([^/]+)/callback$')
+WEBHOOK_MESSAGE_PATH = re.compile(r'/webhooks/\d+/([^/]+)/messages/')
+MEMBER_PATH = re.compile(r'/guilds/\d+/members/(\d+)$')
+MEMBER_ROLE_PATH = re.compile(r'/guilds/\d+/members/(\d+)/roles/(\d+)$')
+
+# requests made while connecting, which faults aren't injected into
+SETUP_ROUTES = {'/users/@me', '/oauth2/applications/@me'}
+
+
+@dataclass
+class FaultProfile:
+    """
+    How badly the fake Discord behaves.
+    """
+    latency: float = 0.05 # seconds before each answer
+    jitter: float = 0.0 # up to this many seconds more, at random
+    rate_limit_rate: float = 0.0 # fraction of requests answered with a 429
+    retry_after: float = 0.5 # seconds a 429 asks to wait
+    server_error_rate: float = 0.0 # fraction of requests answered with a 500, 502 or 503
+
+
+@dataclass
+class InteractionRecord:
+    """
+    What the fake Discord has seen of one interaction.
+    """
+    acked: Optional[float] = None # perf_counter() when its first response arrived
+    requests: int = 0 # requests made with its token
+    description: Optional[str] = None # the last embed it was answered with
+
+
+@dataclass
+class FakeGuild:
+    """
+    The guild the fake Discord serves: a number of button roles and the members who click them.
+    """
+    role_ids: List[int]
+    member_roles: Dict[int, Set[int]] = field(default_factory=dict)
+
+
+def _user(user_id: int, name: str, bot: bool = False) -> dict:
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': None, 'avatar': None, 'bot': bot}
+
+
+def _role(role_id: int, position: int, name: str) -> dict:
+    return {'id': str(role_id), 'name': name, 'color': 0, 'hoist': False, 'position': position, 'permissions': '0',
+            'managed': False, 'mentionable': False, 'flags': 0}
+
+
+def _channel(channel_id: int, name: str) -> dict:
+    return {'id': str(channel_id), 'type': 0, 'guild_id': str(bot_guild()), 'name': name, 'position': 0,
+            'permission_overwrites': []}
+
+
+class FakeDiscord:
+
+    def __init__(self, faults: FaultProfile = None, roles: Union[int, Sequence[int]] = 5, seed: Optional[int] = None):
+        """
+        Class represents the fake Discord API, its guild, and what it's seen of each interaction.
+
+        :param roles: How many button roles the guild has, or their IDs.
+        :param seed: Seeds the latency jitter and fault injection, for repeatable runs.
+        """
+        self.faults = faults or FaultProfile()
+        role_ids = [FIRST_ROLE_ID + index for index in range(roles)] if isinstance(roles, int) else list(roles)
+        self.guild = FakeGuild(role_ids)
+        self.random = random.Random(seed)
+        self.requests: Counter = Counter() # (method, route) -> requests
+        self.statuses: Counter = Counter() # status -> responses
+        self.interactions: Dict[int, InteractionRecord] = {}
+        self._tokens: Dict[str, int] = {} # interaction token -> interaction ID
+        self._snowflakes = itertools.count()
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+
+    async def start(self, port: int = 0):
+        """
+        Starts serving on localhost, and points discord.py at it.
+
+        :param port: The port to listen on; by default any free one.
+        """
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_route('*', '/{path:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        discord.http.Route.BASE = f'http://127.0.0.1:{self.port}/api/v10'
+
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+    def snowflake(self, age: float = 0.0) -> int:
+        # unique, and dated now, less age seconds, as the bot works out an interaction's age from its ID
+        created = discord.utils.utcnow() - timedelta(seconds=age)
+        return discord.utils.time_snowflake(created) + next(self._snowflakes) % 4096
+
+
+    def member_id(self, index: int) -> int:
+        return FIRST_MEMBER_ID + index
+
+
+    def reset_counts(self):
+        """
+        Forgets the requests counted so far, e.g. those made while connecting.
+        """
+        self.requests.clear()
+        self.statuses.clear()
+
+
+    # payloads
+
+    def _member(self, member_id: int) -> dict:
+        roles = self.guild.member_roles.get(member_id, set())
+        return {'user': _user(member_id, f'member{member_id - FIRST_MEMBER_ID}'), 'roles': [str(role) for role in roles],
+                'joined_at': '2020-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0, 'avatar': None,
+                'nick': None}
+
+
+    def _message(self, message_id: int, body: dict, channel_id: int = CHANNEL_ID) -> dict:
+        return {'id': str(message_id), 'channel_id': str(channel_id), 'author': _user(BOT_USER_ID, 'ButtonRoleBot', bot=True),
+                'content': body.get('content') or '', 'timestamp': '2020-01-01T00:00:00+00:00', 'edited_timestamp': None,
+                'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+                'embeds': body.get('embeds') or [], 'pinned': False, 'type': 0, 'flags': 0,
+                'components': body.get('components') or []}
+
+
+    def guild_payload(self) -> dict:
+        roles = [_role(bot_guild(), 0, '@everyone')]
+        roles += [_role(role_id, index + 1, f'role{index}') for index, role_id in enumerate(self.guild.role_ids)]
+        # the bot's role sits above every button role, so it can manage them
+        roles.append(_role(role_brb(), len(self.guild.role_ids) + 1, 'ButtonRoleBot'))
+        return {
+            'id': str(bot_guild()), 'name': 'Fake Guild', 'icon': None, 'owner_id': str(FIRST_MEMBER_ID), 'roles': roles,
+            'members': [{'user': _user(BOT_USER_ID, 'ButtonRoleBot', bot=True), 'roles': [str(role_brb())],
+                         'joined_at': '2020-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0}],
+            'channels': [_channel(CHANNEL_ID, 'roles'), _channel(channel_botspam(), 'bot-spam'),
+                         _channel(channel_botdev(), 'bot-dev')],
+            'emojis': [], 'stickers': [], 'features': [], 'member_count': 2, 'verification_level': 0,
+            'default_message_notifications': 0, 'explicit_content_filter': 0, 'mfa_level': 0, 'premium_tier': 0,
+            'preferred_locale': 'en-US', 'afk_timeout': 300, 'system_channel_flags': 0, 'nsfw_level': 0
+        }
+
+
+    def button_custom_id(self, action: str, role_index: int = 0) -> str:
+        return encode_custom_id(action, self.guild.role_ids[role_index], MESSAGE_ID)
+
+
+    def interaction_payload(self, member_id: int, custom_id: str, roles: Optional[Sequence[int]] = None,
+                            other_buttons: Sequence[str] = (), options: Optional[Sequence[str]] = None,
+                            values: Sequence[str] = (), age: float = 0.0) -> dict:
+        """
+        A role click, as the gateway would deliver it.
+
+        :param roles: The member's roles, which the fake guild then takes as theirs. By default, the roles the fake
+            guild already says they have.
+        :param other_buttons: The custom_ids of the message's other buttons, e.g. the rest of an exclusive group.
+        :param options: For a select menu, its options' values. The click's a button click if this is None.
+        :param values: For a select menu, the values selected.
+        :param age: Seconds since the interaction was created, e.g. spent getting through the gateway.
+        """
+        if roles is not None:
+            self.guild.member_roles[member_id] = set(roles)
+        interaction_id = self.snowflake(age)
+        token = f'token-{interaction_id}'
+        self._tokens[token] = interaction_id
+        self.interactions[interaction_id] = InteractionRecord()
+
+        if options is None:
+            buttons = [{'type': 2, 'style': 1, 'custom_id': button, 'label': 'Role'} for button in (custom_id, *other_buttons)]
+            # five buttons to a row, as on a real message
+            components = [{'type': 1, 'components': buttons[start:start + 5]} for start in range(0, len(buttons), 5)]
+            data = {'custom_id': custom_id, 'component_type': 2}
+        else:
+            select = {'type': 3, 'custom_id': custom_id, 'min_values': 0, 'max_values': max(1, len(options)),
+                      'options': [{'label': f'Role {value}', 'value': value} for value in options]}
+            components = [{'type': 1, 'components': [select]}]
+            data = {'custom_id': custom_id, 'component_type': 3, 'values': list(values)}
+        return {
+            'id': str(interaction_id), 'application_id': str(APPLICATION_ID), 'type': 3, 'token': token, 'version': 1,
+            'guild_id': str(bot_guild()), 'channel_id': str(CHANNEL_ID), 'channel': _channel(CHANNEL_ID, 'roles'),
+            'member': {**self._member(member_id), 'permissions': '0'},
+            'message': self._message(MESSAGE_ID, {'components': components}),
+            'data': data,
+            'locale': 'en-US', 'guild_locale': 'en-US', 'app_permissions': '0', 'entitlements': [],
+            'authorizing_integration_owners': {}, 'context': 0
+        }
+
+
+    # serving
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        route = route_template(path)
+        self.requests[(request.method, route)] += 1
+        arrived = time.perf_counter()
+        body = await request.json() if request.can_read_body and request.content_type == 'application/json' else {}
+
+        interaction = self._interaction_for(path)
+        if interaction is not None:
+            interaction.requests += 1
+
+        delay = self.faults.latency + self.random.uniform(0, self.faults.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        response = None
+        if route not in SETUP_ROUTES:
+            response = self._inject_fault()
+        if response is None:
+            response = self._answer(request.method, path, body or {}, interaction, arrived)
+        self.statuses[response.status] += 1
+        # discord.py only decodes JSON when the content type is exactly application/json
+        if response.content_type == 'application/json':
+            response.charset = None
+        return response
+
+
+    def _interaction_for(self, path: str) -> Optional[InteractionRecord]:
+        callback = INTERACTION_CALLBACK_PATH.search(path)
+        webhook = WEBHOOK_MESSAGE_PATH.search(path)
+        if callback is not None:
+            token = callback[2]
+        elif webhook is not None:
+            token = webhook[1]
+        else:
+            return None
+        return self.interactions.get(self._tokens.get(token))
+
+
+    def _inject_fault(self) -> Optional[web.Response]:
+        roll = self.random.random()
+        if roll < self.faults.rate_limit_rate:
+            retry_after = self.faults.retry_after
+            return web.json_response(
+                {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False},
+                status=429,
+                headers={'Retry-After': str(retry_after), 'X-RateLimit-Limit': '5', 'X-RateLimit-Remaining': '0',
+                         'X-RateLimit-Reset-After': str(retry_after), 'X-RateLimit-Bucket': 'fake',
+                         'X-RateLimit-Scope': 'user',
+                         # discord.py takes a 429 without this for a Cloudflare ban, and gives up rather than retrying
+                         'Via': '1.1 google'}
+            )
+        if roll < self.faults.rate_limit_rate + self.faults.server_error_rate:
+            return web.json_response({'message': 'Server error', 'code': 0}, status=self.random.choice((500, 502, 503)))
+        return None
+
+
+    def _answer(self, method: str, path: str, body: dict, interaction: Optional[InteractionRecord],
+                arrived: float) -> web.Response:
+        if path.endswith('/users/@me'):
+            return web.json_response(_user(BOT_USER_ID, 'ButtonRoleBot', bot=True))
+        if path.endswith('/oauth2/applications/@me'):
+            return web.json_response({'id': str(APPLICATION_ID), 'name': 'ButtonRoleBot', 'icon': None, 'description': '',
+                                      'bot_public': False, 'bot_require_code_grant': False, 'verify_key': '', 'flags': 0,
+                                      'owner': _user(FIRST_MEMBER_ID, 'owner')})
+
+        callback = INTERACTION_CALLBACK_PATH.search(path)
+        if callback is not None:
+            if interaction is not None:
+                if interaction.acked is None:
+                    interaction.acked = arrived
+                self._note_embed(interaction, body.get('data') or {})
+            return web.json_response({'interaction': {'id': callback[1], 'type': 3},
+                                      'resource': {'type': 4, 'message': self._message(self.snowflake(), body.get('data') or {})}})
+
+        if WEBHOOK_MESSAGE_PATH.search(path) is not None:
+            if interaction is not None:
+                self._note_embed(interaction, body)
+            return web.json_response(self._message(self.snowflake(), body))
+
+        member = MEMBER_PATH.search(path)
+        if member is not None and method == 'PATCH':
+            member_id = int(member[1])
+            if 'roles' in body:
+                self.guild.member_roles[member_id] = {int(role) for role in body['roles']}
+            return web.json_response(self._member(member_id))
+
+        member_role = MEMBER_ROLE_PATH.search(path)
+        if member_role is not None and method in ('PUT', 'DELETE'):
+            roles = self.guild.member_roles.setdefault(int(member_role[1]), set())
+            if method == 'PUT':
+                roles.add(int(member_role[2]))
+            else:
+                roles.discard(int(member_role[2]))
+            return web.Response(status=204)
+
+        if re.search(r'/channels/(\d+)/messages$', path) and method == 'POST':
+            return web.json_response(self._message(self.snowflake(), body, int(path.split('/')[-2])))
+        if re.search(r'/channels/\d+/messages/\d+$', path):
+            return web.json_response(self._message(MESSAGE_ID, body))
+
+        return web.json_response({'message': 'Unknown route', 'code': 0}, status=404)
+
+
+    @staticmethod
+    def _note_embed(interaction: InteractionRecord, data: dict):
+        embeds = data.get('embeds')
+        if embeds:
+            interaction.description = embeds[0].get('description')
+
+
+    # driving the bot
+
+    async def connect(self, bot: discord.Client):
+        """
+        Logs the bot in against the fake API and hands it the fake guild, as the gateway would on connecting.
+        """
+        await bot.login('fake-token')
+        state = bot._connection
+        guild = discord.Guild(data=self.guild_payload(), state=state)
+        state._add_guild(guild)
+        await bot.on_guild_available(guild)
+        await bot.on_ready()
+        self.reset_counts()
+
+
+    async def click(self, bot: discord.Client, payload: dict):
+        """
+        Delivers a role click to the bot, the way discord.py does for a dynamic item, and waits for its callback.
+        """
+        # imported here, so PTN_BRB_DATA_DIR can be set before the bot is
+        from ptn.buttonrolebot.bot import DynamicButton, DynamicRoleSelect
+
+        interaction = discord.Interaction(data=payload, state=bot._connection)
+        data = payload['data']
+        factory = DynamicRoleSelect if data['component_type'] == 3 else DynamicButton
+        # the component's rebuilt from the message, then swapped for our dynamic item, which is given its state
+        view = discord.ui.View.from_message(interaction.message, timeout=None)
+        base_item = next(child for child in view.children if getattr(child, 'custom_id', None) == data['custom_id'])
+        match = factory.__discord_ui_compiled_template__.fullmatch(data['custom_id'])
+        item = await factory.from_custom_id(interaction, base_item, match)
+        item._view = view
+        item._refresh_state(interaction, data)
+        await item.callback(interaction)
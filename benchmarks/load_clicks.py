@@ -0,0 +1,236 @@
+"""
+load_clicks.py
+
+Finds out how many role clicks a second the bot can take before they start missing Discord's 3-second response
+window, by clicking role buttons at a steady rate against the fake Discord in fake_discord.py.
+
+Clicks are spread over a pool of members and a mix of give, take and toggle buttons, and are sent on schedule
+whether or not earlier ones have been answered, as real members would. For each click we time:
+    ack: from the click being delivered to its first response reaching Discord
+    completion: from the click being delivered to its callback finishing, i.e. the member having their answer
+and at the end report the percentiles of both, how many requests each click cost, and how many clicks went wrong.
+
+The bot's own settings apply as usual, e.g. ROLE_BOT_ROLE_MUTATION_RATE caps role changes a second just as it
+would against Discord, so that's usually what a test runs into first. It runs offline; nothing leaves the machine.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.load_clicks --rate 20 --duration 30 --latency 0.1 --rate-limits 0.02 --server-errors 0.01
+
+Depends on: bot, Constants, fake_discord
+"""
+# import libraries
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# keep the bot's databases and traces out of the real data directory; this has to happen before the bot's imported
+os.environ.setdefault('PTN_BRB_DATA_DIR', tempfile.mkdtemp(prefix='brb-load-'))
+
+# import local constants
+from ptn.buttonrolebot.constants import RESPONSE_DEADLINE
+
+# import benchmark helpers
+from benchmarks.fake_discord import FakeDiscord, FaultProfile
+
+
+ACTIONS = ('give', 'take', 'toggle')
+DISCORD_RESPONSE_WINDOW = 3 # seconds Discord allows before an interaction fails
+
+
+@dataclass
+class ClickResult:
+    action: str
+    delivered: float # perf_counter() when the click was handed to the bot
+    acked: Optional[float] = None
+    completed: Optional[float] = None
+    error: Optional[str] = None # the exception the callback raised, if any
+    description: Optional[str] = None # the embed the member was finally shown
+    requests: int = 0 # requests made with the interaction's token
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parses an action mix like "toggle=6,give=2,take=2" into weights.
+    """
+    mix = {}
+    for part in text.split(','):
+        action, _, weight = part.partition('=')
+        action = action.strip()
+        if action not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Unknown action {action!r}, expected one of {', '.join(ACTIONS)}")
+        mix[action] = float(weight or 1)
+    return mix
+
+
+async def click(fake: FakeDiscord, bot, payload: dict, action: str) -> ClickResult:
+    """
+    Delivers a click built by the fake Discord, and collects what happened to it.
+    """
+    result = ClickResult(action, time.perf_counter())
+    try:
+        await fake.click(bot, payload)
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+    result.completed = time.perf_counter()
+    record = fake.interactions.pop(int(payload['id']))
+    result.acked = record.acked
+    result.description = record.description
+    result.requests = record.requests
+    return result
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    # imported here, after PTN_BRB_DATA_DIR is set
+    from ptn.buttonrolebot.bot import bot
+
+    faults = FaultProfile(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limits,
+                          retry_after=args.retry_after, server_error_rate=args.server_errors)
+    fake = FakeDiscord(faults, roles=args.roles, seed=args.seed)
+    choose = random.Random(args.seed)
+    actions, weights = zip(*args.mix.items())
+
+    await fake.start()
+    try:
+        await fake.connect(bot)
+
+        tasks = []
+        total = int(args.rate * args.duration)
+        started = time.perf_counter()
+        next_at = started
+        for _ in range(total):
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            member_id = fake.member_id(choose.randrange(args.members))
+            action = choose.choices(actions, weights)[0]
+            payload = fake.interaction_payload(member_id, fake.button_custom_id(action, choose.randrange(args.roles)))
+            tasks.append(asyncio.create_task(click(fake, bot, payload, action)))
+            # evenly spaced, or Poisson arrivals for something burstier
+            next_at += choose.expovariate(args.rate) if args.poisson else 1 / args.rate
+        sending = time.perf_counter() - started
+
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        settings = {
+            'rate': args.rate, 'duration': args.duration, 'members': args.members, 'roles': args.roles,
+            'mix': args.mix, 'poisson': args.poisson, 'latency': args.latency, 'jitter': args.jitter,
+            'rate_limits': args.rate_limits, 'server_errors': args.server_errors, 'seed': args.seed
+        }
+        return report(settings, fake, results, sending, elapsed)
+    finally:
+        await bot.close()
+        await fake.stop()
+
+
+def report(settings: dict, fake: FakeDiscord, results: List[ClickResult], sending: float, elapsed: float) -> dict:
+    """
+    Sums up a run: latency percentiles, requests per click and what went wrong.
+
+    :param sending: Seconds spent sending the clicks.
+    :param elapsed: Seconds until the last click was answered.
+    """
+    acks = [result.acked - result.delivered for result in results if result.acked is not None]
+    completions = [result.completed - result.delivered for result in results]
+    clicks = len(results)
+
+    def latencies(values: List[float]) -> dict:
+        return {name: round(value * 1000, 1) if value is not None else None
+                for name, value in (('p50', percentile(values, 0.5)), ('p95', percentile(values, 0.95)),
+                                    ('p99', percentile(values, 0.99)), ('max', max(values, default=None)))}
+
+    requests = sum(fake.requests.values())
+    return {
+        'settings': settings,
+        'clicks': clicks,
+        'actions': dict(Counter(result.action for result in results)),
+        'achieved_rate': round(clicks / sending, 2) if sending else None,
+        'elapsed': round(elapsed, 2),
+        'ack_ms': latencies(acks),
+        'completion_ms': latencies(completions),
+        'http_requests_per_click': round(requests / clicks, 2) if clicks else None,
+        'interaction_requests_per_click': round(sum(result.requests for result in results) / clicks, 2) if clicks else None,
+        'requests_by_route': {f'{method} {route}': count for (method, route), count in fake.requests.most_common()},
+        'responses_by_status': {str(status): count for status, count in sorted(fake.statuses.items())},
+        'errors': {
+            'never_acked': sum(1 for result in results if result.acked is None),
+            'acked_late': sum(1 for ack in acks if ack > DISCORD_RESPONSE_WINDOW),
+            'acked_after_bot_deadline': sum(1 for ack in acks if ack > RESPONSE_DEADLINE),
+            'callback_raised': sum(1 for result in results if result.error is not None),
+            'error_answers': sum(1 for result in results if (result.description or '').startswith('❌')),
+            'rate_limited_responses': fake.statuses.get(429, 0),
+            'server_error_responses': sum(count for status, count in fake.statuses.items() if status >= 500)
+        },
+        'error_rate': round(sum(1 for result in results if result.error is not None or result.acked is None
+                                or result.acked - result.delivered > DISCORD_RESPONSE_WINDOW
+                                or (result.description or '').startswith('❌')) / clicks, 4) if clicks else None,
+        'sample_errors': sorted({result.error for result in results if result.error})[:5]
+    }
+
+
+def print_report(summary: dict):
+    settings = summary['settings']
+    target = f" (target {settings['rate']}/s)" if 'rate' in settings else ''
+    print(f"{summary['clicks']} clicks at {summary['achieved_rate']}/s{target}, {summary['elapsed']}s in all")
+    print(f"actions: {summary['actions']}")
+    for name in ('ack_ms', 'completion_ms'):
+        values = summary[name]
+        print(f"{name[:-3]:<12} p50 {values['p50']} ms  p95 {values['p95']} ms  p99 {values['p99']} ms  "
+              f"max {values['max']} ms")
+    print(f"requests/click: {summary['http_requests_per_click']} "
+          f"({summary['interaction_requests_per_click']} interaction responses)")
+    for route, count in summary['requests_by_route'].items():
+        print(f"    {count:>7}  {route}")
+    print(f"responses by status: {summary['responses_by_status']}")
+    print(f"errors: {summary['errors']}")
+    print(f"error rate: {summary['error_rate']:.2%}")
+    for error in summary['sample_errors']:
+        print(f"    {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=10, help="clicks a second")
+    parser.add_argument('--duration', type=float, default=30, help="seconds to send clicks for")
+    parser.add_argument('--members', type=int, default=1000, help="members clicking")
+    parser.add_argument('--roles', type=int, default=5, help="button roles")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('toggle=6,give=2,take=2'), help="action weights, e.g. toggle=6,give=2,take=2")
+    parser.add_argument('--poisson', action='store_true', help="send clicks at random intervals, rather than evenly spaced")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the fake Discord takes to answer")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument('--rate-limits', type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument('--retry-after', type=float, default=0.5, help="seconds each 429 asks to wait")
+    parser.add_argument('--server-errors', type=float, default=0.0, help="fraction of requests answered with a 5xx")
+    parser.add_argument('--seed', type=int, default=None, help="seed, for repeatable runs")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH, or - for stdout")
+    parser.add_argument('--verbose', action='store_true', help="show the bot's log")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.ERROR)
+    summary = asyncio.run(run_load(args))
+
+    if args.json == '-':
+        print(json.dumps(summary, indent=2))
+        return
+    print_report(summary)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+replay_interactions.py
+
+Replays a recording of real role clicks (see Recorder.py) through the bot's handlers against the fake Discord in
+fake_discord.py, so two versions of the bot can be compared on the same traffic: its bursts, its mix of toggles,
+gives, takes and menus, and its members' roles at the time.
+
+Each click is delivered at its recorded time, divided by --speed: 1 replays at the original pace, 10 ten times as
+fast, and 0 sends every click at once. Clicks arrive as old as they were when the bot first saw them, so its
+response deadline works out the same. Every role a recording mentions is created in the fake guild, and each
+member has their recorded roles at the moment they click.
+
+The results are the same as load_clicks.py's: ack and completion percentiles, requests per click by route and
+what went wrong, and can be saved as JSON with --json to compare with another run.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.replay_interactions ptn/buttonrolebot/data/recordings/interactions-20240601-120000.jsonl.gz --speed 5
+
+Depends on: bot, CustomId, Recorder, fake_discord, load_clicks
+"""
+# import libraries
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import List, Set, Tuple
+
+# keep the bot's databases and traces out of the real data directory; this has to happen before the bot's imported
+os.environ.setdefault('PTN_BRB_DATA_DIR', tempfile.mkdtemp(prefix='brb-replay-'))
+
+# import local modules
+from ptn.buttonrolebot.modules.CustomId import decode_custom_id
+from ptn.buttonrolebot.modules.Recorder import RECORDING_FORMAT, RECORDING_VERSION
+
+# import benchmark helpers
+from benchmarks.fake_discord import FakeDiscord, FaultProfile
+from benchmarks.load_clicks import click, report, print_report
+
+
+def read_recording(path: str) -> Tuple[dict, List[dict]]:
+    """
+    :returns: A recording's description and its clicks, in the order they arrived.
+    :raises ValueError: If the file isn't a recording we can replay.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        header = json.loads(file.readline() or '{}')
+        if header.get('format') != RECORDING_FORMAT:
+            raise ValueError(f"{path} isn't a recording of role clicks")
+        if header.get('version') != RECORDING_VERSION:
+            raise ValueError(f"{path} is a version {header.get('version')} recording; we can replay version {RECORDING_VERSION}")
+        entries = [json.loads(line) for line in file if line.strip()]
+    entries.sort(key=lambda entry: entry['t'])
+    return header, entries
+
+
+def recorded_role_ids(entries: List[dict]) -> List[int]:
+    """
+    Every role a recording mentions, so the fake guild can have them all.
+    """
+    role_ids: Set[int] = set()
+    for entry in entries:
+        role_ids.update(entry.get('r', []))
+        role_ids.update(int(value) for value in entry.get('o', []) if value.isdigit())
+        for custom_id in (entry['c'], *entry.get('g', [])):
+            decoded = decode_custom_id(custom_id)
+            if decoded is not None:
+                role_ids.update((*decoded.role_ids, *decoded.required, *decoded.forbidden))
+    return sorted(role_ids)
+
+
+def action_of(entry: dict) -> str:
+    if 'o' in entry:
+        return 'select'
+    decoded = decode_custom_id(entry['c'])
+    return decoded.action if decoded is not None else 'unknown'
+
+
+async def replay(args: argparse.Namespace) -> dict:
+    # imported here, after PTN_BRB_DATA_DIR is set
+    from ptn.buttonrolebot.bot import bot
+
+    header, entries = read_recording(args.recording)
+    if args.limit:
+        entries = entries[:args.limit]
+
+    faults = FaultProfile(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limits,
+                          retry_after=args.retry_after, server_error_rate=args.server_errors)
+    fake = FakeDiscord(faults, roles=recorded_role_ids(entries), seed=args.seed)
+
+    await fake.start()
+    try:
+        await fake.connect(bot)
+
+        tasks = []
+        started = time.perf_counter()
+        first = entries[0]['t'] if entries else 0
+        for entry in entries:
+            if args.speed:
+                delay = started + (entry['t'] - first) / 1000 / args.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            payload = fake.interaction_payload(
+                fake.member_id(entry['m']), entry['c'], roles=entry.get('r', []), other_buttons=entry.get('g', ()),
+                options=entry.get('o'), values=entry.get('v', ()), age=entry.get('a', 0) / 1000
+            )
+            tasks.append(asyncio.create_task(click(fake, bot, payload, action_of(entry))))
+        sending = time.perf_counter() - started
+
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        settings = {
+            'recording': os.path.basename(args.recording), 'recorded': header.get('started'),
+            'recorded_by': header.get('bot'), 'speed': args.speed, 'roles': len(fake.guild.role_ids),
+            'members': len({entry['m'] for entry in entries}), 'latency': args.latency, 'jitter': args.jitter,
+            'rate_limits': args.rate_limits, 'server_errors': args.server_errors, 'seed': args.seed
+        }
+        return report(settings, fake, results, sending, elapsed)
+    finally:
+        await bot.close()
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', help="a recording from DATA_DIR/recordings")
+    parser.add_argument('--speed', type=float, default=1, help="how many times faster than recorded to replay, or 0 for all at once")
+    parser.add_argument('--limit', type=int, default=0, help="only replay this many clicks")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the fake Discord takes to answer")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument('--rate-limits', type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument('--retry-after', type=float, default=0.5, help="seconds each 429 asks to wait")
+    parser.add_argument('--server-errors', type=float, default=0.0, help="fraction of requests answered with a 5xx")
+    parser.add_argument('--seed', type=int, default=None, help="seed, for repeatable runs")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH, or - for stdout")
+    parser.add_argument('--verbose', action='store_true', help="show the bot's log")
+    args = parser.parse_args()
+    if args.speed < 0:
+        parser.error("--speed can't be negative")
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.ERROR)
+    summary = asyncio.run(replay(args))
+
+    if args.json == '-':
+        print(json.dumps(summary, indent=2))
+        return
+    print_report(summary)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
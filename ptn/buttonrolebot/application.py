@@ -15,9 +15,11 @@ from ptn.buttonrolebot.botcommands.ButtonRoleCommands import ButtonRoleCommands
 
 # import bot object, token, production status
 from ptn.buttonrolebot.constants import TOKEN, _production, DATA_DIR, log_handler, LOG_LEVEL
-from discord.utils import setup_logging
 from ptn.buttonrolebot.bot import bot
 
+# import local modules
+from ptn.buttonrolebot.modules.Logger import start_logging, stop_logging
+
 print(f"Data dir is {DATA_DIR} from {os.path.join(os.getcwd(), 'ptn', 'buttonrolebot', DATA_DIR, '.env')}")
 
 print(f'PTN buttonrolebot is connecting against production: {_production}.')
@@ -28,12 +30,16 @@ def run():
 
 
 async def buttonrolebot():
-    async with bot:
-        await bot.add_cog(AdminCommands(bot))
-        await bot.add_cog(ButtonRoleCommands(bot))
-        await bot.add_cog(PrometheusCog(bot))
-        setup_logging(handler=log_handler, level=LOG_LEVEL)
-        await bot.start(TOKEN)
+    start_logging(log_handler, LOG_LEVEL)
+    try:
+        async with bot:
+            await bot.add_cog(AdminCommands(bot))
+            await bot.add_cog(ButtonRoleCommands(bot))
+            await bot.add_cog(PrometheusCog(bot))
+            await bot.start(TOKEN)
+    finally:
+        # write out whatever's still queued
+        stop_logging()
 
 
 if __name__ == '__main__':
@@ -8,7 +8,11 @@ Dependencies: Constants, Metadata
 """
 # import libraries
 import asyncio
+import logging
+import math
 import re
+import time
+from typing import List, Optional, Sequence, Tuple, Union
 
 # import discord
 import discord
@@ -17,15 +21,36 @@ from discord.ext import commands
 
 # import constants
 from ptn.buttonrolebot._metadata import __version__
-from ptn.buttonrolebot.constants import channel_botdev, channel_botspam, EMBED_COLOUR_OK, role_council, role_mod, EMBED_COLOUR_ERROR, EMBED_COLOUR_QU
+from ptn.buttonrolebot.constants import channel_botdev, channel_botspam, EMBED_COLOUR_OK, role_council, role_mod, EMBED_COLOUR_ERROR, EMBED_COLOUR_QU, \
+    QUEUE_NOTICE_THRESHOLD, BREAKER_ALERT_WINDOW, RESPONSE_DEADLINE, CLICK_DEADLINE
 
 # import classes
 # from ptn.buttonrolebot.ui_elements.ButtonCreator import DynamicButton
 
 # import modules
+from ptn.buttonrolebot.modules.Capacity import role_capacity
+from ptn.buttonrolebot.modules.CircuitBreaker import role_breaker, BreakerState
+from ptn.buttonrolebot.modules.ClickThrottle import click_throttle
+from ptn.buttonrolebot.modules.CustomId import CUSTOM_ID_TEMPLATE, SELECT_CUSTOM_ID_TEMPLATE, encode_custom_id, decode_custom_id, \
+    encode_select_custom_id, decode_select_custom_id
+from ptn.buttonrolebot.modules.Eligibility import compile_rule, member_mask
 from ptn.buttonrolebot.modules.ErrorHandler import CustomError, on_generic_error
+from ptn.buttonrolebot.modules.HttpStats import http_stats
+from ptn.buttonrolebot.modules.Instrumentation import start_click, get_click, outcome_from_adverbs
+from ptn.buttonrolebot.modules.Logger import click_log
+from ptn.buttonrolebot.modules.LoopWatchdog import loop_watchdog
+from ptn.buttonrolebot.modules.MemoryStats import register_memory_gauges
+from ptn.buttonrolebot.modules.Metrics import ROLE_CLICK_TIMEOUTS
+from ptn.buttonrolebot.modules.Recorder import interaction_recorder
+from ptn.buttonrolebot.modules.RoleActor import role_actors
+from ptn.buttonrolebot.modules.RoleCache import role_index, bot_roles
+from ptn.buttonrolebot.modules.RoleExpiry import role_expiry
+from ptn.buttonrolebot.modules.RoleScheduler import role_scheduler, PRIORITY_INTERACTIVE
+from ptn.buttonrolebot.modules.Tracing import traced, instrument_trace_config, span_exporter
 from ptn.buttonrolebot.utils import get_member
 
+log = logging.getLogger(__name__)
+
 
 """
 Dynamic Button
@@ -35,175 +60,524 @@ I mean I could write a separate error handler for this, or I could NOT
 
 i'm so sorry kutu
 """
-class DynamicButton(discord.ui.DynamicItem[discord.ui.Button], template = r'button:role:(?P<role_id>[0-9]+):message:(?P<message_id>[0-9]+):action:(?P<action>[a-z]+)'):
-    def __init__(self, action: str, role_id: int, message_id: int) -> None:
-        print("DynamicButton init")
+class DynamicButton(discord.ui.DynamicItem[discord.ui.Button], template = CUSTOM_ID_TEMPLATE):
+    def __init__(self, action: str, role_ids: Union[int, Tuple[int, ...]], message_id: int, group: Optional[str] = None,
+                 required: Tuple[int, ...] = (), forbidden: Tuple[int, ...] = (), capacity: int = 0, duration: int = 0) -> None:
+        click_log.debug("DynamicButton init")
+        # a single role, or a tuple of roles for a bundle button
+        if isinstance(role_ids, int):
+            role_ids = (role_ids,)
         super().__init__(
             discord.ui.Button(
                 label='Assign Role',
                 style=discord.ButtonStyle.blurple,
-                custom_id=f'button:role:{role_id}:message:{message_id}:action:{action}'
+                custom_id=encode_custom_id(action, role_ids, message_id, group, required, forbidden, capacity, duration)
             )
         )
         self.action: str = action
-        self.role_id: int = role_id
+        self.role_ids: Tuple[int, ...] = role_ids
+        self.role_id: int = role_ids[0]
         self.message_id: int = message_id
+        self.group: Optional[str] = group # exclusive group, if any
+        self.required: Tuple[int, ...] = required # prerequisite roles the member must hold
+        self.forbidden: Tuple[int, ...] = forbidden # roles that stop the member using the button
+        self.capacity: int = capacity # the most members who can hold the button's role, 0 for no limit
+        self.duration: int = duration # seconds until given roles are taken away again, 0 to keep them
 
 
     # This is called when the button is clicked and the custom_id matches the template.
     @classmethod
     async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str], /):
-        print("DynamicButton: from_custom_id called")
-        action = str(match['action']) if match else 'toggle'
-        role_id = int(match['role_id'])
-        message_id = int(match['message_id'])
-        return cls(action, role_id, message_id)
-
+        click_log.debug("DynamicButton: from_custom_id called")
+        # the template only tells us this is one of ours; the codec does the actual parsing, in any format
+        decoded = decode_custom_id(item.custom_id)
+        if decoded is None:
+            raise ValueError(f"Can't decode role button custom_id {item.custom_id!r}")
+        return cls(decoded.action, decoded.role_ids, decoded.message_id, decoded.group, decoded.required, decoded.forbidden,
+                   decoded.capacity, decoded.duration)
+
+    @traced
     async def callback(self, interaction: discord.Interaction) -> None:
-        print("DynamicButton: callback from:")
-        print(f'action:{self.action}:message:{self.message_id}:role:{self.role_id}')
+        click = start_click(interaction, self.action)
+        try:
+            await self._handle_click(interaction)
+        finally:
+            click.finish()
+
+    async def _handle_click(self, interaction: discord.Interaction) -> None:
+        click_log.debug("DynamicButton: callback from:")
+        click_log.debug('action:%s:message:%s:roles:%s', self.action, self.message_id, self.role_ids)
+
+        if await _reject_if_throttled(interaction):
+            return
+
+        # turn away members who don't meet the button's prerequisites before doing anything else
+        if self.required or self.forbidden:
+            rule = compile_rule(self.required, self.forbidden)
+            mask = member_mask(interaction.user, rule)
+            if not rule.allows(mask):
+                click_log.debug("🔒 %s doesn't meet the prerequisites for %s", interaction.user, self.role_ids)
+                reasons = []
+                missing = rule.missing(mask)
+                if missing:
+                    reasons.append(f"You need {', '.join(f'<@&{role_id}>' for role_id in missing)} to use this button.")
+                blocking = rule.blocking(mask)
+                if blocking:
+                    reasons.append(f"This button isn't available to members with {', '.join(f'<@&{role_id}>' for role_id in blocking)}.")
+                embed = discord.Embed(
+                    description=f"🔒 {' '.join(reasons)}",
+                    color=EMBED_COLOUR_ERROR
+                )
+                get_click(interaction).record_outcome('ineligible')
+                await _respond(interaction, embed)
+                return
 
-        embed = discord.Embed(
-            description="⏳ Processing...",
-            color=EMBED_COLOUR_QU
+        # a full button turns away anyone who'd need a new place, again before anything is sent to Discord;
+        # a bundle needs a place in each of its roles the member doesn't have yet
+        reserved = []
+        if self.capacity and self.action != 'take':
+            for role_id in self.role_ids:
+                role = role_index.get(interaction.guild, role_id)
+                if role is None or interaction.user.get_role(role_id) is not None:
+                    continue
+                if not role_capacity.try_reserve(role, interaction.user.id, self.capacity):
+                    click_log.debug('🈵 %s is full (%s), turning away %s', role, self.capacity, interaction.user)
+                    for reserved_role_id in reserved:
+                        role_capacity.release(reserved_role_id, interaction.user.id)
+                    embed = discord.Embed(
+                        description=f"🈵 Sorry, <@&{role_id}> is full: all **{self.capacity}** places are taken. "
+                                     "Try again later in case someone drops out.",
+                        color=EMBED_COLOUR_ERROR
+                    )
+                    get_click(interaction).record_outcome('full')
+                    await _respond(interaction, embed)
+                    return
+                reserved.append(role_id)
+
+        # in an exclusive group, giving our role(s) takes away the roles of the group's other buttons
+        exclusive_role_ids = _exclusive_group_role_ids(interaction.message, self.group, self.role_ids) if self.group else []
+
+        try:
+            await _process_role_click(interaction, self.role_ids, self.action, exclusive_role_ids, self.duration)
+        finally:
+            if reserved:
+                _settle_capacity(interaction, reserved)
+
+
+"""
+Dynamic Role Select
+
+A select menu offering up to 25 roles. Each option's value is a role ID; on submit the member ends up with exactly
+the menu roles they selected, applied in one request.
+"""
+class DynamicRoleSelect(discord.ui.DynamicItem[discord.ui.Select], template = SELECT_CUSTOM_ID_TEMPLATE):
+    def __init__(self, message_id: int, index: int = 0, options: Optional[List[discord.SelectOption]] = None,
+                 placeholder: Optional[str] = None) -> None:
+        click_log.debug("DynamicRoleSelect init")
+        options = options or []
+        super().__init__(
+            discord.ui.Select(
+                custom_id=encode_select_custom_id(message_id, index),
+                placeholder=placeholder,
+                min_values=0, # so members can deselect everything
+                max_values=max(1, len(options)),
+                options=options
+            )
         )
+        self.message_id: int = message_id
+        self.index: int = index
 
-        # quickly send off a message so we don't miss our 3 second response window
-        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        timeout = 30 # timeout in seconds for administering role
+    # the item we're given is built from the message, so it already carries the menu's options
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match: re.Match[str], /):
+        click_log.debug("DynamicRoleSelect: from_custom_id called")
+        decoded = decode_select_custom_id(item.custom_id)
+        if decoded is None:
+            raise ValueError(f"Can't decode role select custom_id {item.custom_id!r}")
+        return cls(decoded.message_id, decoded.index, item.options, item.placeholder)
+
+    @traced
+    async def callback(self, interaction: discord.Interaction) -> None:
+        click = start_click(interaction, 'select', 'select')
+        try:
+            await self._handle_click(interaction)
+        finally:
+            click.finish()
 
-        async def manage_user_role():
+    async def _handle_click(self, interaction: discord.Interaction) -> None:
+        click_log.debug("DynamicRoleSelect: callback from:")
+        click_log.debug('message:%s:index:%s:values:%s', self.message_id, self.index, self.item.values)
+
+        if await _reject_if_throttled(interaction):
+            return
+
+        menu_role_ids = []
+        for option in self.item.options:
             try:
-                print(f"Spamchannel is {spamchannel}")
-
-                # get role object
-                role = discord.utils.get(interaction.guild.roles, id=self.role_id)
-
-                # check if we have permissions for this role
-                bot_member: discord.Member = await get_member(bot, bot.user.id)
-                if bot_member.top_role <= role or role.managed:
-                    print(f"⚠ We don't have permission for {role}")
-                    try:
-                        # notify bot-spam
-                        message: discord.Message = await interaction.channel.fetch_message(self.message_id)
-                        embed = discord.Embed(
-                            description=f':warning: <@{bot_member.id}> does not have permission to manage <@&{role.id}>. Called from {message.jump_url}.\n\n'
-                                        'Bot role is not high enough in role hierarchy to grant this role. **Please move the bot role higher or edit the offending button**.',
-                            color=EMBED_COLOUR_ERROR
-                        )
-                        content = f'🔔 <@&{role_mod()}>: Button failed to grant role <@&{role.id}>'
-                        await spamchannel.send(content=content, embed=embed)
-                    except Exception as e:
-                        print(f'Error notifying bot-spam: {e}')
-
-                    try:
-                        # notify user
-                        raise CustomError(f"Sorry, I don't have permission to manage <@&{role.id}>. Please contact a <@&{role_mod()}> or <@&{role_council()}> member.")
-                    except Exception as e:
-                        await on_generic_error(spamchannel, interaction, e)
-                    return False
-
-                # check if user has it
-                print(f'Check whether user has role: "{role}"')
-                
-                if role not in interaction.user.roles and self.action != 'take':
-                    print('User doesn\'t have role and action is not take')
-                    # rolercoaster giveth
-                    await interaction.user.add_roles(role)
-                    print(f'➕ Gave {interaction.user} the {role} role')
-                    adverb = "now"
-
-                elif role in interaction.user.roles and self.action != 'give':
-                    print('User has role and action is not give')
-                    # ...and rolercoaster taketh away
-                    await interaction.user.remove_roles(role)
-                    print(f'➖ Removed {interaction.user} from the {role} role')
-                    adverb = "no longer"
-
-                elif role not in interaction.user.roles and self.action == 'take':
-                    print('No action required: user hasn\'t got role and action is take')
-                    adverb = 'don\'t'
-
-                elif role in interaction.user.roles and self.action == 'give':
-                    print('No action required: user already has role and action is give')
-                    adverb = 'already'
+                menu_role_ids.append(int(option.value))
+            except ValueError:
+                click_log.warning('⚠ Ignoring menu option with non-role value %r', option.value)
+        selected = {int(value) for value in self.item.values if value.isdigit()}
 
-                embed = discord.Embed(
-                    description=f'You {adverb} have the <@&{role.id}> role.',
-                    color=EMBED_COLOUR_OK
-                )
+        # give everything selected, take away every other role in the menu
+        role_ids = [role_id for role_id in menu_role_ids if role_id in selected]
+        unselected_role_ids = [role_id for role_id in menu_role_ids if role_id not in selected]
 
-                await interaction.edit_original_response(embed=embed)
+        await _process_role_click(interaction, role_ids, 'give', unselected_role_ids)
 
-            except Forbidden as e:
-                print(e)
-                try:
-                    # notify bot-spam
-                    message: discord.Message = await interaction.channel.fetch_message(self.message_id)
-                    embed = discord.Embed(
-                        description=f':warning: <@{bot_member.id}> does not have permission to manage <@&{role.id}> for <@{interaction.user.id}>. Called from {message.jump_url}. **Bot role needs Manage Roles permission**.',
-                        color=EMBED_COLOUR_ERROR
-                    )
-                    embed.set_footer(text=e)
-                    await spamchannel.send(embed=embed)
-                except Exception as e:
-                    print(f'Error notifying bot-spam: {e}')
-
-                print("Raising error for user")
-                # raise error
-                try:
-                    error = f"Role <@&{role.id}> not granted. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance."
-                    raise CustomError(error)
-                except Exception as e:
-                    await on_generic_error(spamchannel, interaction, e)
-                return 
 
-            except Exception as e:
-                print(e)
-                try:
-                    # notify bot-spam
-                    message: discord.Message = await interaction.channel.fetch_message(self.message_id)
-                    embed = discord.Embed(
-                        description=f':warning: <@{bot_member.id}> failed administering <@&{role.id}> for <@{interaction.user.id}>. Called from {message.jump_url}. Error given:\n{e}',
-                        color=EMBED_COLOUR_ERROR
-                    )
-                    await spamchannel.send(embed=embed)
-                except Exception as e:
-                    print(f'Error notifying bot-spam: {e}')
-
-                print("Raising error for user")
-                # raise error
-                try:
-                    error = f"Role <@&{role.id}> not granted. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance."
-                    raise CustomError(error)
-                except Exception as e:
-                    await on_generic_error(spamchannel, interaction, e)
-                return
+"""
+Role click processing
 
+Shared by every component that changes a member's roles.
+"""
+@traced
+async def _process_role_click(interaction: discord.Interaction, role_ids: Sequence[int], action: str,
+                              exclusive_role_ids: Sequence[int] = (), duration: int = 0) -> None:
+    """
+    Answers a role component interaction and applies its change to the clicking member.
+
+    :param role_ids: The role(s) to give, take or toggle.
+    :param action: One of give, take or toggle.
+    :param exclusive_role_ids: Roles to take away in the same request if role_ids are given.
+    :param duration: Seconds until given roles are taken away again, or 0 to keep them.
+    """
+    jump_url = interaction.message.jump_url if interaction.message else None
+    # an empty menu selection only takes roles away, so talk about those instead
+    mentioned_role_ids = list(role_ids) or list(exclusive_role_ids)
+    role_mentions = ', '.join(f'<@&{role_id}>' for role_id in mentioned_role_ids)
+    role_noun = 'Roles' if len(mentioned_role_ids) > 1 else 'Role'
+
+    # if we already know we can't manage this role, answer from the cached error without touching Discord
+    breaker = None
+    for role_id in role_ids:
+        breaker = role_breaker.short_circuit(role_id, interaction.user.id, jump_url)
+        if breaker is not None:
+            break
+    if breaker is not None:
+        click_log.debug('🔌 Circuit breaker open for role %s, answering from cached error', breaker.role_id)
+        embed = discord.Embed(
+            description=f"❌ {breaker.user_message}",
+            color=EMBED_COLOUR_ERROR
+        )
+        _record_click_outcome(interaction, 'short_circuited')
+        await _respond(interaction, embed)
+        return
+
+    # nothing would change, e.g. giving a role the member already has: answer straight away, in one request
+    # (unless they have changes queued, which the role IDs that came with their click don't show yet)
+    if not role_actors.is_busy(interaction.user.id):
+        adverbs = _predict_unchanged_outcome(interaction.user, role_ids, action, exclusive_role_ids)
+        if adverbs is not None:
+            click_log.debug('⚡ %s of %s changes nothing for %s, answering without a role update', action, list(role_ids), interaction.user)
+            embed = _role_outcome_embed(interaction, role_ids, exclusive_role_ids, adverbs, duration)
+            await _respond(interaction, embed)
+            return
+
+    expected_wait = role_scheduler.estimate_wait(PRIORITY_INTERACTIVE)
+    # the click's time budget, allowing for time spent queued; retries stop early enough to respect it
+    timeout = CLICK_DEADLINE + expected_wait
+    deadline = time.monotonic() + timeout
+
+    async def manage_user_role() -> discord.Embed:
         try:
-            await asyncio.wait_for(manage_user_role(), timeout=timeout)
+            click_log.debug('Spamchannel is %s', spamchannel)
+
+            # get role objects
+            roles = [role_index.get(interaction.guild, role_id) for role_id in role_ids]
+
+            # check if we have permissions for every role
+            if not bot_roles.is_ready(interaction.guild):
+                bot_roles.rebuild(interaction.guild, await get_member(bot, bot.user.id))
+            for role in roles:
+                if not bot_roles.can_manage(role):
+                    click_log.warning("⚠ We don't have permission for %s", role)
+                    error = f"Sorry, I don't have permission to manage <@&{role.id}>. Please contact a <@&{role_mod()}> or <@&{role_council()}> member."
+                    if role_breaker.trip(role.id, 'hierarchy', error, interaction.user.id, jump_url):
+                        asyncio.create_task(_send_breaker_alert(role_breaker.get(role.id)))
+
+                    _record_click_outcome(interaction, 'forbidden')
+                    return discord.Embed(
+                        description=f"❌ {error}",
+                        color=EMBED_COLOUR_ERROR
+                    )
 
-        except asyncio.TimeoutError: # TODO move to error handler
-            print("User role management timed out")
-            # notify user
-            embed = discord.Embed(
-                description=f"❌ Timed out. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance.",
+            # roles we'd take away if ours are given, e.g. the rest of an exclusive group
+            exclusive_roles = []
+            for role_id in exclusive_role_ids:
+                exclusive_role = role_index.get(interaction.guild, role_id)
+                if exclusive_role is not None and bot_roles.can_manage(exclusive_role):
+                    exclusive_roles.append(exclusive_role)
+                else:
+                    click_log.warning("⚠ Can't manage exclusive role %s, leaving it alone", role_id)
+
+            # queue the change on this member's role actor, which serialises and coalesces their clicks
+            # bundles, exclusive groups and menus are queued as one operation, so all their roles go in a single request
+            click_log.debug('Queueing %s of %s for %s', action, roles, interaction.user)
+            adverbs = await role_actors.apply_bundle(interaction.user, roles, action, exclusive_of=exclusive_roles, deadline=deadline)
+
+            return _role_outcome_embed(interaction, [role.id for role in roles], [role.id for role in exclusive_roles], adverbs, duration)
+
+        except Forbidden as e:
+            click_log.error('%s', e)
+            error = f"{role_noun} {role_mentions} not granted. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance."
+            # only trip the roles we can tell are at fault, so one bad role in a bundle or menu doesn't block the rest;
+            # a single role is at fault by elimination
+            at_fault = []
+            for role_id in role_ids:
+                role = role_index.get(interaction.guild, role_id)
+                if role is None or not bot_roles.can_manage(role):
+                    at_fault.append(role_id)
+            if not at_fault and len(role_ids) == 1:
+                at_fault = list(role_ids)
+            for role_id in at_fault:
+                if role_breaker.trip(role_id, 'forbidden', error, interaction.user.id, jump_url, e):
+                    asyncio.create_task(_send_breaker_alert(role_breaker.get(role_id)))
+
+            click_log.warning("Raising error for user")
+            _record_click_outcome(interaction, 'forbidden')
+            return discord.Embed(
+                description=f"❌ {error}",
                 color=EMBED_COLOUR_ERROR
             )
-            await interaction.edit_original_response(embed=embed)
 
-            # notify bot-spam
-            message: discord.Message = await interaction.channel.fetch_message(self.message_id)
+        except Exception as e:
+            click_log.error('%s', e)
+            try:
+                # notify bot-spam
+                embed = discord.Embed(
+                    description=f':warning: <@{bot.user.id}> failed administering {role_mentions} for <@{interaction.user.id}>. Called from {jump_url}. Error given:\n{e}',
+                    color=EMBED_COLOUR_ERROR
+                )
+                await spamchannel.send(embed=embed)
+            except Exception as e:
+                click_log.warning('Error notifying bot-spam: %s', e)
 
-            embed = discord.Embed(
-                description=f':warning: <@{bot.user.id}> **timed out** ({timeout}) while trying to {self.action} <@&{self.role_id}> for <@{interaction.user.id}>. Called from {message.jump_url}.',
+            click_log.warning("Raising error for user")
+            error = f"{role_noun} {role_mentions} not granted. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance."
+            return discord.Embed(
+                description=f"❌ {error}",
                 color=EMBED_COLOUR_ERROR
             )
-            await spamchannel.send(embed=embed)
 
-        except Exception as e:
-            print(e)
+    task = asyncio.create_task(asyncio.wait_for(manage_user_role(), timeout=timeout))
+
+    # if the change lands inside our response window, answer with the outcome in a single request;
+    # only if it's running late (or we already know it's queued behind others) do we acknowledge first and edit later
+    response_deadline = _response_deadline(interaction)
+    if expected_wait < response_deadline:
+        await asyncio.wait({task}, timeout=response_deadline)
+
+    if not task.done():
+        # if we're busy, let the user know roughly how long they'll be waiting
+        description = "⏳ Processing..."
+        if expected_wait >= QUEUE_NOTICE_THRESHOLD:
+            description += f" Lots of people are clicking buttons right now, so this may take about **{math.ceil(expected_wait)} seconds**."
+
+        embed = discord.Embed(
+            description=description,
+            color=EMBED_COLOUR_QU
+        )
+
+        # quickly send off a message so we don't miss our 3 second response window
+        await _respond(interaction, embed)
+
+    try:
+        embed = await task
+        await _respond(interaction, embed)
+
+    except asyncio.TimeoutError: # TODO move to error handler
+        click_log.debug("User role management timed out")
+        ROLE_CLICK_TIMEOUTS.inc()
+        _record_click_outcome(interaction, 'timeout')
+        # notify user
+        embed = discord.Embed(
+            description=f"❌ Timed out. Please contact a member of the <@&{role_mod()}> team or <@&{role_council()}> for assistance.",
+            color=EMBED_COLOUR_ERROR
+        )
+        await _respond(interaction, embed)
+
+        # notify bot-spam
+        embed = discord.Embed(
+            description=f':warning: <@{bot.user.id}> **timed out** ({timeout:.0f}s) while trying to {action} {role_mentions} for <@{interaction.user.id}>. Called from {jump_url}.',
+            color=EMBED_COLOUR_ERROR
+        )
+        await spamchannel.send(embed=embed)
+
+    except Exception as e:
+        click_log.error('%s', e)
+
+
+# how long we can wait for a role change before we have to acknowledge the click instead
+def _response_deadline(interaction: discord.Interaction) -> float:
+    # Discord allows 3 seconds from when the interaction was created; take off however long it took to reach us,
+    # so a slow gateway or a fast clock only ever makes us acknowledge sooner
+    age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    return RESPONSE_DEADLINE - max(0.0, age)
+
+
+# send our answer, whether or not we've already acknowledged the click
+async def _respond(interaction: discord.Interaction, embed: discord.Embed):
+    if interaction.response.is_done():
+        await interaction.edit_original_response(embed=embed)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        click = get_click(interaction)
+        if click is not None:
+            click.record_ack()
+
+
+def _record_click_outcome(interaction: discord.Interaction, outcome: str):
+    click = get_click(interaction)
+    if click is not None:
+        click.record_outcome(outcome)
+
+
+# the outcome of a click, if it wouldn't change any roles; None if it would
+def _predict_unchanged_outcome(member: discord.Member, role_ids: Sequence[int], action: str,
+                               exclusive_role_ids: Sequence[int]) -> Optional[List[str]]:
+    # the same rules the role actor applies, against the roles the member had when they clicked
+    held = set(member._roles)
+    if action == 'toggle':
+        action = 'take' if all(role_id in held for role_id in role_ids) else 'give'
+
+    if action == 'give':
+        if not all(role_id in held for role_id in role_ids) or any(role_id in held for role_id in exclusive_role_ids):
+            return None
+        return ['already'] * len(role_ids) + ["don't"] * len(exclusive_role_ids)
+
+    if any(role_id in held for role_id in role_ids):
+        return None
+    return ["don't"] * len(role_ids) + ['already' if role_id in held else "don't" for role_id in exclusive_role_ids]
+
+
+# settle the places a click reserved that its outcome didn't already account for
+def _settle_capacity(interaction: discord.Interaction, role_ids: Sequence[int]):
+    click = get_click(interaction)
+    # turned away without a role update, or refused by Discord: the member didn't get the role, so the place is free
+    failed = click is not None and click.outcome in ('forbidden', 'short_circuited')
+    for role_id in role_ids:
+        if role_capacity.is_reserved(role_id, interaction.user.id):
+            # otherwise, e.g. after a timeout, the change may well have landed; count them as holding it rather than
+            # risk giving their place to someone else too, and let member updates put it right if not
+            role_capacity.release(role_id, interaction.user.id, holds=None if failed else True)
+
+
+# record what a click did to capacity counters and temporary roles, and describe it for the member
+def _role_outcome_embed(interaction: discord.Interaction, role_ids: Sequence[int], exclusive_role_ids: Sequence[int],
+                        adverbs: List[str], duration: int = 0) -> discord.Embed:
+    all_role_ids = list(role_ids) + list(exclusive_role_ids)
+
+    # keep the counts of capacity-limited roles exact, rather than waiting for a member update that
+    # never comes for members we haven't cached
+    for role_id, adverb in zip(all_role_ids, adverbs):
+        if role_capacity.get(role_id) is not None:
+            role_capacity.release(role_id, interaction.user.id, holds=adverb in ('now', 'already'))
+
+    # temporary roles: every click that gives them restarts the clock, anything else that leaves them
+    # held makes them permanent, and taking them away means there's nothing left to expire
+    expires_at = int(time.time() + duration) if duration else None
+    given = False
+    for role_id, adverb in zip(role_ids, adverbs):
+        if adverb in ('now', 'already') and expires_at:
+            role_expiry.schedule(interaction.guild.id, interaction.user.id, role_id, expires_at)
+            given = True
+        elif role_expiry.expiry_of(interaction.guild.id, interaction.user.id, role_id) is not None:
+            role_expiry.cancel(interaction.guild.id, interaction.user.id, role_id)
+    # the rest of an exclusive group keeps whatever expiry its own button gave it, unless we've just taken it away
+    for role_id, adverb in zip(exclusive_role_ids, adverbs[len(role_ids):]):
+        if adverb == 'no longer' and role_expiry.expiry_of(interaction.guild.id, interaction.user.id, role_id) is not None:
+            role_expiry.cancel(interaction.guild.id, interaction.user.id, role_id)
+
+    # only mention the exclusive roles if we've just taken them away
+    outcomes = list(zip(role_ids, adverbs)) + \
+               [(role_id, adverb) for role_id, adverb in zip(exclusive_role_ids, adverbs[len(role_ids):]) if adverb == 'no longer']
+    _record_click_outcome(interaction, outcome_from_adverbs([adverb for role_id, adverb in outcomes]))
+    description = _describe_role_outcome(outcomes)
+    if given:
+        pronoun = "They'll" if len(role_ids) > 1 else "It'll"
+        description += f"\n⌛ {pronoun} be taken away again <t:{expires_at}:R>."
+    return discord.Embed(
+        description=description,
+        color=EMBED_COLOUR_OK
+    )
+
+
+# turn away members clicking faster than we're willing to change their roles, before anything else
+async def _reject_if_throttled(interaction: discord.Interaction) -> bool:
+    wait = click_throttle.check(interaction.user.id, interaction.data.get('custom_id', ''))
+    if wait is None:
+        return False
+
+    click_log.debug('🐢 Throttling %s for %.1fs', interaction.user, wait)
+    embed = discord.Embed(
+        description=f"🐢 Slow down! You're clicking too fast. Please wait **{math.ceil(wait)} second{'s' if math.ceil(wait) != 1 else ''}** and try again.",
+        color=EMBED_COLOUR_ERROR
+    )
+    _record_click_outcome(interaction, 'throttled')
+    await _respond(interaction, embed)
+    return True
+
+
+# the roles of every other button in the same exclusive group on a message
+def _exclusive_group_role_ids(message: Optional[discord.Message], group: str, own_role_ids: Tuple[int, ...]) -> List[int]:
+    # the message comes with the interaction, so its buttons tell us the group without any extra requests
+    role_ids = []
+    if message is None:
+        return role_ids
+    for row in message.components:
+        for component in getattr(row, 'children', []):
+            custom_id = getattr(component, 'custom_id', None)
+            decoded = decode_custom_id(custom_id) if custom_id else None
+            if decoded is not None and decoded.group == group:
+                role_ids.extend(role_id for role_id in decoded.role_ids if role_id not in own_role_ids and role_id not in role_ids)
+    return role_ids
+
+
+# tell the user where they stand with each role after a click
+def _describe_role_outcome(outcomes: List[Tuple[int, str]]) -> str:
+    if not outcomes:
+        return 'Your roles haven\'t changed.'
+
+    if len(outcomes) == 1:
+        role_id, adverb = outcomes[0]
+        return f'You {adverb} have the <@&{role_id}> role.'
+
+    # bundles and groups: one line per outcome, e.g. "You now have @A, @B." / "You no longer have @C."
+    mentions_by_adverb = {}
+    for role_id, adverb in outcomes:
+        mentions_by_adverb.setdefault(adverb, []).append(f'<@&{role_id}>')
+    return '\n'.join(f'You {adverb} have {", ".join(mentions)}.' for adverb, mentions in mentions_by_adverb.items())
+
+
+# one alert to bot-spam per tripped circuit breaker, rather than one per failed click
+async def _send_breaker_alert(state: BreakerState):
+    # give the storm a moment to build so the alert can say how bad it is
+    await asyncio.sleep(BREAKER_ALERT_WINDOW)
+    click_log.debug('🔌 Sending circuit breaker alert for role %s', state.role_id)
+    try:
+        called_from = ', '.join(sorted(state.jump_urls)) or 'an unknown message'
+        content = None
+        if state.reason == 'hierarchy':
+            description = f':warning: <@{bot.user.id}> does not have permission to manage <@&{state.role_id}>. Called from {called_from}.\n\n' \
+                           'Bot role is not high enough in role hierarchy to grant this role. **Please move the bot role higher or edit the offending button**.'
+            content = f'🔔 <@&{role_mod()}>: Button failed to grant role <@&{state.role_id}>'
+        else:
+            description = f':warning: <@{bot.user.id}> does not have permission to manage <@&{state.role_id}>. Called from {called_from}. **Bot role needs Manage Roles permission**.'
+
+        description += f'\n\n🔌 **{state.failures}** click(s) from **{len(state.member_ids)}** member(s) have failed since <t:{int(state.opened_at)}:R>. ' \
+                        'Clicks for this role are being answered without contacting Discord until the role hierarchy or the bot\'s roles change.'
+
+        embed = discord.Embed(
+            description=description,
+            color=EMBED_COLOUR_ERROR
+        )
+        if state.error:
+            embed.set_footer(text=state.error)
+        await spamchannel.send(content=content, embed=embed)
+    except Exception as e:
+        click_log.warning('Error notifying bot-spam: %s', e)
 
 
 """
@@ -218,19 +592,40 @@ class ButtonRoleBot(commands.Bot):
         intents.messages = True
         intents.guilds = True
 
-        super().__init__(command_prefix=commands.when_mentioned_or('🎢'), intents=intents, chunk_guilds_at_startup=False)
+        # http_trace lets us measure every request discord.py makes, per route and per traced interaction
+        super().__init__(command_prefix=commands.when_mentioned_or('🎢'), intents=intents, chunk_guilds_at_startup=False,
+                         http_trace=instrument_trace_config(http_stats.trace_config()))
 
     async def setup_hook(self) -> None:
 
         # For dynamic items, we must register the classes instead of the views.
-        self.add_dynamic_items(DynamicButton)
+        self.add_dynamic_items(DynamicButton, DynamicRoleSelect)
+
+        # read capacity counters now rather than on someone's click
+        role_capacity.load()
+
+        # pick up temporary roles from before the restart; anything already due goes as soon as we're ready
+        role_expiry.load()
+        role_expiry.start(self)
+
+        # measure event loop lag, and log whatever blocks it for too long
+        loop_watchdog.start()
+
+        # export how much the view store and editors are holding on to
+        register_memory_gauges(self)
+
+        # write interaction spans to DATA_DIR in the background
+        span_exporter.start()
+
+        # record role clicks for replaying offline, if asked to
+        interaction_recorder.start()
 
     async def on_ready(self):
         try:
             # TODO: this should be moved to an on_setup hook
-            print('-----')
-            print(f'{bot.user.name} version: {__version__} has connected to Discord!')
-            print('-----')
+            log.info('-----')
+            log.info('%s version: %s has connected to Discord!', bot.user.name, __version__)
+            log.info('-----')
             devchannel = bot.get_channel(channel_botdev())
             global spamchannel
             spamchannel = bot.get_channel(channel_botspam())
@@ -242,12 +637,74 @@ class ButtonRoleBot(commands.Bot):
             await devchannel.send(embed=embed)
 
         except Exception as e:
-            print(e)
+            log.error('%s', e)
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        interaction_recorder.record(interaction)
+
+    async def on_guild_available(self, guild: discord.Guild):
+        # (re)build our role index whenever a guild's full state arrives, including after reconnects
+        role_index.rebuild(guild)
+        bot_roles.rebuild(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        # we've left the guild or it's been deleted, so its roles would only go stale here
+        role_index.remove_guild(guild)
+        bot_roles.remove_guild(guild)
+
+    async def on_guild_role_create(self, role: discord.Role):
+        role_index.add(role)
+        bot_roles.rebuild(role.guild)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        role_index.add(after)
+        # only a change in position or managed status can change what we're able to manage
+        if before.position != after.position or before.managed != after.managed:
+            bot_roles.rebuild(after.guild)
+        # staff may have fixed whatever tripped our circuit breakers, so give them another go; a name or colour
+        # change elsewhere fixes nothing, and resetting on those would soon have us spending requests on 403s again
+        if before.position != after.position or before.managed != after.managed or before.permissions != after.permissions:
+            role_breaker.reset_all(f"role {after} was moved or its permissions changed")
+        else:
+            role_breaker.reset(after.id, f"role {after} was updated")
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        role_index.remove(role)
+        bot_roles.rebuild(role.guild)
+        role_capacity.untrack(role.id)
+        role_expiry.cancel_role(role.id)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # our own roles changed, so our place in the hierarchy may have too
+        if after.id == self.user.id and before.roles != after.roles:
+            bot_roles.rebuild(after.guild, after)
+            role_breaker.reset_all("bot roles changed")
+
+        # pick up roles given or taken by staff or other bots, so capacity-limited buttons stay accurate
+        if before._roles != after._roles:
+            role_capacity.reconcile(after)
+            role_expiry.reconcile(after)
+            # and keep any role changes we have queued for them from undoing these
+            role_actors.member_updated(after)
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        # members who leave free up their places
+        role_capacity.remove_member(payload.guild_id, payload.user.id)
+        role_expiry.cancel_member(payload.guild_id, payload.user.id)
+
+    async def close(self):
+        # don't lose the last few capacity changes on shutdown
+        await role_capacity.save()
+        role_expiry.flush()
+        loop_watchdog.stop()
+        span_exporter.flush()
+        interaction_recorder.flush()
+        await super().close()
 
     async def on_disconnect(self):
-        print('-----')
-        print(f'🔌ButtonRoleBot has disconnected from discord server, version: {__version__}.')
-        print('-----')
+        log.info('-----')
+        log.info('🔌ButtonRoleBot has disconnected from discord server, version: %s.', __version__)
+        log.info('-----')
 
 
 bot = ButtonRoleBot()
@@ -3,6 +3,12 @@ Our main Cog for BRB commands.
 
 """
 
+# libraries
+import asyncio
+import logging
+import os
+from typing import Optional
+
 # discord.py
 import discord
 from discord.ext import commands
@@ -13,11 +19,17 @@ from ptn.buttonrolebot.bot import bot
 # local constants
 from ptn.buttonrolebot._metadata import __version__
 import ptn.buttonrolebot.constants as constants
-from ptn.buttonrolebot.constants import role_council, role_mod
+from ptn.buttonrolebot.constants import role_council, role_mod, channel_botdev, PROFILE_MAX_DURATION
 
 # local modules
 # from ptn.buttonrolebot.modules.Embeds import None
 from ptn.buttonrolebot.modules.ErrorHandler import on_app_command_error
+from ptn.buttonrolebot.modules.Helpers import _migrate_legacy_buttons
+from ptn.buttonrolebot.modules.HttpStats import http_stats, LATENCY_SAMPLES
+from ptn.buttonrolebot.modules.MemoryStats import memory_tracer, process_rss, view_store_counts, editor_session_counts, format_bytes
+from ptn.buttonrolebot.modules.Profiler import profiler
+
+log = logging.getLogger(__name__)
 
 
 
@@ -29,7 +41,7 @@ returns: error message to user and log
 
 @bot.listen()
 async def on_command_error(ctx, error):
-    print(error)
+    log.warning('%s', error)
     if isinstance(error, commands.BadArgument):
         message=f'Bad argument: {error}'
 
@@ -87,7 +99,7 @@ class AdminCommands(commands.Cog):
     @commands.command(name='ping', aliases=['hello', 'ehlo', 'helo'], help='Use to check if BRB is online and responding.')
     @commands.has_any_role(*constants.any_elevated_role)
     async def ping(self, ctx):
-        print(f"{ctx.author} used PING in {ctx.channel.name}")
+        log.info('%s used PING in %s', ctx.author, ctx.channel.name)
         embed = discord.Embed(
             title="🟢 BUTTON ROLE BOT ONLINE",
             description=f"🎢<@{bot.user.id}> connected, version **{__version__}**.",
@@ -96,17 +108,179 @@ class AdminCommands(commands.Cog):
         await ctx.send(embed=embed)
 
 
+    # what Discord's API has been like to us: latency, status codes and rate limits, per route
+    @commands.command(name='http_stats', aliases=['http'], help='Show Discord API latency, errors and rate limits per route since startup.')
+    @commands.has_any_role(*constants.any_elevated_role)
+    async def api_stats(self, ctx, rows: int = 15):
+        log.info('%s used HTTP_STATS in %s', ctx.author, ctx.channel.name)
+        summary = http_stats.summary()
+        if not summary:
+            return await ctx.send("No requests to the Discord API recorded yet.")
+
+        def ms(seconds):
+            return '-' if seconds is None else f'{seconds * 1000:.0f}'
+
+        lines = [f"{'route':<44} {'reqs':>5} {'p50':>5} {'p95':>5} {'err':>4} {'429':>4} {'retry':>5} {'left':>7}"]
+        for method, route, stats in summary[:rows]:
+            errors = sum(count for status, count in stats.statuses.items() if (status >= 400 and status != 429) or status == 0)
+            bucket = '-' if stats.remaining is None else f'{stats.remaining}/{stats.limit or "?"}'
+            retry = '-' if stats.last_retry_after is None else f'{stats.last_retry_after:.1f}'
+            lines.append(f"{(method + ' ' + route)[:44]:<44} {stats.requests:>5} {ms(stats.percentile(0.5)):>5} "
+                         f"{ms(stats.percentile(0.95)):>5} {errors:>4} {stats.rate_limited:>4} {retry:>5} {bucket:>7}")
+
+        total = sum(stats.requests for method, route, stats in summary)
+        rate_limited = sum(stats.rate_limited for method, route, stats in summary)
+        embed = discord.Embed(
+            title="🚦 DISCORD API SINCE STARTUP",
+            description=f"**{total}** requests, **{rate_limited}** rate limited, since <t:{int(http_stats.started)}:R>. "
+                        f"Latencies in ms over each route's last {LATENCY_SAMPLES} requests; 'left' is the rate limit bucket's "
+                        f"remaining requests as of its last response.\n```\n" + '\n'.join(lines)[:3700] + "\n```",
+            color=constants.EMBED_COLOUR_QU
+        )
+        if len(summary) > rows:
+            embed.set_footer(text=f"Showing the {rows} busiest of {len(summary)} routes.")
+        await ctx.send(embed=embed)
+
+
+    # sample what the bot is spending its time on, without restarting it
+    @commands.command(name='profile', help='Profile the running bot for the given number of seconds (default 30), '
+                      'then post its hottest functions to the bot-dev channel. Optionally give how many to list (default 15).')
+    @commands.has_any_role(*constants.any_elevated_role)
+    async def profile(self, ctx, seconds: int = 30, top: int = 15):
+        log.info('%s used PROFILE in %s (seconds: %s, top: %s)', ctx.author, ctx.channel.name, seconds, top)
+        if not 1 <= seconds <= PROFILE_MAX_DURATION:
+            raise commands.BadArgument(f"Profile for between 1 and {PROFILE_MAX_DURATION} seconds.")
+        if profiler.running:
+            return await ctx.send("⏳ A profiling session is already running, wait for it to finish.")
+
+        await ctx.send(f"🔬 Profiling for **{seconds}** seconds, results will be posted in <#{channel_botdev()}>.")
+        result = await profiler.profile(seconds)
+        # writing the stacks out is blocking file I/O, so keep it off the event loop
+        path = await asyncio.to_thread(result.write)
+        log.info('🔬 Profile of %s samples saved to %s', result.samples, path)
+
+        summary = result.summary(top)
+        embed = discord.Embed(
+            title="🔬 PROFILE",
+            description=f"Started by {ctx.author.mention} <t:{int(result.started)}:R>. Percentages are of busy samples; "
+                        f"folded stacks saved to `{path}`.\n```\n" + summary[:3800] + "\n```",
+            color=constants.EMBED_COLOUR_QU
+        )
+        devchannel = bot.get_channel(channel_botdev())
+        if devchannel is None:
+            return await ctx.send(embed=embed)
+        await devchannel.send(embed=embed)
+        if ctx.channel.id != devchannel.id:
+            await ctx.send(f"🔬 Profile done: {devchannel.mention}")
+
+
+    # where the memory is going: view store and editor counts, and tracemalloc snapshots compared over time
+    @commands.command(name='memory', aliases=['mem'], help='Show memory use. "start" begins tracing allocations, "diff" '
+                      'shows what has grown since the last snapshot (optionally give how many lines, default 15), "stop" ends tracing.')
+    @commands.has_any_role(*constants.any_elevated_role)
+    async def memory(self, ctx, action: str = 'stats', top: int = 15):
+        log.info('%s used MEMORY in %s (action: %s)', ctx.author, ctx.channel.name, action)
+        action = action.lower()
+        rss = process_rss()
+        views = view_store_counts(bot)
+        editors = editor_session_counts()
+        description = f"RSS: **{format_bytes(rss) if rss is not None else 'unknown'}**\n" \
+                      f"View store: **{views['view']}** view(s), **{views['message_view']}** tied to messages, " \
+                      f"**{views['modal']}** modal(s), **{views['dynamic_item']}** dynamic item(s)\n" \
+                      f"Editor data in memory: **{editors['button']}** button, **{editors['embed']}** embed"
+
+        if action == 'start':
+            async with ctx.typing():
+                await memory_tracer.start()
+            description += "\n\n🔎 Tracing allocations; use `memory diff` to see what grows."
+
+        elif action == 'stop':
+            memory_tracer.stop()
+            description += "\n\n🔎 Stopped tracing allocations."
+
+        elif action == 'diff':
+            if not memory_tracer.running:
+                return await ctx.send("🔎 Memory tracing isn't running, use `memory start` first.")
+            async with ctx.typing():
+                stats, since, path = await memory_tracer.diff(top)
+            lines = [f"{format_bytes(stat.size_diff):>11} {stat.count_diff:>+7}  "
+                     f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}" for stat in stats]
+            log.info('🔎 Memory snapshot saved to %s', path)
+            description += f"\n\nGrowth since <t:{int(since)}:R>, by line (size, blocks), snapshot saved to `{path}`:\n```\n" + \
+                           '\n'.join(lines)[:3000] + "\n```"
+
+        elif action != 'stats':
+            raise commands.BadArgument(f"Unknown action '{action}', use start, diff or stop.")
+
+        if memory_tracer.running:
+            traced, peak = memory_tracer.traced()
+            description += f"\nTraced: **{format_bytes(traced)}** (peak **{format_bytes(peak)}**) since <t:{int(memory_tracer.started)}:R>"
+
+        embed = discord.Embed(
+            title="🧠 MEMORY",
+            description=description,
+            color=constants.EMBED_COLOUR_QU
+        )
+        await ctx.send(embed=embed)
+
+
     # command to sync interactions - must be done whenever the bot has appcommands added/removed
     @commands.command(name='sync', help='Synchronise BRB interactions with server')
     @commands.has_any_role(*constants.any_elevated_role)
     async def sync(self, ctx):
-        print(f"Interaction sync called from {ctx.author.display_name}")
+        log.info('Interaction sync called from %s', ctx.author.display_name)
         async with ctx.typing():
             try:
                 bot.tree.copy_global_to(guild=constants.guild_obj)
                 await bot.tree.sync(guild=constants.guild_obj)
-                print("Synchronised bot tree.")
+                log.info("Synchronised bot tree.")
                 await ctx.send("Synchronised bot tree.")
             except Exception as e:
-                print(f"Tree sync failed: {e}.")
-                return await ctx.send(f"Failed to sync bot tree: {e}")
\ No newline at end of file
+                log.warning('Tree sync failed: %s.', e)
+                return await ctx.send(f"Failed to sync bot tree: {e}")
+
+
+    # command to rewrite legacy role buttons to the current custom_id format
+    @commands.command(name='migrate_buttons', help='Rewrite role buttons made by older versions of BRB to the current format. '
+                      'Give a channel to migrate only that channel, otherwise every channel is checked. '
+                      'Optionally give how many recent messages to check per channel (default 100).')
+    @commands.has_any_role(*constants.any_elevated_role)
+    async def migrate_buttons(self, ctx, channel: Optional[discord.TextChannel] = None, limit: int = 100):
+        log.info('%s used MIGRATE_BUTTONS in %s (channel: %s, limit: %s)', ctx.author, ctx.channel.name, channel, limit)
+        channels = [channel] if channel else ctx.guild.text_channels
+        messages_migrated = 0
+        buttons_migrated = 0
+        failed = []
+
+        async with ctx.typing():
+            for target in channels:
+                if not target.permissions_for(ctx.guild.me).read_message_history:
+                    log.info("Skipping #%s: can't read message history", target.name)
+                    continue
+
+                async for message in target.history(limit=limit):
+                    if message.author.id != bot.user.id or not message.components:
+                        continue
+
+                    view, migrated = _migrate_legacy_buttons(message)
+                    if not migrated:
+                        continue
+
+                    try:
+                        log.info('▶ Migrating %s button(s) on %s', migrated, message.jump_url)
+                        await message.edit(view=view)
+                        messages_migrated += 1
+                        buttons_migrated += migrated
+                    except Exception as e:
+                        log.warning('Failed to migrate buttons on %s: %s', message.jump_url, e)
+                        failed.append(message.jump_url)
+
+        description = f"🔘 Migrated **{buttons_migrated}** button(s) on **{messages_migrated}** message(s) " \
+                      f"in {channel.mention if channel else f'**{len(channels)}** channel(s)'}."
+        if failed:
+            description += "\n\n❌ Couldn't migrate:\n" + "\n".join(failed[:20])
+        embed = discord.Embed(
+            description=description,
+            color=constants.EMBED_COLOUR_ERROR if failed else constants.EMBED_COLOUR_OK
+        )
+        await ctx.send(embed=embed)
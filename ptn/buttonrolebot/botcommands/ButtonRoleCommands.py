@@ -5,7 +5,7 @@ Our main Cog for BRB commands.
 
 # libraries
 import json
-import re
+import logging
 import traceback
 import uuid
 
@@ -29,13 +29,19 @@ from ptn.buttonrolebot.classes.EmbedData import EmbedData
 
 # local views
 from ptn.buttonrolebot.ui_elements.EmbedCreator import EmbedGenButtons, _edit_bot_embed
-from ptn.buttonrolebot.ui_elements.ButtonConfig import MasterCancelButton, MasterAddButton, MasterCommitButton, NewButton
+from ptn.buttonrolebot.ui_elements.ButtonConfig import MasterCancelButton, MasterAddButton, MasterCommitButton, NewButton, \
+    MasterAddMenuButton, _preview_component
 from ptn.buttonrolebot.ui_elements.ButtonRemove import ConfirmRemoveButtonsView
 
 # local modules
+from ptn.buttonrolebot.modules.CustomId import decode_custom_id, decode_select_custom_id
 from ptn.buttonrolebot.modules.ErrorHandler import on_app_command_error, GenericError, on_generic_error, CustomError
 from ptn.buttonrolebot.modules.Embeds import _generate_embed_from_dict, button_edit_heading_embed
 from ptn.buttonrolebot.modules.Helpers import check_roles, check_channel_permissions, _get_embed_from_message, _format_embed_dict
+from ptn.buttonrolebot.modules.Instrumentation import instrument_command
+from ptn.buttonrolebot.modules.RoleCache import role_index
+
+log = logging.getLogger(__name__)
 
 spamchannel = bot.get_channel(channel_botspam())
 
@@ -47,7 +53,7 @@ returns: error message to user and log
 
 @bot.listen()
 async def on_command_error(ctx, error):
-    print(error)
+    log.warning('%s', error)
     if isinstance(error, commands.BadArgument):
         message=f'Bad argument: {error}'
 
@@ -81,8 +87,9 @@ Uses @bot.tree instead of @command.tree
 @bot.tree.context_menu(name='Remove Buttons')
 @check_roles(any_elevated_role)
 @check_channel_permissions()
+@instrument_command('remove_buttons')
 async def remove_role_buttons(interaction: discord.Interaction, message: discord.Message):
-    print(f"Received Remove Buttons context interaction from {interaction.user} in {interaction.channel}")
+    log.debug('Received Remove Buttons context interaction from %s in %s', interaction.user, interaction.channel)
     # check message was sent by bot
     if not message.author == bot.user:
         try:
@@ -106,8 +113,9 @@ async def remove_role_buttons(interaction: discord.Interaction, message: discord
 @bot.tree.context_menu(name='Manage Role Buttons')
 @check_roles(any_elevated_role)
 @check_channel_permissions()
+@instrument_command('manage_role_buttons')
 async def manage_role_buttons(interaction: discord.Interaction, message: discord.Message):
-    print(f"Received Add Role Button context interaction from {interaction.user} in {interaction.channel}")
+    log.debug('Received Add Role Button context interaction from %s in %s', interaction.user, interaction.channel)
     # check message was sent by bot
     if not message.author == bot.user:
         try:
@@ -129,60 +137,92 @@ async def manage_role_buttons(interaction: discord.Interaction, message: discord
         embeds = [heading_embed, preview_embed]
 
         # send our preview
-        print("▶ Sending preview message...")
+        log.debug("▶ Sending preview message...")
         await interaction.response.send_message(embeds=embeds, ephemeral=True)
 
         # define empty list to hold our button_data instances
         buttons = []
 
-        role_id_pattern = r':role:(\d+):' # match our role ID 
-        action_pattern = r':action:(\w+)' # match our action
-
         # check if message has a view already
         if message.components:
-            print("⚠ Existing view found on message, adding its buttons to our edit view.")
+            log.info("Existing view found on message, adding its buttons to our edit view.")
             view = View.from_message(message)
             # use existing buttons to populate button_data and add to buttons
             for child in view.children:
                 if isinstance(child, discord.ui.Button):
-                    print(f"Found button: {child.emoji} {child.label} | {child.custom_id}")
+                    log.debug('Found button: %s %s | %s', child.emoji, child.label, child.custom_id)
                     unique_id = str(uuid.uuid4()) # generate a unique ID for each button_data instance
 
-                    # use re to extract role ID and action from custom ID
-                    match_role_id = re.search(role_id_pattern, child.custom_id)
-                    match_action = re.search(action_pattern, child.custom_id)
+                    # decode role ID and action from custom ID, in whichever format the button was made with
+                    decoded = decode_custom_id(child.custom_id) if child.custom_id else None
 
-                    role_id = int(match_role_id.group(1)) if match_role_id else None
-                    action = str(match_action.group(1)) if match_action else None
+                    role_ids = list(decoded.role_ids) if decoded else []
+                    action = decoded.action if decoded else None
 
-                    # resolve role on the server if possible
-                    role_object = None
-                    if role_id:
-                        try:
-                            role_object = discord.utils.get(interaction.guild.roles, id=role_id)
-                        except:
-                            print(f"No role object found for {role_id}")
-                            pass # we'll handle this on the button manager side
+                    # resolve roles on the server if possible
+                    role_objects = []
+                    for role_id in role_ids:
+                        role_object = role_index.get(interaction.guild, role_id)
+                        if role_object is None:
+                            log.debug('No role object found for %s', role_id)
+                            # we'll handle this on the button manager side
+                            role_objects = []
+                            break
+                        role_objects.append(role_object)
 
                     button_data_info_dict = {
                         'message': message,
                         'preview_message': interaction,
-                        'role_id': role_id,
-                        'role_object': role_object,
+                        'role_id': role_ids[0] if role_ids else None,
+                        'role_object': role_objects[0] if role_objects else None,
+                        'role_ids': role_ids,
+                        'role_objects': role_objects,
                         'button_label': child.label,
                         'button_emoji': child.emoji,
                         'button_row': child.row,
                         'button_style': child.style,
                         'unique_id': unique_id,
-                        'button_action': action
+                        'button_action': action,
+                        'exclusive_group': decoded.group if decoded else None,
+                        'required_role_ids': list(decoded.required) if decoded else [],
+                        'forbidden_role_ids': list(decoded.forbidden) if decoded else [],
+                        'capacity': decoded.capacity if decoded else 0,
+                        'duration': decoded.duration if decoded else 0
                     }
                     # generate button_data
-                    print("▶ Generating RoleButtonData instance from button.")
+                    log.debug("▶ Generating RoleButtonData instance from button.")
                     button_data = RoleButtonData(button_data_info_dict)
-                    print(button_data)
+                    log.debug('%s', button_data)
                     # append to our button list
                     buttons.append(button_data)
 
+                elif isinstance(child, discord.ui.Select) and decode_select_custom_id(child.custom_id):
+                    log.debug('Found role menu: %s | %s', child.placeholder, child.custom_id)
+
+                    # a menu's roles are its options' values
+                    role_objects = []
+                    for option in child.options:
+                        role_object = role_index.get(interaction.guild, int(option.value)) if option.value.isdigit() else None
+                        if role_object is None:
+                            log.debug('No role object found for menu option %s', option.value)
+                            continue # dropped from the menu; the user can re-add it if it was a mistake
+                        role_objects.append(role_object)
+
+                    button_data_info_dict = {
+                        'message': message,
+                        'preview_message': interaction,
+                        'button_label': child.placeholder,
+                        'button_emoji': None,
+                        'button_row': child.row,
+                        'unique_id': str(uuid.uuid4()),
+                        'component_type': 'select'
+                    }
+                    log.debug("▶ Generating RoleButtonData instance from menu.")
+                    button_data = RoleButtonData(button_data_info_dict)
+                    button_data.set_roles(role_objects)
+                    log.debug('%s', button_data)
+                    buttons.append(button_data)
+
         else:
             # create a default button_data instance to start us off
             button_data_info_dict = {
@@ -191,29 +231,30 @@ async def manage_role_buttons(interaction: discord.Interaction, message: discord
                 'role_id': None
             }
             button_data = RoleButtonData(button_data_info_dict)
-            print(button_data)
+            log.debug('%s', button_data)
 
-        print("⏳ Defining view...")
+        log.debug("⏳ Defining view...")
         view = View(timeout=None)
 
-        print(f'Buttons list: {buttons}')
+        log.debug('Buttons list: %s', buttons)
         if buttons:
             for button_data_instance in buttons:
-                button = NewButton(buttons, button_data_instance)
-                print(f"🔘 Generated button from set {button_data_instance.unique_id}")
+                button = _preview_component(buttons, button_data_instance)
+                log.debug('🔘 Generated button from set %s', button_data_instance.unique_id)
                 view.add_item(button)
 
         # add master buttons
         view.add_item(MasterCancelButton())
         view.add_item(MasterAddButton(buttons, button_data))
+        view.add_item(MasterAddMenuButton(buttons, button_data))
         if buttons:
             view.add_item(MasterCommitButton(buttons, button_data))
 
-        print("▶ Adding view to original response...")
+        log.debug("▶ Adding view to original response...")
         await interaction.edit_original_response(view=view)
 
     except Exception as e:
-        print(e)
+        log.error('%s', e)
         traceback.print_exc()
         try:
             raise GenericError(e)
@@ -225,15 +266,16 @@ async def manage_role_buttons(interaction: discord.Interaction, message: discord
 @bot.tree.context_menu(name='Edit Bot Embed')
 @check_roles(any_elevated_role)
 @check_channel_permissions()
+@instrument_command('edit_bot_embed')
 async def edit_bot_embed(interaction: discord.Interaction, message: discord.Message):
-    print(f"Received Edit Bot Embed context interaction from {interaction.user} in {interaction.channel}")
+    log.debug('Received Edit Bot Embed context interaction from %s in %s', interaction.user, interaction.channel)
 
     try:
 
         await _edit_bot_embed(interaction, message)
 
     except Exception as e:
-        print(e)
+        log.error('%s', e)
         traceback.print_exc()
         try:
             raise GenericError(e)
@@ -284,8 +326,9 @@ class ButtonRoleCommands(commands.Cog):
         )
     @check_roles(any_elevated_role)
     @check_channel_permissions()
+    @instrument_command('send_embed')
     async def _send_embed(self, interaction:  discord.Interaction):
-        print(f"{interaction.user.name} used /send_embed in {interaction.channel.name}")
+        log.info('%s used /send_embed in %s', interaction.user.name, interaction.channel.name)
 
         instruction_embed = discord.Embed(
             title='🎨 CREATING EMBED',
@@ -321,19 +364,20 @@ class ButtonRoleCommands(commands.Cog):
     )
     @check_roles(any_elevated_role)
     @check_channel_permissions()
+    @instrument_command('edit_embed')
     async def _edit_embed(self, interaction:  discord.Interaction, message_id: str):
-        print(f"{interaction.user.name} used /edit_embed in {interaction.channel.name}")
+        log.info('%s used /edit_embed in %s', interaction.user.name, interaction.channel.name)
         try:
             if 'discord' in message_id:
                 # we got a jumpurl. attempt to isolate the message ID
                 url_parts = message_id.split('/')
                 last_part = url_parts[-1]
                 message_id = int(last_part)
-                print(f"Message ID: {message_id}")
+                log.debug('Message ID: %s', message_id)
             else:
                 # try to convert it to an int
                 message_id = int(message_id)
-                print(f"Message ID: {message_id}")
+                log.debug('Message ID: %s', message_id)
 
             # try to fetch a discord message object
             try:
@@ -348,7 +392,7 @@ class ButtonRoleCommands(commands.Cog):
                 return
 
             else:
-                print(f"Fetched message object {message}")
+                log.debug('Fetched message object %s', message)
 
         except Exception as e:
             error = f"**Could not process input into a message**: ```{e}```"
@@ -1,8 +1,15 @@
 from ptn.buttonrolebot.constants import EMBED_COLOUR_PTN_DEFAULT, DEFAULT_EMBED_DESC
 import json
+import logging
+import weakref
+
+log = logging.getLogger(__name__)
 
 class EmbedData:
 
+    # every EmbedData still in memory, i.e. embed editors in progress, counted by the memory stats
+    instances = weakref.WeakSet()
+
     def __init__(self, info_dict=None):
         """
         Class represents an Embed object as returned from user input.
@@ -24,6 +31,7 @@ class EmbedData:
         self.embed_author_avatar_url = info_dict.get('embed_author_avatar_url', None)
         self.embed_color = info_dict.get('embed_color', EMBED_COLOUR_PTN_DEFAULT)
         self.embed_json = info_dict.get('embed_json', None)
+        EmbedData.instances.add(self)
 
 
     def to_dictionary(self):
@@ -49,7 +57,7 @@ class EmbedData:
             # Use setattr to set the attribute dynamically
             setattr(self, attribute_name, value)
         else:
-            print(f"⚠ Attribute '{attribute_name}' does not exist in EmbedData")
+            log.warning("⚠ Attribute '%s' does not exist in EmbedData", attribute_name)
 
 
     def __str__(self):
@@ -1,10 +1,19 @@
+# import libraries
+import logging
+import weakref
+
 # import discord so discord.ButtonStyle has meaning
 import discord
 # import our default button label
 from ptn.buttonrolebot.constants import DEFAULT_BUTTON_LABEL
 
+log = logging.getLogger(__name__)
+
 class RoleButtonData:
 
+    # every RoleButtonData still in memory, i.e. button editors in progress, counted by the memory stats
+    instances = weakref.WeakSet()
+
     def __init__(self, info_dict=None):
         """
         Class represents a RoleButtonData object as returned from user input.
@@ -20,13 +29,25 @@ class RoleButtonData:
         self.message = info_dict.get('message', None)
         self.role_id = info_dict.get('role_id', None)
         self.role_object = info_dict.get('role_object', None)
+        # every role the button manages; more than one makes it a bundle button. role_id/role_object are the first
+        self.role_ids = info_dict.get('role_ids', [self.role_id] if self.role_id else [])
+        self.role_objects = info_dict.get('role_objects', [self.role_object] if self.role_object else [])
         self.button_label = info_dict.get('button_label', DEFAULT_BUTTON_LABEL)
         self.button_emoji = info_dict.get('button_emoji', '👋')
         self.button_row = info_dict.get('button_row', 0)
         self.unique_id = info_dict.get('unique_id', None)
         self.button_style = info_dict.get('button_style', discord.ButtonStyle.secondary)
         self.button_action = info_dict.get('button_action', 'toggle')
+        self.exclusive_group = info_dict.get('exclusive_group', None)
+        # prerequisites: roles a member must all hold, and roles they must not hold, to use the button
+        self.required_role_ids = info_dict.get('required_role_ids', [])
+        self.forbidden_role_ids = info_dict.get('forbidden_role_ids', [])
+        self.capacity = info_dict.get('capacity', 0) # the most members who can hold the role, 0 for no limit
+        self.duration = info_dict.get('duration', 0) # seconds until a given role is taken away again, 0 to keep it
+        # 'button', or 'select' for a role select menu, which uses button_label as its placeholder
+        self.component_type = info_dict.get('component_type', 'button')
         self.preview_message = info_dict.get('preview_message', None)
+        RoleButtonData.instances.add(self)
 
     def to_dictionary(self):
         """
@@ -41,6 +62,41 @@ class RoleButtonData:
                 response[key] = value
         return response
 
+    def set_roles(self, roles):
+        """
+        Sets the role(s) the button manages, keeping role_id/role_object pointed at the first.
+
+        :param roles: A list of discord.Role
+        """
+        self.role_objects = list(roles)
+        self.role_ids = [role.id for role in self.role_objects]
+        self.role_object = self.role_objects[0] if self.role_objects else None
+        self.role_id = self.role_ids[0] if self.role_ids else None
+
+    def is_bundle(self):
+        """
+        Whether the button manages more than one role.
+        """
+        return len(self.role_ids) > 1
+
+    def is_select(self):
+        """
+        Whether this is a role select menu rather than a button.
+        """
+        return self.component_type == 'select'
+
+    def row_width(self):
+        """
+        How much of its row the component takes up: a select menu needs a row to itself.
+        """
+        return 5 if self.is_select() else 1
+
+    def role_mentions(self):
+        """
+        Mentions for every role the button manages, separated by commas.
+        """
+        return ', '.join(f'<@&{role_id}>' for role_id in self.role_ids)
+
     def get_button_style_name(self):
         """
         Formats discord.ButtonStyle into a form readable by normies 🤓
@@ -54,7 +110,7 @@ class RoleButtonData:
         }
 
         style = style_mapping.get(self.button_style, None)
-        print(f"Style is {style}")
+        log.debug('Style is %s', style)
 
         return style
         
@@ -65,10 +121,13 @@ class RoleButtonData:
 
         :rtype: str
         """
-        return 'RoleButtonData: message:{0.message} | role_id:{0.role_id} | ' \
+        return 'RoleButtonData: message:{0.message} | role_id:{0.role_id} | role_ids:{0.role_ids} | ' \
                'button_label:{0.button_label} | button_emoji:{0.button_emoji} | ' \
                'button_row:{0.button_row} | unique_id:{0.unique_id} | ' \
                'button_style:{0.button_style} | button_action:{0.button_action} | ' \
+               'exclusive_group:{0.exclusive_group} | component_type:{0.component_type} | ' \
+               'required_role_ids:{0.required_role_ids} | forbidden_role_ids:{0.forbidden_role_ids} | ' \
+               'capacity:{0.capacity} | duration:{0.duration} | ' \
                'preview_message:{0.preview_message}'.format(self)
 
     def __bool__(self):
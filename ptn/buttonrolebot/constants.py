@@ -72,6 +72,10 @@ EMBED_COLOUR_PTN_DEFAULT = 42971        # used by various embeds throughout the
 DEFAULT_BUTTON_LABEL = 'New Button'
 DEFAULT_BUTTON_LABELS = [DEFAULT_BUTTON_LABEL, 'Give Role Button', 'Take Role Button', 'Toggle Role Button']
 
+DEFAULT_SELECT_PLACEHOLDER = 'Choose your roles'
+
+EXCLUSIVE_GROUPS = ['1', '2', '3', '4'] # exclusive groups a message's buttons can be put in: members hold one group role at a time
+
 EMOJI_DONE = '🟢'
 EMOJI_NOT_DONE = '⭕'
 
@@ -142,6 +146,43 @@ EMBED_DICT_SCHEMA = [
     "timestamp"
 ]
 
+# role mutation pacing: Discord allows roughly 10 member edits per 10 seconds per guild
+ROLE_MUTATION_RATE = float(os.getenv('ROLE_BOT_ROLE_MUTATION_RATE', '1.0')) # sustained mutations per second
+ROLE_MUTATION_BURST = int(os.getenv('ROLE_BOT_ROLE_MUTATION_BURST', '10')) # mutations allowed back-to-back
+ROLE_MUTATION_CONCURRENCY = int(os.getenv('ROLE_BOT_ROLE_MUTATION_CONCURRENCY', '5')) # max mutations in flight
+CLICK_RATE_USER = float(os.getenv('ROLE_BOT_CLICK_RATE_USER', '0.5')) # sustained clicks per second per member, across all buttons
+CLICK_BURST_USER = int(os.getenv('ROLE_BOT_CLICK_BURST_USER', '6')) # clicks a member can make back-to-back
+CLICK_RATE_BUTTON = float(os.getenv('ROLE_BOT_CLICK_RATE_BUTTON', '0.2')) # sustained clicks per second per member on one button
+CLICK_BURST_BUTTON = int(os.getenv('ROLE_BOT_CLICK_BURST_BUTTON', '3')) # clicks a member can make back-to-back on one button
+CLICK_THROTTLE_MAX_BUCKETS = int(os.getenv('ROLE_BOT_CLICK_THROTTLE_MAX_BUCKETS', '10000')) # most click buckets kept in memory
+ROLE_MUTATION_ATTEMPTS = int(os.getenv('ROLE_BOT_ROLE_MUTATION_ATTEMPTS', '4')) # tries at a role mutation before giving up on a transient error
+ROLE_MUTATION_BACKOFF_BASE = 0.5 # seconds; retries wait a random time up to this, doubling each attempt
+ROLE_MUTATION_BACKOFF_MAX = 8 # seconds; the most a single retry waits
+CLICK_DEADLINE = int(os.getenv('ROLE_BOT_CLICK_DEADLINE', '30')) # seconds a click has to apply its change, on top of any expected queueing
+RESPONSE_DEADLINE = 2.0 # seconds after a click we'll wait for its role change before acknowledging it and editing later
+QUEUE_NOTICE_THRESHOLD = 3 # seconds of expected queueing before we tell a user how long they'll wait
+BREAKER_ALERT_WINDOW = 10 # seconds to collect failed clicks for a broken button before alerting bot-spam
+CAPACITY_FLUSH_DELAY = 2 # seconds to batch capacity counter changes before writing them to disk
+EXPIRY_FLUSH_DELAY = 2 # seconds to batch role expiry changes before writing them to disk
+EXPIRY_BATCH_SIZE = 50 # most expired roles removed per pass of the expiry scheduler
+EXPIRY_RETRY_DELAY = 60 # seconds before retrying a removal that failed for a reason that may pass
+EXPIRY_MAX_DURATION = 366 * 24 * 60 * 60 # longest a button can give a temporary role for, in seconds
+LOOP_WATCHDOG_INTERVAL = 0.25 # seconds between event loop lag measurements
+LOOP_STALL_THRESHOLD = float(os.getenv('ROLE_BOT_LOOP_STALL_THRESHOLD', '0.5')) # seconds the event loop can be blocked before we log what's blocking it
+LOOP_STALL_STACK_DEPTH = 25 # most frames logged from a blocked event loop's stack
+PROFILE_SAMPLE_INTERVAL = 0.005 # seconds between profiler samples of the event loop's stack
+PROFILE_STACK_DEPTH = 64 # most frames recorded per profiler sample
+PROFILE_MAX_DURATION = 300 # longest profiling session the profile command will run, in seconds
+MEMORY_TRACE_FRAMES = 10 # frames of traceback tracemalloc keeps per allocation while memory tracing is on
+TRACING_ENABLED = ast.literal_eval(os.getenv('ROLE_BOT_TRACING', 'False')) # whether to record interaction spans, which include member IDs, to DATA_DIR/traces
+TRACE_BUFFER_SIZE = 10000 # most finished spans held in memory waiting to be written; the oldest are dropped beyond this
+TRACE_EXPORT_INTERVAL = 5 # seconds between writes of finished spans to disk
+TRACE_FILE_MAX_BYTES = 10 * 1024 * 1024 # size at which the span file is rotated
+TRACE_FILE_BACKUPS = 5 # rotated span files kept
+RECORD_INTERACTIONS = ast.literal_eval(os.getenv('ROLE_BOT_RECORD_INTERACTIONS', 'False')) # whether to record anonymised role clicks to DATA_DIR/recordings, for replaying offline
+RECORDING_BUFFER_SIZE = 10000 # most recorded clicks held in memory waiting to be written; the oldest are dropped beyond this
+RECORDING_FLUSH_INTERVAL = 10 # seconds between writes of recorded clicks to disk
+
 # define constants based on prod or test environment
 def bot_guild():
   return PROD_DISCORD_GUILD if _production else TEST_DISCORD_GUILD
@@ -213,6 +254,9 @@ match loglevel_input:
     case 'ERROR':
         LOG_LEVEL = logging.ERROR
 
+    case 'WARNING':
+        LOG_LEVEL = logging.WARNING
+
     case 'INFO':
         LOG_LEVEL = logging.INFO
 
@@ -220,4 +264,8 @@ match loglevel_input:
         LOG_LEVEL = logging.DEBUG
 
     case _:
-        LOG_LEVEL = logging.INFO
\ No newline at end of file
+        LOG_LEVEL = logging.INFO
+
+LOG_FORMAT = os.getenv('ROLE_BOT_LOG_FORMAT', 'text').lower() # text, or json for one JSON object per line
+LOG_QUEUE_SIZE = 10000 # most log records waiting to be written; beyond this new records are dropped rather than wait
+LOG_CLICK_SAMPLE_RATE = float(os.getenv('ROLE_BOT_LOG_CLICK_SAMPLE_RATE', '1.0')) # fraction of role click log records kept below WARNING
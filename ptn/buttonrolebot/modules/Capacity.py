@@ -0,0 +1,313 @@
+"""
+Capacity.py
+
+Keeps count of how many members hold the role of each capacity-limited button, e.g. "10 wing slots".
+
+The bot doesn't chunk guild members, so it can't ask Discord how many members hold a role on every click. Instead
+each limited role gets a CapacityCounter of the members known to hold it: seeded from the member cache the first
+time the role is limited, updated by the click path whenever it gives or takes the role, and reconciled from
+member updates so changes made by staff or other bots are picked up too. Counters are persisted to SQLite in
+DATA_DIR so they survive restarts.
+
+Checking and reserving a slot happens in one synchronous step with no await in between, so on the single event
+loop two clicks can never both take the last slot. Writes to disk are batched and made shortly afterwards on a
+worker thread, from a snapshot of the changes, keeping the event loop free of I/O.
+
+Depends on: Constants, Metrics
+"""
+# import libraries
+import asyncio
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# import discord
+import discord
+
+# import local constants
+from ptn.buttonrolebot.constants import DATA_DIR, CAPACITY_FLUSH_DELAY
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_CAPACITY_EVENTS
+
+log = logging.getLogger(__name__)
+
+
+CAPACITY_DB_PATH = os.path.join(DATA_DIR, 'capacity.sqlite3')
+
+
+class CapacityCounter:
+
+    def __init__(self, role_id: int, guild_id: int, holders: Optional[Iterable[int]] = None):
+        """
+        Class represents the known holders of one capacity-limited role.
+
+        :param holders: IDs of members known to hold the role.
+        """
+        self.role_id = role_id
+        self.guild_id = guild_id
+        self.holders: Set[int] = set(holders or ())
+        self.reserved: Set[int] = set() # members with a give in progress, who count towards the total until it lands
+
+
+    @property
+    def count(self) -> int:
+        return len(self.holders) + len(self.reserved - self.holders)
+
+
+class CapacityTracker:
+
+    def __init__(self, path: str = CAPACITY_DB_PATH):
+        """
+        Class represents the capacity counters of every limited role, and their SQLite store.
+        """
+        self.path = path
+        self._counters: Dict[int, CapacityCounter] = {}
+        self._loaded = False
+        # changes waiting to be written: (role_id, member_id) -> whether they hold the role
+        self._dirty_holders: Dict[tuple, bool] = {}
+        self._dirty_roles: Dict[int, Optional[int]] = {} # role_id -> guild_id, or None once untracked
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._writing: Optional[asyncio.Task] = None
+
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE IF NOT EXISTS capacity_roles (role_id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS capacity_holders (role_id INTEGER NOT NULL, member_id INTEGER NOT NULL, '
+                           'PRIMARY KEY (role_id, member_id))')
+        return connection
+
+
+    def load(self):
+        """
+        Reads every counter from disk. Called lazily on first use.
+        """
+        self._loaded = True
+        try:
+            with self._connect() as connection:
+                for role_id, guild_id in connection.execute('SELECT role_id, guild_id FROM capacity_roles'):
+                    self._counters[role_id] = CapacityCounter(role_id, guild_id)
+                for role_id, member_id in connection.execute('SELECT role_id, member_id FROM capacity_holders'):
+                    counter = self._counters.get(role_id)
+                    if counter is not None:
+                        counter.holders.add(member_id)
+            connection.close()
+            log.info('🈵 Loaded %s capacity counter(s) from %s', len(self._counters), self.path)
+        except sqlite3.Error as e:
+            # we can still count from here on, we just won't know who already held a role before the restart
+            log.warning("⚠ Couldn't load capacity counters from %s: %s", self.path, e)
+
+
+    def get(self, role_id: int) -> Optional[CapacityCounter]:
+        if not self._loaded:
+            self.load()
+        return self._counters.get(role_id)
+
+
+    def track(self, role: discord.Role) -> CapacityCounter:
+        """
+        Returns the counter for a role, starting one if this is the first time it's been limited.
+
+        A new counter is seeded from the members we happen to have cached, which for a freshly created event
+        role is everyone; from then on it's kept up to date by clicks and member updates.
+        """
+        counter = self.get(role.id)
+        if counter is None:
+            counter = CapacityCounter(role.id, role.guild.id, (member.id for member in role.members))
+            self._counters[role.id] = counter
+            self._dirty_roles[role.id] = role.guild.id
+            for member_id in counter.holders:
+                self._dirty_holders[(role.id, member_id)] = True
+            log.info('🈵 Tracking capacity for %s, seeded with %s cached holder(s)', role, counter.count)
+            self._schedule_flush()
+        return counter
+
+
+    def untrack(self, role_id: int):
+        """
+        Forgets a role's counter, e.g. when the role is deleted.
+        """
+        if self.get(role_id) is not None:
+            del self._counters[role_id]
+            self._dirty_roles[role_id] = None
+            self._schedule_flush()
+
+
+    def try_reserve(self, role: discord.Role, member_id: int, capacity: int) -> bool:
+        """
+        Claims a slot for a member about to be given a limited role.
+
+        Must not be separated from the click that uses it by an await, or two clicks could claim the last slot.
+
+        :returns: False if the role is already at capacity. Members who already hold it always succeed.
+        """
+        counter = self.track(role)
+        if member_id in counter.holders or member_id in counter.reserved:
+            return True
+        if counter.count >= capacity:
+            ROLE_CAPACITY_EVENTS.labels(event='full').inc()
+            return False
+        counter.reserved.add(member_id)
+        ROLE_CAPACITY_EVENTS.labels(event='reserved').inc()
+        return True
+
+
+    def is_reserved(self, role_id: int, member_id: int) -> bool:
+        """
+        Whether a member has a place reserved that their click hasn't yet settled.
+        """
+        counter = self.get(role_id)
+        return counter is not None and member_id in counter.reserved
+
+
+    def release(self, role_id: int, member_id: int, holds: Optional[bool] = None):
+        """
+        Ends a member's reservation once their click has been applied (or has failed).
+
+        :param holds: Whether the member now holds the role, if known.
+        """
+        counter = self.get(role_id)
+        if counter is None:
+            return
+        counter.reserved.discard(member_id)
+        if holds is not None:
+            self._set_holder(counter, member_id, holds)
+
+
+    def _set_holder(self, counter: CapacityCounter, member_id: int, holds: bool):
+        if holds == (member_id in counter.holders):
+            return
+        if holds:
+            counter.holders.add(member_id)
+        else:
+            counter.holders.discard(member_id)
+        self._dirty_holders[(counter.role_id, member_id)] = holds
+        self._schedule_flush()
+
+
+    def reconcile(self, member: discord.Member):
+        """
+        Brings every counter in the member's guild up to date with the member's current roles.
+        """
+        if not self._loaded:
+            self.load()
+        if not self._counters:
+            return
+        role_ids = set(member._roles)
+        for counter in self._counters.values():
+            if counter.guild_id == member.guild.id:
+                self._set_holder(counter, member.id, counter.role_id in role_ids)
+
+
+    def remove_member(self, guild_id: int, member_id: int):
+        """
+        Frees any slots held by a member who has left the guild.
+        """
+        if not self._loaded:
+            self.load()
+        for counter in self._counters.values():
+            if counter.guild_id == guild_id:
+                counter.reserved.discard(member_id)
+                self._set_holder(counter, member_id, False)
+
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # not running under the bot, e.g. from a script
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(CAPACITY_FLUSH_DELAY, self._flush_in_background)
+
+
+    def _flush_in_background(self):
+        self._flush_handle = None
+        if self._writing is not None and not self._writing.done():
+            # one write at a time, so they land in order; these changes go in the next one
+            self._schedule_flush()
+            return
+        changes = self._take_changes()
+        if changes is not None:
+            self._writing = asyncio.create_task(self._write_in_thread(*changes), name='brb-capacity-flush')
+
+
+    async def _write_in_thread(self, dirty_holders: Dict[tuple, bool], dirty_roles: Dict[int, Optional[int]]):
+        # SQLite blocks, so the event loop hands it the snapshot and carries on
+        if not await asyncio.to_thread(self._write, dirty_holders, dirty_roles):
+            self._restore_changes(dirty_holders, dirty_roles)
+
+
+    async def save(self):
+        """
+        Waits for any write in progress, then writes every change since, e.g. on shutdown.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._writing is not None:
+            await self._writing
+            self._writing = None
+        changes = self._take_changes()
+        if changes is not None:
+            await self._write_in_thread(*changes)
+
+
+    def flush(self):
+        """
+        Writes every change since the last flush to disk, blocking. For use outside the event loop.
+        """
+        self._flush_handle = None
+        changes = self._take_changes()
+        if changes is not None and not self._write(*changes):
+            self._restore_changes(*changes)
+
+
+    def _take_changes(self) -> Optional[Tuple[Dict[tuple, bool], Dict[int, Optional[int]]]]:
+        # swap the changes out, so new ones can be recorded while these are written
+        if not self._dirty_holders and not self._dirty_roles:
+            return None
+        dirty_holders, self._dirty_holders = self._dirty_holders, {}
+        dirty_roles, self._dirty_roles = self._dirty_roles, {}
+        # no need to save holders of roles we've stopped tracking since
+        dirty_holders = {key: holds for key, holds in dirty_holders.items() if not holds or key[0] in self._counters}
+        return dirty_holders, dirty_roles
+
+
+    def _restore_changes(self, dirty_holders: Dict[tuple, bool], dirty_roles: Dict[int, Optional[int]]):
+        # keep the changes for next time, without overwriting anything newer
+        self._dirty_holders = {**dirty_holders, **self._dirty_holders}
+        self._dirty_roles = {**dirty_roles, **self._dirty_roles}
+
+
+    def _write(self, dirty_holders: Dict[tuple, bool], dirty_roles: Dict[int, Optional[int]]) -> bool:
+        """
+        Writes a snapshot of changes to disk. Touches nothing but its arguments, so it's safe on a worker thread.
+
+        :returns: Whether the changes were saved.
+        """
+        try:
+            with self._connect() as connection:
+                connection.executemany('INSERT OR REPLACE INTO capacity_roles (role_id, guild_id) VALUES (?, ?)',
+                                       [(role_id, guild_id) for role_id, guild_id in dirty_roles.items() if guild_id is not None])
+                removed_roles = [(role_id,) for role_id, guild_id in dirty_roles.items() if guild_id is None]
+                connection.executemany('DELETE FROM capacity_roles WHERE role_id = ?', removed_roles)
+                connection.executemany('DELETE FROM capacity_holders WHERE role_id = ?', removed_roles)
+                connection.executemany('INSERT OR IGNORE INTO capacity_holders (role_id, member_id) VALUES (?, ?)',
+                                       [key for key, holds in dirty_holders.items() if holds])
+                connection.executemany('DELETE FROM capacity_holders WHERE role_id = ? AND member_id = ?',
+                                       [key for key, holds in dirty_holders.items() if not holds])
+            connection.close()
+            return True
+        except sqlite3.Error as e:
+            log.warning("⚠ Couldn't save capacity counters to %s: %s", self.path, e)
+            return False
+
+
+# the capacity counters shared by every button
+role_capacity = CapacityTracker()
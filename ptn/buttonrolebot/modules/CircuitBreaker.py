@@ -0,0 +1,125 @@
+"""
+CircuitBreaker.py
+
+Stops a misconfigured button from turning every click into a failure storm.
+
+When the bot can't manage a button's role - because its role sits too low in the hierarchy, or Discord answers
+with Forbidden - the RoleCircuitBreaker opens for that role. While it's open, clicks are answered straight away
+from the cached error without touching Discord, and are only counted so that a single aggregated alert can be
+sent to bot-spam. All breakers close again whenever the role hierarchy or the bot's own roles change, since
+that's how staff fix the problem.
+
+Depends on: Metrics
+"""
+# import libraries
+import logging
+import time
+from typing import Dict, Optional, Set
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_BREAKER_EVENTS
+
+log = logging.getLogger(__name__)
+
+
+class BreakerState:
+
+    def __init__(self, role_id: int, reason: str, user_message: str, jump_url: Optional[str], error=None):
+        """
+        Class represents an open breaker for a single role.
+
+        :param reason: 'hierarchy' or 'forbidden'
+        :param user_message: The error shown to users clicking a button for this role.
+        :param jump_url: The message the first failing click came from.
+        :param error: The exception that opened the breaker, if any.
+        """
+        self.role_id = role_id
+        self.reason = reason
+        self.user_message = user_message
+        self.error = error
+        self.opened_at = time.time()
+        self.jump_urls: Set[str] = {jump_url} if jump_url else set()
+        self.member_ids: Set[int] = set()
+        self.failures = 0
+
+
+    def record(self, member_id: int, jump_url: Optional[str]):
+        """
+        Counts a click that failed (or was short-circuited) because of this breaker.
+        """
+        self.failures += 1
+        self.member_ids.add(member_id)
+        if jump_url:
+            self.jump_urls.add(jump_url)
+
+
+class RoleCircuitBreaker:
+
+    def __init__(self):
+        """
+        Class represents the open breakers, keyed by role ID.
+        """
+        self._open: Dict[int, BreakerState] = {}
+
+
+    def get(self, role_id: int) -> Optional[BreakerState]:
+        """
+        Returns the open breaker for a role, or None if clicks for it should go ahead.
+        """
+        return self._open.get(role_id)
+
+
+    def trip(self, role_id: int, reason: str, user_message: str, member_id: int, jump_url: Optional[str] = None,
+             error=None) -> bool:
+        """
+        Records a failure for a role, opening its breaker if it isn't already.
+
+        :returns: True if this call opened the breaker, i.e. the caller should arrange the alert.
+        """
+        state = self._open.get(role_id)
+        opened = state is None
+        if opened:
+            log.warning('🔌 Opening circuit breaker for role %s (%s)', role_id, reason)
+            state = BreakerState(role_id, reason, user_message, jump_url, error)
+            self._open[role_id] = state
+            ROLE_BREAKER_EVENTS.labels(event='opened').inc()
+        state.record(member_id, jump_url)
+        return opened
+
+
+    def short_circuit(self, role_id: int, member_id: int, jump_url: Optional[str] = None) -> Optional[BreakerState]:
+        """
+        Checks for an open breaker for this role, counting the click against it if there is one.
+        """
+        state = self._open.get(role_id)
+        if state is not None:
+            state.record(member_id, jump_url)
+            ROLE_BREAKER_EVENTS.labels(event='short_circuited').inc()
+        return state
+
+
+    def reset(self, role_id: int, reason: str):
+        """
+        Closes a role's breaker, if it's open, e.g. because the role itself was edited.
+        """
+        if self._open.pop(role_id, None) is not None:
+            log.info('🔌 Closing circuit breaker for role %s: %s', role_id, reason)
+            ROLE_BREAKER_EVENTS.labels(event='reset').inc()
+
+
+    def reset_all(self, reason: str):
+        """
+        Closes every open breaker, e.g. because the role hierarchy changed.
+        """
+        if self._open:
+            log.info('🔌 Closing %s circuit breaker(s): %s', len(self._open), reason)
+            ROLE_BREAKER_EVENTS.labels(event='reset').inc(len(self._open))
+            self._open.clear()
+
+
+    def __len__(self):
+        return len(self._open)
+
+
+# the breaker used by role buttons
+role_breaker = RoleCircuitBreaker()
@@ -0,0 +1,88 @@
+"""
+ClickThrottle.py
+
+Stops members spam-clicking role buttons from using up the role mutation budget everyone shares.
+
+Each member has a token bucket for all their clicks, plus one per button they click, so they can work through a
+message of buttons quickly but can't hammer any one of them. Buckets live in an LRU-bounded map: members who
+stop clicking are eventually evicted, by which time their bucket would have refilled anyway.
+
+Depends on: Constants, Metrics, RoleScheduler
+"""
+# import libraries
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# import local constants
+from ptn.buttonrolebot.constants import CLICK_RATE_USER, CLICK_BURST_USER, CLICK_RATE_BUTTON, CLICK_BURST_BUTTON, \
+    CLICK_THROTTLE_MAX_BUCKETS
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_CLICKS_THROTTLED
+from ptn.buttonrolebot.modules.RoleScheduler import TokenBucket
+
+
+class BucketMap:
+
+    def __init__(self, rate: float, burst: int, max_buckets: int):
+        """
+        Class represents token buckets keyed by anything hashable, keeping only the most recently used.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets: 'OrderedDict[Hashable, TokenBucket]' = OrderedDict()
+
+
+    def get(self, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ClickThrottle:
+
+    def __init__(self):
+        """
+        Class represents the per-member and per-member-per-button click limits.
+        """
+        self.users = BucketMap(CLICK_RATE_USER, CLICK_BURST_USER, CLICK_THROTTLE_MAX_BUCKETS)
+        self.buttons = BucketMap(CLICK_RATE_BUTTON, CLICK_BURST_BUTTON, CLICK_THROTTLE_MAX_BUCKETS)
+
+
+    def check(self, member_id: int, custom_id: str) -> Optional[float]:
+        """
+        Counts a click against the member's limits.
+
+        :returns: None if the click can go ahead, otherwise the seconds until it could.
+        """
+        user_bucket = self.users.get(member_id)
+        button_bucket = self.buttons.get((member_id, custom_id))
+
+        # only take from either bucket once we know both allow it
+        wait = user_bucket.time_until_available()
+        if wait > 0:
+            ROLE_CLICKS_THROTTLED.labels(scope='user').inc()
+            return wait
+        wait = button_bucket.time_until_available()
+        if wait > 0:
+            ROLE_CLICKS_THROTTLED.labels(scope='button').inc()
+            return wait
+
+        user_bucket.try_acquire()
+        button_bucket.try_acquire()
+        return None
+
+
+# the click limits shared by every role component
+click_throttle = ClickThrottle()
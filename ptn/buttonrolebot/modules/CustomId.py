@@ -0,0 +1,222 @@
+"""
+CustomId.py
+
+Encodes and decodes the custom_ids of role buttons.
+
+Everything a role button needs to know is stored in its custom_id, which Discord caps at 100 characters.
+
+v1 (current):  b1:<action>:<message_id>:<role_id>[.<role_id>...][:<option>...]
+               IDs are base 36, action is a single character (see ACTION_CODES)
+               bundle buttons list several role IDs separated by dots
+               options are a single-letter key followed by its value (see OPTION_KEYS)
+               e.g. b1:x:8m3a1d0hzbk0:8kyw6b9wuv28 or b1:g:8m3a1d0hzbk0:8kyw6b9wuv28.8kyw6cj2kqyo:e1:r8kyw6cj2kqyo:c10:d86400
+legacy:        button:role:<role_id>:message:<message_id>:action:<action>
+               IDs are decimal, action is spelled out
+
+Role select menus can offer up to 25 roles, far more than fit in a custom_id, so their roles are kept in the
+options' values instead (which come back with every interaction) and the custom_id only identifies the menu:
+
+menus:         s1:<message_id>:<index>
+               message ID is base 36, index tells apart several menus on one message
+
+Buttons in either format keep working; legacy buttons can be rewritten to v1 with the migrate_buttons command.
+
+Depends on: none
+"""
+# import libraries
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple, Union
+
+
+CUSTOM_ID_VERSION = 1
+CUSTOM_ID_PREFIX = f'b{CUSTOM_ID_VERSION}'
+LEGACY_CUSTOM_ID_PREFIX = 'button:role:'
+
+ACTION_CODES = {
+    'give': 'g',
+    'take': 't',
+    'toggle': 'x'
+}
+ACTION_NAMES = {code: action for action, code in ACTION_CODES.items()}
+
+# matched by discord.py against every component interaction, so kept as simple as possible;
+# the actual parsing is done by decode_custom_id
+CUSTOM_ID_TEMPLATE = r'b1:[gtx]:[0-9a-z]+:[0-9a-z]+(?:\.[0-9a-z]+)*(?::[a-z][0-9a-z.]*)*|button:role:[0-9]+:message:[0-9]+:action:[a-z]+'
+
+SELECT_CUSTOM_ID_PREFIX = f's{CUSTOM_ID_VERSION}'
+SELECT_CUSTOM_ID_TEMPLATE = r's1:[0-9a-z]+:[0-9]+'
+MAX_SELECT_OPTIONS = 25 # Discord's limit
+
+# optional fields after the role IDs, keyed by a single letter
+OPTION_KEYS = {
+    'group': 'e', # exclusive group: only one button's role(s) in the group can be held at a time
+    'required': 'r', # role IDs the member must all hold to use the button
+    'forbidden': 'n', # role IDs the member must not hold any of to use the button
+    'capacity': 'c', # the most members who can hold the button's role, in decimal
+    'duration': 'd' # seconds until a given role is taken away again, in decimal
+}
+
+CUSTOM_ID_MAX_LENGTH = 100
+# the most roles a bundle button can hold: five 13-character IDs always fit in 100 characters, even once
+# snowflakes outgrow today's 12 base 36 characters
+MAX_BUNDLE_ROLES = 5
+
+BASE36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# a server only has so many buttons, and the same few get clicked over and over, so parsing and
+# formatting is done once per custom_id rather than once per click
+CUSTOM_ID_CACHE_SIZE = 4096
+
+
+class DecodedCustomId(NamedTuple):
+    """
+    Class represents what a role button's custom_id tells us. Immutable, so cached instances can be shared.
+    """
+    version: int
+    action: str
+    role_ids: Tuple[int, ...]
+    message_id: int
+    group: Optional[str] = None
+    required: Tuple[int, ...] = ()
+    forbidden: Tuple[int, ...] = ()
+    capacity: int = 0 # 0 for no limit
+    duration: int = 0 # 0 for permanent roles
+
+    @property
+    def role_id(self) -> int:
+        """
+        The button's first (for most buttons, only) role.
+        """
+        return self.role_ids[0]
+
+    @property
+    def is_bundle(self) -> bool:
+        return len(self.role_ids) > 1
+
+
+def to_base36(number: int) -> str:
+    """
+    Formats a non-negative int in lowercase base 36.
+    """
+    if number == 0:
+        return '0'
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append(BASE36_DIGITS[remainder])
+    return ''.join(reversed(digits))
+
+
+class DecodedSelectCustomId(NamedTuple):
+    """
+    Class represents what a role select menu's custom_id tells us.
+    """
+    message_id: int
+    index: int
+
+
+@lru_cache(maxsize=CUSTOM_ID_CACHE_SIZE)
+def encode_custom_id(action: str, role_ids: Union[int, Tuple[int, ...]], message_id: int,
+                     group: Optional[str] = None, required: Tuple[int, ...] = (), forbidden: Tuple[int, ...] = (),
+                     capacity: int = 0, duration: int = 0) -> str:
+    """
+    Returns the current-format custom_id for a role button.
+
+    :param role_ids: The button's role ID, or a tuple of role IDs for a bundle button.
+    :param group: The exclusive group the button belongs to, if any.
+    :param required: Role IDs a member must all hold to use the button.
+    :param forbidden: Role IDs a member must not hold any of to use the button.
+    :param capacity: The most members who can hold the button's (first) role, or 0 for no limit.
+    :param duration: Seconds after which roles given by the button are taken away again, or 0 to keep them.
+    :raises ValueError: If the button has too many roles to fit in a custom_id.
+    """
+    if isinstance(role_ids, int):
+        role_ids = (role_ids,)
+    if not 1 <= len(role_ids) <= MAX_BUNDLE_ROLES:
+        raise ValueError(f"A role button must have between 1 and {MAX_BUNDLE_ROLES} roles, not {len(role_ids)}")
+    roles = '.'.join(to_base36(role_id) for role_id in role_ids)
+    custom_id = f'{CUSTOM_ID_PREFIX}:{ACTION_CODES[action]}:{to_base36(message_id)}:{roles}'
+    if group:
+        custom_id += f':{OPTION_KEYS["group"]}{group}'
+    if required:
+        custom_id += f':{OPTION_KEYS["required"]}' + '.'.join(to_base36(role_id) for role_id in required)
+    if forbidden:
+        custom_id += f':{OPTION_KEYS["forbidden"]}' + '.'.join(to_base36(role_id) for role_id in forbidden)
+    if capacity:
+        custom_id += f':{OPTION_KEYS["capacity"]}{capacity}'
+    if duration:
+        custom_id += f':{OPTION_KEYS["duration"]}{duration}'
+    if len(custom_id) > CUSTOM_ID_MAX_LENGTH:
+        raise ValueError(f"Too many roles for one button: its custom_id would be {len(custom_id)} characters, "
+                         f"but Discord allows {CUSTOM_ID_MAX_LENGTH}")
+    return custom_id
+
+
+def is_legacy_custom_id(custom_id: str) -> bool:
+    """
+    Whether a custom_id is a role button in the legacy format.
+    """
+    return custom_id.startswith(LEGACY_CUSTOM_ID_PREFIX)
+
+
+def _decode_role_list(value: Optional[str]) -> Tuple[int, ...]:
+    # dot-separated base 36 role IDs, as used by options
+    if not value:
+        return ()
+    return tuple(int(role_id, 36) for role_id in value.split('.'))
+
+
+@lru_cache(maxsize=CUSTOM_ID_CACHE_SIZE)
+def decode_custom_id(custom_id: str) -> Optional[DecodedCustomId]:
+    """
+    Parses a role button custom_id in any supported format.
+
+    :returns: A DecodedCustomId, or None if this isn't a role button.
+    """
+    parts = custom_id.split(':')
+    try:
+        if parts[0] == CUSTOM_ID_PREFIX and len(parts) >= 4:
+            role_ids = tuple(int(role_id, 36) for role_id in parts[3].split('.'))
+            # options we don't know about are ignored, so older versions can still read newer buttons
+            options = {part[0]: part[1:] for part in parts[4:] if part}
+            return DecodedCustomId(CUSTOM_ID_VERSION, ACTION_NAMES[parts[1]], role_ids, int(parts[2], 36),
+                                   group=options.get(OPTION_KEYS['group']) or None,
+                                   required=_decode_role_list(options.get(OPTION_KEYS['required'])),
+                                   forbidden=_decode_role_list(options.get(OPTION_KEYS['forbidden'])),
+                                   capacity=int(options.get(OPTION_KEYS['capacity']) or 0),
+                                   duration=int(options.get(OPTION_KEYS['duration']) or 0))
+
+        if len(parts) == 7 and parts[0] == 'button' and parts[1] == 'role':
+            # legacy buttons treated any action other than give or take as a toggle, so keep doing that
+            action = parts[6] if parts[6] in ACTION_CODES else 'toggle'
+            return DecodedCustomId(0, action, (int(parts[2]),), int(parts[4]))
+
+    except (KeyError, ValueError):
+        pass
+
+    return None
+
+
+def encode_select_custom_id(message_id: int, index: int = 0) -> str:
+    """
+    Returns the custom_id for a role select menu.
+
+    :param index: Distinguishes several menus on the same message.
+    """
+    return f'{SELECT_CUSTOM_ID_PREFIX}:{to_base36(message_id)}:{index}'
+
+
+@lru_cache(maxsize=CUSTOM_ID_CACHE_SIZE)
+def decode_select_custom_id(custom_id: str) -> Optional[DecodedSelectCustomId]:
+    """
+    Parses a role select menu custom_id.
+
+    :returns: A DecodedSelectCustomId, or None if this isn't a role select menu.
+    """
+    parts = custom_id.split(':')
+    if len(parts) != 3 or parts[0] != SELECT_CUSTOM_ID_PREFIX:
+        return None
+    try:
+        return DecodedSelectCustomId(int(parts[1], 36), int(parts[2]))
+    except ValueError:
+        return None
@@ -1,28 +1,80 @@
 """
-Module to return formatted date strings.
+Module to return formatted date strings, and to parse and format durations.
 
 Depends on: none
 """
 
 # import libraries
 from datetime import datetime
+import logging
+import re
 import time
 
+log = logging.getLogger(__name__)
+
 
 # get date and time
 def get_formatted_date_string():
-    print("Called get_formatted_date_string")
+    log.debug("Called get_formatted_date_string")
     """
     Returns a tuple of the Elite Dangerous Time and the current real world time.
 
     :rtype: tuple
     """
     posix_time_string = int(time.time())
-    print(f"POSIX time is {posix_time_string}")
+    log.debug('POSIX time is %s', posix_time_string)
 
     dt_now = datetime.utcnow()
 
     current_time_string = dt_now.strftime("%Y%m%d_%H%M%S")
-    print(f"Current time string: {current_time_string}")
+    log.debug('Current time string: %s', current_time_string)
 
     return current_time_string, posix_time_string
+
+
+# units understood in durations, largest first
+DURATION_UNITS = {
+    'w': 7 * 24 * 60 * 60,
+    'd': 24 * 60 * 60,
+    'h': 60 * 60,
+    'm': 60,
+    's': 1
+}
+DURATION_PATTERN = re.compile(r'\s*(\d+)\s*([wdhms])', re.IGNORECASE)
+
+
+# turn e.g. "24h", "90m" or "1d 12h" into seconds
+def parse_duration(duration_string: str) -> int:
+    """
+    Parses a duration made of whole numbers of weeks, days, hours, minutes and seconds.
+
+    :param duration_string: e.g. "24h", "90m", "1d12h" or "1w 2d"
+    :returns: The duration in seconds.
+    :raises ValueError: If the string isn't a duration.
+    """
+    seconds = 0
+    position = 0
+    for match in DURATION_PATTERN.finditer(duration_string):
+        if match.start() != position:
+            break
+        seconds += int(match[1]) * DURATION_UNITS[match[2].lower()]
+        position = match.end()
+
+    if position == 0 or duration_string[position:].strip():
+        raise ValueError(f"{duration_string!r} isn't a duration. Use e.g. 30m, 24h or 1d12h.")
+    return seconds
+
+
+# turn seconds back into e.g. "1d 12h"
+def format_duration(seconds: int) -> str:
+    """
+    Formats a number of seconds using the same units parse_duration understands.
+
+    :rtype: str
+    """
+    parts = []
+    for unit, unit_seconds in DURATION_UNITS.items():
+        count, seconds = divmod(int(seconds), unit_seconds)
+        if count:
+            parts.append(f'{count}{unit}')
+    return ' '.join(parts) or '0s'
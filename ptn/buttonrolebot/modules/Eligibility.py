@@ -0,0 +1,108 @@
+"""
+Eligibility.py
+
+Prerequisite rules for role buttons, e.g. "must have Verified" or "must not have Muted".
+
+Every role that appears in a rule gets a bit, handed out once and never reused. A button's rule is compiled (once
+per distinct rule) into two integers: the bits the member must all hold and the bits they must not hold. Checking
+a click looks up just the rule's own roles among the member's, then takes a couple of bitwise operations, which
+lets ineligible clicks be turned away before anything is sent to Discord.
+
+Depends on: none
+"""
+# import libraries
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+# import discord
+import discord
+
+
+class RoleBitIndex:
+
+    def __init__(self):
+        """
+        Class represents the assignment of a bit position to each role ID.
+
+        Bits are never reassigned, so compiled rules stay valid for the life of the process.
+        """
+        self._bits: Dict[int, int] = {}
+
+
+    def bit(self, role_id: int) -> int:
+        """
+        Returns the bit position for a role ID, assigning the next free one if it hasn't got one yet.
+        """
+        bit = self._bits.get(role_id)
+        if bit is None:
+            bit = len(self._bits)
+            self._bits[role_id] = bit
+        return bit
+
+
+    def mask(self, role_ids: Iterable[int]) -> int:
+        """
+        Returns the bitset for a collection of role IDs.
+        """
+        mask = 0
+        for role_id in role_ids:
+            mask |= 1 << self.bit(role_id)
+        return mask
+
+
+    def __len__(self):
+        return len(self._bits)
+
+
+# the bit index rules are compiled against
+role_bits = RoleBitIndex()
+
+
+class EligibilityRule(NamedTuple):
+    """
+    Class represents a compiled prerequisite rule.
+    """
+    required: int # bits the member must all hold
+    forbidden: int # bits the member must not hold any of
+    required_ids: Tuple[int, ...]
+    forbidden_ids: Tuple[int, ...]
+    checked: Tuple[Tuple[int, int], ...] # (role ID, its bit) for every role the rule looks at
+
+    def allows(self, member_mask: int) -> bool:
+        return member_mask & self.required == self.required and not member_mask & self.forbidden
+
+    def missing(self, member_mask: int) -> Tuple[int, ...]:
+        """
+        The required role IDs the member doesn't hold. Only needed to explain a rejection.
+        """
+        return tuple(role_id for role_id in self.required_ids if not member_mask & (1 << role_bits.bit(role_id)))
+
+    def blocking(self, member_mask: int) -> Tuple[int, ...]:
+        """
+        The forbidden role IDs the member holds. Only needed to explain a rejection.
+        """
+        return tuple(role_id for role_id in self.forbidden_ids if member_mask & (1 << role_bits.bit(role_id)))
+
+
+@lru_cache(maxsize=1024)
+def compile_rule(required_ids: Tuple[int, ...], forbidden_ids: Tuple[int, ...]) -> EligibilityRule:
+    """
+    Compiles a button's prerequisites into bitsets.
+    """
+    checked = tuple((role_id, 1 << role_bits.bit(role_id)) for role_id in dict.fromkeys(required_ids + forbidden_ids))
+    return EligibilityRule(role_bits.mask(required_ids), role_bits.mask(forbidden_ids), required_ids, forbidden_ids,
+                           checked)
+
+
+def member_mask(member: discord.Member, rule: EligibilityRule) -> int:
+    """
+    Returns the bitset of those of a member's roles that a rule looks at.
+    """
+    # the raw role IDs, a sorted list searched by bisection, rather than member.roles, which looks up and sorts
+    # every Role object
+    roles = member._roles
+    mask = 0
+    for role_id, bit in rule.checked:
+        if roles.has(role_id):
+            mask |= bit
+    return mask
@@ -9,6 +9,7 @@ Error Handling should be dealt with from calling functions
 """
 # import libraries
 import json
+import logging
 import random
 
 # import discord
@@ -21,57 +22,62 @@ from ptn.buttonrolebot.constants import EMBED_COLOUR_OK, EMBED_COLOUR_QU, \
 from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
 from ptn.buttonrolebot.classes.EmbedData import EmbedData
 
+from ptn.buttonrolebot.modules.CustomId import MAX_BUNDLE_ROLES
+from ptn.buttonrolebot.modules.DateString import format_duration
+
+log = logging.getLogger(__name__)
+
 
 # convert hex color to int
 async def _color_hex_to_int(color_input):
-    print(color_input)
+    log.debug('%s', color_input)
     if type(color_input) != int:
         color_input = str(color_input)
         if color_input.startswith('#'): # check if we have an HTML color code
-            print(f"Received web color code with #: {color_input}, stripping leading #...")
+            log.debug('Received web color code with #: %s, stripping leading #...', color_input)
             color_input = color_input.lstrip('#')
-            print(f"New value: {color_input}")
+            log.debug('New value: %s', color_input)
 
         color_int = int(color_input, 16)  # Convert hex string to integer
-        print(f'Converted {color_input} to {color_int}')
+        log.debug('Converted %s to %s', color_input, color_int)
 
         return color_int
 
     else:
-        print("Received int, passing value through: %s" % (color_input))
+        log.debug("Received int, passing value through: %s", color_input)
         return color_input
 
 
 # generate an embed from a dict
 async def _generate_embed_from_dict(embed_data: EmbedData, from_json = False):
-    print("Called _generate_embed_from_dict")
-    print(embed_data)
+    log.debug("Called _generate_embed_from_dict")
+    log.debug('%s', embed_data)
 
     # Populate the embed with values from embed_data
 
     # load JSON
     # convert str to dict if needed
     if type(embed_data.embed_json) == str:
-        print("Received JSON in string format.")
+        log.debug("Received JSON in string format.")
         # embed_data.embed_json = embed_data.embed_json.replace('\'', '\"')
         embed_json: dict = json.loads(embed_data.embed_json)
     else:
         embed_json: dict = embed_data.embed_json
 
-    print('embed_json type: %s' % (type(embed_json)))
+    log.debug('embed_json type: %s', type(embed_json))
 
     if not from_json:
-        print("▶ Add title")
+        log.debug("▶ Add title")
         if embed_data.embed_title:
             embed_json["title"] = embed_data.embed_title
         else:
             if "title" in embed_json: del embed_json["title"]
 
-        print("▶ Add description")
+        log.debug("▶ Add description")
         if embed_data.embed_description:
             embed_json["description"] = embed_data.embed_description
 
-        print("▶ Add footer")
+        log.debug("▶ Add footer")
         footer_dict = embed_json.get("footer", {})
         if embed_data.embed_footer:
             footer_dict["text"] = embed_data.embed_footer
@@ -80,7 +86,7 @@ async def _generate_embed_from_dict(embed_data: EmbedData, from_json = False):
         if footer_dict:
             embed_json["footer"] = footer_dict
 
-        print("▶ Add image")
+        log.debug("▶ Add image")
         image_dict = embed_json.get("image", {})
         if embed_data.embed_image_url:
             image_dict["url"] = embed_data.embed_image_url
@@ -89,7 +95,7 @@ async def _generate_embed_from_dict(embed_data: EmbedData, from_json = False):
         if image_dict:
             embed_json["image"] = image_dict
 
-        print("▶ Add thumbnail")
+        log.debug("▶ Add thumbnail")
         thumbnail_dict = embed_json.get("thumbnail", {})
         if embed_data.embed_thumbnail_url:
             thumbnail_dict["url"] = embed_data.embed_thumbnail_url
@@ -98,7 +104,7 @@ async def _generate_embed_from_dict(embed_data: EmbedData, from_json = False):
         if thumbnail_dict:
             embed_json["thumbnail"] = thumbnail_dict
 
-        print("▶ Add author")
+        log.debug("▶ Add author")
         author_dict = embed_json.get("author", {})
         if embed_data.embed_author_name:
             author_dict["name"] = embed_data.embed_author_name
@@ -111,24 +117,24 @@ async def _generate_embed_from_dict(embed_data: EmbedData, from_json = False):
         if author_dict:
             embed_json["author"] = author_dict
 
-        print("▶ Set color")
+        log.debug("▶ Set color")
         if embed_data.embed_color:
             color = await _color_hex_to_int(embed_data.embed_color)
             embed_json["color"] = color
         else:
             if "color" in embed_json: del embed_json["color"]
 
-        print("✅ Finished updating dict.")
+        log.debug("✅ Finished updating dict.")
 
 
-    print("⌛ Populating embed from JSON")
+    log.debug("⌛ Populating embed from JSON")
     embed = discord.Embed.from_dict(embed_json)
 
-    print("✅ Completed.")
+    log.debug("✅ Completed.")
     return embed
 
 def button_config_embed(index, button_data: RoleButtonData):
-    print("called button_config_embed")
+    log.debug("called button_config_embed")
     message: discord.Message = button_data.message
 
     if index < 5:
@@ -142,37 +148,54 @@ def button_config_embed(index, button_data: RoleButtonData):
     embed.set_footer(text=footer)
 
     if index == 0:
-        print("Returning embed for index 0")
+        log.debug("Returning embed for index 0")
         # embed.title="ADD ROLE BUTTON TO MESSAGE"
         embed.description = \
             ':one: :rocket: **Enter the ROLE ID of the role you wish the button to add/remove**.\n\n' \
             '*You can find a role ID using `Discord\'s developer mode` by right-clicking on a role ' \
             'in a user\'s role list or in the server\'s roles menu. Or, you can `mention the role ' \
             'in a message` and put a backslash `\\` in front of it before sending to get its ID: Put the mention in ' \
-            'an edit so it doesn\'t ping, and remove the `<@&>` to get the numeric ID.*'
+            'an edit so it doesn\'t ping, and remove the `<@&>` to get the numeric ID.*\n\n' \
+            f'*To make a __bundle__ button that manages several roles at once, enter up to {MAX_BUNDLE_ROLES} role IDs ' \
+            'separated by spaces.*'
 
         return embed
 
     elif index == 1:
-        print("Returning embed for index 1")
+        log.debug("Returning embed for index 1")
         # embed.title="CONFIRM BUTTON ROLE"
         embed.set_thumbnail(url=BUTTON_SWEAT_THUMBNAIL)
-        embed.description = \
-            f':two: ✅ **CONFIRM you want to use your button to manage the following role**:\n' \
-            f'# <@&{button_data.role_id}>'
+        if button_data.is_bundle():
+            embed.description = \
+                f':two: ✅ **CONFIRM you want to use your button to manage the following roles together**:\n' + \
+                '\n'.join(f'# <@&{role_id}>' for role_id in button_data.role_ids)
+        else:
+            embed.description = \
+                f':two: ✅ **CONFIRM you want to use your button to manage the following role**:\n' \
+                f'# <@&{button_data.role_id}>'
 
         return embed
 
     elif index == 2:
-        print("Returning embed for index 2")
+        log.debug("Returning embed for index 2")
         # embed.title="BUTTON STYLE"
         embed.description = \
-            f':three: 🛠 **CHOOSE what you want your button to DO**:'
+            f':three: 🛠 **CHOOSE what you want your button to DO**:\n\n' \
+            '- Use 🔘 **Exclusive group** to put buttons in a group where members can only hold one of the group\'s roles ' \
+            'at a time, e.g. platform or timezone. Giving a group role takes away the others in the same click.\n' \
+            f'- This button\'s group: **{button_data.exclusive_group or "None"}**\n' \
+            '- Use 🔒 **Restrictions** to only let members use the button if they hold (or don\'t hold) certain roles, ' \
+            'e.g. Verified before an event sign-up, to limit how many members can hold the role, e.g. 10 wing places, ' \
+            'and/or to take the role away again after a while, e.g. 24h for an LFG ping role.\n' \
+            f'- Requires: {", ".join(f"<@&{role_id}>" for role_id in button_data.required_role_ids) or "**Nothing**"}' \
+            f'{" • Not available with: " + ", ".join(f"<@&{role_id}>" for role_id in button_data.forbidden_role_ids) if button_data.forbidden_role_ids else ""}' \
+            f' • Limit: **{button_data.capacity or "None"}**' \
+            f' • Expires after: **{format_duration(button_data.duration) if button_data.duration else "Never"}**'
 
         return embed
 
     elif index == 3:
-        print("Returning embed for index 3")
+        log.debug("Returning embed for index 3")
         # embed.title="BUTTON STYLE"
         embed.description = \
             f':four: :art: **CHOOSE which STYLE OF BUTTON you want to add**.'
@@ -180,7 +203,7 @@ def button_config_embed(index, button_data: RoleButtonData):
         return embed
     
     elif index == 4:
-        print("Returning embed for index 4")
+        log.debug("Returning embed for index 4")
         # embed.title="LABEL & EMOJI"
         embed.description = \
             f':five: :label: **Choose your button\'s LABEL and/or EMOJI**.\n\n' \
@@ -193,7 +216,7 @@ def button_config_embed(index, button_data: RoleButtonData):
         return embed
 
     elif index == 5:
-        print("Returning embed for index 5")
+        log.debug("Returning embed for index 5")
         # embed.title="LABEL & EMOJI"
         embed.description = \
             f':twisted_rightwards_arrows: **REPOSITION your button** .\n\n' \
@@ -206,7 +229,7 @@ def button_config_embed(index, button_data: RoleButtonData):
 
 
 def stress_embed():
-    print("called stress_embed")
+    log.debug("called stress_embed")
     # attach a random image from the "there, there" category
     gif = random.choice(STRESS_GIFS)
 
@@ -219,7 +242,7 @@ def stress_embed():
 
 
 def amazing_embed():
-    print("called amazing_embed")
+    log.debug("called amazing_embed")
     # attach a random image from the "there, there" category
     gif = random.choice(AMAZING_GIFS)
 
@@ -236,10 +259,10 @@ def button_edit_heading_embed(message: discord.Message):
             title='🔘 MANAGE MESSAGE BUTTONS: PREVIEW',
             description=f"This is a preview of {message.jump_url} with your buttons attached.\n\n" \
                          "In the __Button Manager__ view (this view):\n" \
-                         "✗ Cancel\n+ Add button\n✔ Confirm previewed buttons and add to message\n\n" \
+                         "✗ Cancel\n+ Add button\n📋 Add role menu (up to 25 roles in a dropdown)\n✔ Confirm previewed buttons and add to message\n\n" \
                          "In the __Button Edit__ view (click on any button):\n" \
                          "◀ / ▶ Previous/Next page\n💥 Delete button\n✅ Commit button settings\n🔀 Reposition button\n\n" \
-                         "Once you have added a button, click on it at any time to edit it. When finished, " \
+                         "Once you have added a button or menu, click on it at any time to edit it. When finished, " \
                          " use ✔ in the Button Manager view to change the message's buttons to those previewed.",
             color=EMBED_COLOUR_QU
         )
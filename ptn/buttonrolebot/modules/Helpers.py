@@ -7,6 +7,7 @@ Depends on: ErrorHandler, Constants
 # import libraries
 from collections import OrderedDict
 import json
+import logging
 import os
 import traceback
 from urllib.parse import urlparse
@@ -18,7 +19,7 @@ from discord import app_commands
 from ptn.buttonrolebot.utils import get_member
 
 # import bot
-from ptn.buttonrolebot.bot import bot, DynamicButton
+from ptn.buttonrolebot.bot import bot, DynamicButton, DynamicRoleSelect
 
 # import constants
 from ptn.buttonrolebot.constants import bot_guild, channel_botspam, VALID_EXTENSIONS, EMBED_COLOUR_OK, role_brb, \
@@ -29,8 +30,13 @@ from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
 from ptn.buttonrolebot.classes.EmbedData import EmbedData
 
 # import local modules
+from ptn.buttonrolebot.modules.CustomId import decode_custom_id, is_legacy_custom_id
+from ptn.buttonrolebot.modules.DateString import format_duration
 from ptn.buttonrolebot.modules.ErrorHandler import CommandRoleError, CustomError, on_generic_error, \
     CommandPermissionError
+from ptn.buttonrolebot.modules.RoleCache import role_index, bot_roles
+
+log = logging.getLogger(__name__)
 
 
 """
@@ -43,7 +49,7 @@ spamchannel = bot.get_channel(channel_botspam())
 
 # trio of helper functions to check a user's permission to run a command based on their roles, and return a helpful error if they don't have the correct role(s)
 def getrole(ctx, id): # takes a Discord role ID and returns the role object
-    role = discord.utils.get(ctx.guild.roles, id=id)
+    role = role_index.get(ctx.guild, id)
     return role
 
 async def checkroles_actual(interaction: discord.Interaction, permitted_role_ids):
@@ -51,23 +57,23 @@ async def checkroles_actual(interaction: discord.Interaction, permitted_role_ids
         """
         Check if the user has at least one of the permitted roles to run a command
         """
-        print(f"checkroles called.")
+        log.debug('checkroles called.')
         author_roles = interaction.user.roles
         permitted_roles = [getrole(interaction, role) for role in permitted_role_ids]
-        print(author_roles)
-        print(permitted_roles)
+        log.debug('%s', author_roles)
+        log.debug('%s', permitted_roles)
         permission = True if any(x in permitted_roles for x in author_roles) else False
-        print(f'Permission: {permission}')
+        log.debug('Permission: %s', permission)
         return permission, permitted_roles
     except Exception as e:
-        print(e)
+        log.error('%s', e)
     return permission
 
 
 def check_roles(permitted_role_ids):
     async def checkroles(interaction: discord.Interaction):
         permission, permitted_roles = await checkroles_actual(interaction, permitted_role_ids)
-        print("Inherited permission from checkroles")
+        log.debug("Inherited permission from checkroles")
         if not permission: # raise our custom error to notify the user gracefully
             role_list = []
             for role in permitted_role_ids:
@@ -76,7 +82,7 @@ def check_roles(permitted_role_ids):
             try:
                 raise CommandRoleError(permitted_roles, formatted_role_list)
             except CommandRoleError as e:
-                print(e)
+                log.error('%s', e)
                 raise
         return permission
     return app_commands.check(checkroles)
@@ -91,33 +97,34 @@ def check_channel_permissions(): # does this work? I have no idea. Discord seems
             try:
                 raise CommandPermissionError()
             except CommandPermissionError as e:
-                print(e)
+                log.error('%s', e)
                 raise
         return permission
     return app_commands.check(checkuserperms)
 
 
 async def button_role_checks(interaction: discord.Interaction, role: discord.Role, button_data: RoleButtonData):
-    print(f"Called button_role_checks for {role}")
+    log.debug('Called button_role_checks for %s', role)
     try:
         # check if we have permission to manage this role
-        bot_member: discord.Member = await get_member(bot, bot.user.id)
-        if bot_member.top_role <= role or role.managed:
-            print("We don't have permission for this role")
+        if not bot_roles.is_ready(interaction.guild):
+            bot_roles.rebuild(interaction.guild, await get_member(bot, bot.user.id))
+        if not bot_roles.can_manage(role):
+            log.debug("We don't have permission for this role")
             try:
                 raise CustomError(f"I don't have permission to manage <@&{role.id}> on **{button_data.button_emoji} {button_data.button_label}** .")
             except Exception as e:
                 await on_generic_error(spamchannel, interaction, e)
             return False
 
-        bot_role = discord.utils.get(interaction.guild.roles, id=role_brb())
-        print(bot_role)
+        bot_role = role_index.get(interaction.guild, role_brb())
+        log.debug('%s', bot_role)
         if bot_role < role:
             permitted_role_ids = [role_council(), role_mod()]
             result = await checkroles_actual(interaction, permitted_role_ids)
             permission = result[0]
             if not permission:
-                print("User doesn't have permission to manage this role.")
+                log.debug("User doesn't have permission to manage this role.")
                 try:
                     error = f'To manage <@&{role.id}> on **{button_data.button_emoji} {button_data.button_label}** ' \
                             f'you require one of the following roles: <@&{role_mod()}>  •  <@&{role_council()}>'
@@ -126,10 +133,10 @@ async def button_role_checks(interaction: discord.Interaction, role: discord.Rol
                     await on_generic_error(spamchannel, interaction, e)
                 return False
 
-        print("Permission OK")
+        log.debug("Permission OK")
         return True
     except Exception as e:
-        print(e)
+        log.error('%s', e)
         traceback.print_exc()
 
 """
@@ -151,20 +158,20 @@ def is_valid_extension(url):
 
 # remove a field from an embed
 def _remove_embed_field(embed, field_name_to_remove):
-    print(f"Called _remove_embed_field for {field_name_to_remove}")
+    log.debug('Called _remove_embed_field for %s', field_name_to_remove)
     try:
         embed.remove_field(field_name_to_remove)
-        print(f"Removed {field_name_to_remove}")
+        log.debug('Removed %s', field_name_to_remove)
 
     except:
-        print(f"No field found for {field_name_to_remove}")
+        log.debug('No field found for %s', field_name_to_remove)
         pass
 
     return embed
 
 # populate embed_fields from an embed in a message
 def _get_embed_from_message(message: discord.Message):
-    print('Called _get_embed_from_message')
+    log.debug('Called _get_embed_from_message')
     for embed in message.embeds:
         embed_fields = {
             'embed_title': embed.title,
@@ -179,19 +186,19 @@ def _get_embed_from_message(message: discord.Message):
         }
     # generate embed_data from the sent embed
     embed_data = EmbedData(embed_fields)
-    print(f'Instantiated embed_data as: {embed_data}')
+    log.debug('Instantiated embed_data as: %s', embed_data)
     # return embed_data instance to function
     return embed_data    
 
 # check if a role exists
 async def check_role_exists(interaction, role_id):
-    print(f"Called check_role_exists for {role_id}")
+    log.debug('Called check_role_exists for %s', role_id)
     try:
-        role = discord.utils.get(interaction.guild.roles, id=role_id)
-        print(f"Role exists with name {role.name}")
+        role = role_index.get(interaction.guild, role_id)
+        log.debug('Role exists with name %s', role.name)
         return role
     except Exception as e:
-        print("No role exists for this ID.")
+        log.debug("No role exists for this ID.")
         try:
             raise CustomError(f"No role found on this server matching ```{role_id}```")
         except Exception as e:
@@ -201,30 +208,56 @@ async def check_role_exists(interaction, role_id):
 # add role button to message
 # this one is kind of a big deal
 async def _add_role_buttons_to_view(interaction: discord.Interaction, buttons, message: discord.Message):
-    print("Called _add_role_buttons_to_view")
+    log.debug("Called _add_role_buttons_to_view")
 
-    print("Defining empty view")
+    log.debug("Defining empty view")
     view = discord.ui.View(timeout=None)
+    select_index = 0
 
     for button_data_instance in buttons:
-        print(button_data_instance)
-        style: discord.ButtonStyle = button_data_instance.button_style
-        print("Instantiating DynamicButton component")
-        button = DynamicButton(button_data_instance.button_action, button_data_instance.role_id, button_data_instance.message.id)
-        print(f"🔘 Generated DynamicButton from set {button_data_instance.unique_id}")
+        log.debug('%s', button_data_instance)
+
+        if button_data_instance.is_select():
+            log.debug("Instantiating DynamicRoleSelect component")
+            options = [discord.SelectOption(label=role.name[:100], value=str(role.id)) for role in button_data_instance.role_objects]
+            select = DynamicRoleSelect(button_data_instance.message.id, select_index, options, button_data_instance.button_label)
+            select.item.row = button_data_instance.button_row
+            select_index += 1
+            view.add_item(select)
+
+            log.debug("Logging to bot-spam")
+            embed = discord.Embed(
+                description=f"📋 <@{interaction.user.id}> added a role menu to {message.jump_url} offering {button_data_instance.role_mentions()}.",
+                color=EMBED_COLOUR_OK
+            )
+            spamchannel = bot.get_channel(channel_botspam())
+            await spamchannel.send(embed=embed)
+            continue
 
-        print("Setting button properties")
+        style: discord.ButtonStyle = button_data_instance.button_style
+        log.debug("Instantiating DynamicButton component")
+        button = DynamicButton(button_data_instance.button_action, tuple(button_data_instance.role_ids), button_data_instance.message.id,
+                               button_data_instance.exclusive_group, tuple(button_data_instance.required_role_ids),
+                               tuple(button_data_instance.forbidden_role_ids), button_data_instance.capacity,
+                               button_data_instance.duration)
+        log.debug('🔘 Generated DynamicButton from set %s', button_data_instance.unique_id)
+
+        log.debug("Setting button properties")
         button.item.label = button_data_instance.button_label if button_data_instance.button_label else None
         button.item.emoji = button_data_instance.button_emoji if button_data_instance.button_emoji else None
         button.item.style = style
         button.item.row = button_data_instance.button_row
 
-        print("Adding dynamic button component")
+        log.debug("Adding dynamic button component")
         view.add_item(button)
 
-        print("Logging to bot-spam")
+        log.debug("Logging to bot-spam")
         embed = discord.Embed(
-            description=f"🔘 <@{interaction.user.id}> added a button to {message.jump_url} to {button_data_instance.button_action} the <@&{button_data_instance.role_id}> role.",
+            description=f"🔘 <@{interaction.user.id}> added a button to {message.jump_url} to {button_data_instance.button_action} the {button_data_instance.role_mentions()} role{'s' if button_data_instance.is_bundle() else ''}" \
+                        f"{f' in exclusive group {button_data_instance.exclusive_group}' if button_data_instance.exclusive_group else ''}" \
+                        f"{' (🔒 with prerequisites)' if button_data_instance.required_role_ids or button_data_instance.forbidden_role_ids else ''}" \
+                        f"{f' (🈵 limited to {button_data_instance.capacity} members)' if button_data_instance.capacity else ''}" \
+                        f"{f' (⌛ for {format_duration(button_data_instance.duration)})' if button_data_instance.duration else ''}.",
             color=EMBED_COLOUR_OK
         )
 
@@ -244,9 +277,43 @@ async def _add_role_buttons_to_view(interaction: discord.Interaction, buttons, m
     return view
 
 
+# rewrite any legacy-format role buttons on a message to the current custom_id format
+def _migrate_legacy_buttons(message: discord.Message):
+    """
+    Rebuilds a message's view with its legacy role buttons replaced by current-format DynamicButtons.
+    Everything else about the buttons (label, emoji, style, row, order) is kept as it was.
+
+    :returns: A tuple of the new view and the number of buttons migrated.
+    """
+    old_view = discord.ui.View.from_message(message, timeout=None)
+    view = discord.ui.View(timeout=None)
+    migrated = 0
+
+    for child in old_view.children:
+        decoded = None
+        if isinstance(child, discord.ui.Button) and child.custom_id and is_legacy_custom_id(child.custom_id):
+            decoded = decode_custom_id(child.custom_id)
+
+        if decoded is None:
+            # not one of our legacy buttons, keep it as is
+            view.add_item(child)
+            continue
+
+        button = DynamicButton(decoded.action, decoded.role_ids, decoded.message_id, decoded.group, decoded.required, decoded.forbidden,
+                               decoded.capacity, decoded.duration)
+        button.item.label = child.label
+        button.item.emoji = child.emoji
+        button.item.style = child.style
+        button.item.row = child.row
+        view.add_item(button)
+        migrated += 1
+
+    return view, migrated
+
+
 def _format_embed_dict(embed: discord.Embed):
     embed_dict = embed.to_dict()
     ordered_dict = OrderedDict((key, embed_dict[key]) for key in EMBED_DICT_SCHEMA if key in embed_dict)
     formatted_dict = json.dumps(ordered_dict, ensure_ascii=False, indent=4)
-    print("✅ Formatted dict: %s" % (formatted_dict))
+    log.debug("✅ Formatted dict: %s", formatted_dict)
     return formatted_dict
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+HttpStats.py
+
+Measures every request discord.py makes to the Discord HTTP API, so slow clicks can be put down to our own code,
+Discord's latency or its rate limits.
+
+discord.py's HTTP client accepts an aiohttp TraceConfig, which sees every attempt at a request, including the 429s
+discord.py waits out and retries on its own. Each is recorded against its route: the URL with IDs and tokens
+replaced, so the number of routes stays fixed. Results go to Prometheus (see Metrics.py) and into a small in-memory
+summary for the http_stats admin command.
+
+Depends on: Metrics
+"""
+# import libraries
+import logging
+import re
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import DISCORD_HTTP_SECONDS, DISCORD_HTTP_RESPONSES, DISCORD_HTTP_RATE_LIMITS, \
+    DISCORD_HTTP_RETRY_AFTER, DISCORD_HTTP_BUCKET_REMAINING
+
+log = logging.getLogger(__name__)
+
+
+API_PATH_PATTERN = re.compile(r'^/api/v\d+')
+SNOWFLAKE_PATTERN = re.compile(r'/\d{15,21}(?=/|$)')
+# interaction and webhook tokens follow the ID they belong to
+TOKEN_PATTERN = re.compile(r'/(interactions|webhooks)/\{id\}/[^/]+')
+# reactions are addressed by emoji
+EMOJI_PATTERN = re.compile(r'/reactions/[^/]+')
+
+LATENCY_SAMPLES = 256 # recent latencies kept per route for percentiles
+
+
+def route_template(path: str) -> str:
+    """
+    Turns a request path into its route, e.g. /api/v10/guilds/123/members/456 into /guilds/{id}/members/{id}.
+    """
+    path = API_PATH_PATTERN.sub('', path)
+    path = SNOWFLAKE_PATTERN.sub('/{id}', path)
+    path = TOKEN_PATTERN.sub(r'/\1/{id}/{token}', path)
+    path = EMOJI_PATTERN.sub('/reactions/{emoji}', path)
+    return path
+
+
+class RouteStats:
+
+    def __init__(self):
+        """
+        Class represents what we've seen of a single route since startup.
+        """
+        self.requests = 0
+        self.statuses: Counter = Counter()
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.rate_limited = 0
+        self.last_retry_after: Optional[float] = None
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+        self.last_seen = 0.0
+
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class DiscordHttpStats:
+
+    def __init__(self):
+        """
+        Class represents the measurements of every route, and the TraceConfig that takes them.
+        """
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.started = time.time()
+
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        A TraceConfig to give discord.py's HTTP client.
+        """
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+
+    async def _on_request_start(self, session, context, params: aiohttp.TraceRequestStartParams):
+        context.started = time.perf_counter()
+
+
+    async def _on_request_end(self, session, context, params: aiohttp.TraceRequestEndParams):
+        headers = params.response.headers
+        self.record(params.method, params.url.path, params.response.status, time.perf_counter() - context.started,
+                    remaining=headers.get('X-RateLimit-Remaining'), limit=headers.get('X-RateLimit-Limit'),
+                    retry_after=headers.get('Retry-After'), scope=headers.get('X-RateLimit-Scope'))
+
+
+    async def _on_request_exception(self, session, context, params: aiohttp.TraceRequestExceptionParams):
+        self.record(params.method, params.url.path, 0, time.perf_counter() - getattr(context, 'started', time.perf_counter()))
+
+
+    def record(self, method: str, path: str, status: int, seconds: float, remaining: Optional[str] = None,
+               limit: Optional[str] = None, retry_after: Optional[str] = None, scope: Optional[str] = None):
+        """
+        Records one request to the API.
+        """
+        route = route_template(path)
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+
+        stats.requests += 1
+        stats.statuses[status] += 1
+        stats.latencies.append(seconds)
+        stats.last_seen = time.time()
+        DISCORD_HTTP_SECONDS.labels(method=method, route=route).observe(seconds)
+        DISCORD_HTTP_RESPONSES.labels(method=method, route=route, status=str(status)).inc()
+
+        if remaining is not None:
+            stats.remaining = int(remaining)
+            DISCORD_HTTP_BUCKET_REMAINING.labels(route=route).set(stats.remaining)
+        if limit is not None:
+            stats.limit = int(limit)
+
+        if status == 429:
+            stats.rate_limited += 1
+            DISCORD_HTTP_RATE_LIMITS.labels(route=route, scope=scope or 'user').inc()
+            if retry_after is not None:
+                stats.last_retry_after = float(retry_after)
+                DISCORD_HTTP_RETRY_AFTER.labels(route=route).observe(stats.last_retry_after)
+            log.debug('🚦 429 on %s %s (%s scope), retry after %ss', method, route, scope or 'user', retry_after)
+
+
+    def summary(self) -> List[Tuple[str, str, RouteStats]]:
+        """
+        Every route's stats, busiest first.
+        """
+        return sorted(((method, route, stats) for (method, route), stats in self.routes.items()),
+                      key=lambda item: item[2].requests, reverse=True)
+
+
+# the stats for the bot's HTTP client
+http_stats = DiscordHttpStats()
@@ -0,0 +1,117 @@
+"""
+Instrumentation.py
+
+Measures role clicks and editor commands for the Prometheus metrics in Metrics.py.
+
+A ClickObservation rides along with each role click in interaction.extras, so the code that answers the click
+can record when the first response went out and what the outcome was without passing it around. Editor
+commands are timed by wrapping them with instrument_command, which also traces them (see Tracing.py).
+
+Depends on: Metrics, Tracing
+"""
+# import libraries
+import functools
+import time
+from typing import List, Optional
+
+# import discord
+import discord
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_CLICK_ACK_SECONDS, ROLE_CLICK_SECONDS, ROLE_CLICKS, EDITOR_COMMAND_SECONDS, \
+    EDITOR_COMMANDS
+from ptn.buttonrolebot.modules.Tracing import traced
+
+
+CLICK_EXTRAS_KEY = 'brb_click'
+
+
+class ClickObservation:
+
+    __slots__ = ('action', 'component', 'started', 'acked', 'outcome')
+
+    def __init__(self, action: str, component: str):
+        """
+        Class represents the measurements of a single role click.
+
+        :param action: give, take, toggle or select.
+        :param component: button or select.
+        """
+        self.action = action
+        self.component = component
+        self.started = time.perf_counter()
+        self.acked = False
+        self.outcome: Optional[str] = None
+
+
+    def record_ack(self):
+        """
+        Records that the click's first response has been sent. Only the first call counts.
+        """
+        if not self.acked:
+            self.acked = True
+            ROLE_CLICK_ACK_SECONDS.labels(component=self.component).observe(time.perf_counter() - self.started)
+
+
+    def record_outcome(self, outcome: str):
+        self.outcome = outcome
+
+
+    def finish(self):
+        """
+        Records the click's total time and outcome. Clicks that never got an outcome are counted as errors.
+        """
+        ROLE_CLICK_SECONDS.labels(action=self.action).observe(time.perf_counter() - self.started)
+        ROLE_CLICKS.labels(action=self.action, outcome=self.outcome or 'error').inc()
+
+
+def start_click(interaction: discord.Interaction, action: str, component: str = 'button') -> ClickObservation:
+    """
+    Starts measuring a role click.
+    """
+    click = ClickObservation(action, component)
+    interaction.extras[CLICK_EXTRAS_KEY] = click
+    return click
+
+
+def get_click(interaction: discord.Interaction) -> Optional[ClickObservation]:
+    """
+    The measurements of the role click an interaction belongs to, if it's one.
+    """
+    return interaction.extras.get(CLICK_EXTRAS_KEY)
+
+
+def outcome_from_adverbs(adverbs: List[str]) -> str:
+    """
+    Sums up what a click did to its own roles (not exclusive group roles) as a single outcome.
+    """
+    if 'now' in adverbs:
+        return 'granted'
+    if 'no longer' in adverbs:
+        return 'removed'
+    if 'already' in adverbs:
+        return 'already'
+    return 'dont_have'
+
+
+def instrument_command(name: str):
+    """
+    Decorator timing an editor command's callback and counting its outcomes.
+
+    Must go directly above the function, below any app_commands or check decorators.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = await func(*args, **kwargs)
+                outcome = 'ok' if interaction is None or interaction.response.is_done() else 'unanswered'
+                return result
+            finally:
+                EDITOR_COMMAND_SECONDS.labels(command=name).observe(time.perf_counter() - started)
+                EDITOR_COMMANDS.labels(command=name, outcome=outcome).inc()
+        return traced(wrapper)
+    return decorator
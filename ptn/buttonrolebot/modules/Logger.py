@@ -0,0 +1,151 @@
+"""
+Logger.py
+
+Sets up BRB's logging so that nothing on the event loop waits on stdout.
+
+Modules log through the standard logging module (log = logging.getLogger(__name__)). The only handler on the
+root logger is a queue handler, which puts records on a queue without formatting them; a listener thread takes
+them off, formats them and writes them out. Messages are passed %-style with their arguments, so an expensive
+repr, such as a RoleButtonData dump, is never built for a record below ROLE_BOT_LOG_LEVEL. A record that is kept
+has its message built as it's queued, while its arguments still show the state at the time of the call; only the
+rest of the formatting and the write happen off the event loop.
+
+Records are written as text, or as one JSON object per line with ROLE_BOT_LOG_FORMAT=json. Fields passed with
+extra={...} are included either way.
+
+Every role click logs several lines, which adds up during a busy event, so the click path logs through click_log,
+which keeps only a sample (ROLE_BOT_LOG_CLICK_SAMPLE_RATE) of its records below WARNING.
+
+Depends on: Constants, Metrics
+"""
+# import libraries
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# import local constants
+from ptn.buttonrolebot.constants import LOG_FORMAT, LOG_QUEUE_SIZE, LOG_CLICK_SAMPLE_RATE
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import LOG_RECORDS_DROPPED
+
+
+CLICK_LOGGER_NAME = 'ptn.buttonrolebot.clicks'
+
+# the attributes every LogRecord has; anything else on a record came from extra={...}
+STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self, as_json: bool = False):
+        """
+        Class represents the formatting of log records as text or JSON lines, including any extra fields.
+        """
+        super().__init__('[{asctime}] [{levelname:<8}] {name}: {message}', '%Y-%m-%d %H:%M:%S', style='{')
+        self.as_json = as_json
+
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = {key: value for key, value in vars(record).items() if key not in STANDARD_RECORD_ATTRIBUTES}
+        if not self.as_json:
+            line = super().format(record)
+            if extras:
+                line += ' ' + ' '.join(f'{key}={value}' for key, value in extras.items())
+            return line
+
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **extras
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Class represents a QueueHandler that leaves formatting to the listener thread and never blocks.
+
+    The standard QueueHandler formats each record in full before queueing it so it can be pickled; ours never
+    leaves the process, so only the message is built here, since its arguments are often objects the event loop
+    goes on changing (role lists, RoleButtonData and so on). The listener does the rest.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # the listener can't keep up with stdout; losing a log line beats stalling every click
+            LOG_RECORDS_DROPPED.labels(reason='queue_full').inc()
+
+
+class SamplingFilter(logging.Filter):
+
+    def __init__(self, rate: float):
+        """
+        Class represents a filter keeping a random sample of records below WARNING.
+
+        :param rate: The fraction of records to keep, between 0 and 1.
+        """
+        super().__init__()
+        self.rate = rate
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or random.random() < self.rate:
+            return True
+        LOG_RECORDS_DROPPED.labels(reason='sampled').inc()
+        return False
+
+
+# the logger for the role click path, sampled once logging starts
+click_log = logging.getLogger(CLICK_LOGGER_NAME)
+
+_listener: Optional[QueueListener] = None
+
+
+def start_logging(handler: logging.Handler, level: int):
+    """
+    Routes all logging, discord.py's included, through a queue to the given handler on a listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler.setFormatter(StructuredFormatter(as_json=LOG_FORMAT == 'json'))
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+
+    if LOG_CLICK_SAMPLE_RATE < 1:
+        click_log.addFilter(SamplingFilter(LOG_CLICK_SAMPLE_RATE))
+
+
+def stop_logging():
+    """
+    Writes out everything still queued and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
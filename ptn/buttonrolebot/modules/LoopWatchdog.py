@@ -0,0 +1,123 @@
+"""
+LoopWatchdog.py
+
+Watches the event loop for stalls: synchronous work that holds up every other task, including the 3-second
+interaction acknowledgements.
+
+A task on the loop sleeps for a fixed interval over and over; however much later than asked it wakes is the lag,
+which is exported as a histogram. Lag can only be measured once the loop is free again, by which point whatever
+blocked it is gone, so a helper thread also watches the task's heartbeat. If the heartbeat is overdue by more than
+the stall threshold, the thread grabs the loop thread's stack while it's still stuck, along with the task that was
+running, and logs them.
+
+Depends on: Constants, Metrics
+"""
+# import libraries
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+# import local constants
+from ptn.buttonrolebot.constants import LOOP_WATCHDOG_INTERVAL, LOOP_STALL_THRESHOLD, LOOP_STALL_STACK_DEPTH
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS
+
+log = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+
+    def __init__(self, interval: float = LOOP_WATCHDOG_INTERVAL, threshold: float = LOOP_STALL_THRESHOLD):
+        """
+        Class represents the event loop lag monitor and the thread that reports stalls.
+
+        :param interval: Seconds between lag measurements.
+        :param threshold: Seconds the loop can be blocked before its stack is logged.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._beat = time.monotonic() # when the loop last got round to the watchdog task
+        self._reported_beat: Optional[float] = None # the heartbeat we've already logged a stall for
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+
+    def start(self):
+        """
+        Starts measuring. Must be called from the event loop.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run(), name='brb-loop-watchdog')
+        self._thread = threading.Thread(target=self._watch, name='brb-loop-watchdog', daemon=True)
+        self._thread.start()
+        log.info('🐢 Event loop watchdog started, logging stalls over %ss', self.threshold)
+
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            lag = max(0.0, self._beat - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                EVENT_LOOP_STALLS.inc()
+                self.stalls += 1
+                if self._reported_beat is None:
+                    # too short-lived for the thread to catch it in the act
+                    log.warning('🐢 Event loop was blocked for %.2fs', lag)
+                self._reported_beat = None
+
+
+    def _watch(self):
+        # runs in its own thread, so it keeps going while the loop is blocked
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue > self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                self._report_stall(overdue)
+
+
+    def _report_stall(self, overdue: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        # reading which task is current from another thread is safe enough: it's a single dict lookup
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            coro = task.get_coro()
+            running = f"task {task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+        else:
+            running = 'a callback outside any task'
+        stack = ''.join(traceback.format_stack(frame, limit=LOOP_STALL_STACK_DEPTH))
+        log.warning('🐢 Event loop blocked for %.2fs and counting, in %s:\n%s', overdue, running, stack)
+
+
+# the watchdog for the bot's event loop
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,181 @@
+"""
+MemoryStats.py
+
+Helps track down memory growth in long-running bots.
+
+Editor views are created with timeout=None, so discord.py's view store holds on to each of them (and, through their
+RoleButtonData or EmbedData, to whole messages and interactions) until they're stopped. The store's size and the
+number of editor data objects still alive are exported as gauges, worked out when Prometheus scrapes rather than
+kept up to date on every change.
+
+For finding where the memory goes, MemoryTracer wraps tracemalloc: once started, each snapshot is compared with
+the one before to show which lines have allocated the most since. tracemalloc slows every allocation down, so it's
+only on between the memory start and memory stop commands.
+
+Depends on: Constants, Metrics, EmbedData, RoleButtonData
+"""
+# import libraries
+import asyncio
+import os
+import resource
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# import discord
+import discord
+
+# import local classes
+from ptn.buttonrolebot.classes.EmbedData import EmbedData
+from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
+
+# import local constants
+from ptn.buttonrolebot.constants import DATA_DIR, MEMORY_TRACE_FRAMES
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import VIEW_STORE_ITEMS, EDITOR_SESSIONS
+
+
+MEMORY_DIR = os.path.join(DATA_DIR, 'memory')
+
+# allocations made by tracemalloc itself or by importing modules aren't interesting
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def process_rss() -> Optional[int]:
+    """
+    The process's resident set size in bytes, or its peak RSS where the current one can't be read.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS; it's only a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def view_store_counts(client: discord.Client) -> Dict[str, int]:
+    """
+    How much discord.py's view store is holding on to.
+
+    :returns: Counts of distinct views listening for components, modals, views tied to a message, and dynamic
+        item templates.
+    """
+    store = client._connection._view_store
+    views = {id(item.view) for items in list(store._views.values()) for item in list(items.values()) if item.view}
+    return {
+        'view': len(views),
+        'modal': len(store._modals),
+        'message_view': len(store._synced_message_views),
+        'dynamic_item': len(store._dynamic_items)
+    }
+
+
+def editor_session_counts() -> Dict[str, int]:
+    return {
+        'button': len(RoleButtonData.instances),
+        'embed': len(EmbedData.instances)
+    }
+
+
+def register_memory_gauges(client: discord.Client):
+    """
+    Points the memory gauges at the client's view store, to be read whenever metrics are scraped.
+    """
+    for kind in ('view', 'modal', 'message_view', 'dynamic_item'):
+        VIEW_STORE_ITEMS.labels(kind=kind).set_function(lambda kind=kind: view_store_counts(client)[kind])
+    for editor in ('button', 'embed'):
+        EDITOR_SESSIONS.labels(editor=editor).set_function(lambda editor=editor: editor_session_counts()[editor])
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+class MemoryTracer:
+
+    def __init__(self, frames: int = MEMORY_TRACE_FRAMES, directory: str = MEMORY_DIR):
+        """
+        Class represents a tracemalloc session, remembering the last snapshot to compare the next one with.
+        """
+        self.frames = frames
+        self.directory = directory
+        self.started: Optional[float] = None # POSIX timestamp
+        self._last: Optional[tracemalloc.Snapshot] = None
+        self._last_taken: Optional[float] = None
+
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+
+    async def start(self):
+        """
+        Starts tracing allocations, and takes the snapshot the first diff is compared with.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started = time.time()
+        self._last = await asyncio.to_thread(self._take)
+        self._last_taken = time.time()
+
+
+    def stop(self):
+        tracemalloc.stop()
+        self.started = None
+        self._last = None
+        self._last_taken = None
+
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+    def _dump(self, snapshot: tracemalloc.Snapshot, taken: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, datetime.fromtimestamp(taken, timezone.utc).strftime('memory-%Y%m%d-%H%M%S.tracemalloc'))
+        snapshot.dump(path)
+        return path
+
+
+    async def diff(self, count: int) -> Tuple[List[tracemalloc.StatisticDiff], float, str]:
+        """
+        Takes a snapshot, saves it to DATA_DIR and compares it with the previous one, which it then replaces.
+
+        Snapshots are taken and compared in a thread, as for a large heap they take a while.
+
+        :returns: The lines whose allocations have grown the most, when the previous snapshot was taken, and where
+            the new one was saved.
+        :raises RuntimeError: If tracing hasn't been started.
+        """
+        if not tracemalloc.is_tracing() or self._last is None:
+            raise RuntimeError("Memory tracing isn't running")
+        taken = time.time()
+        snapshot = await asyncio.to_thread(self._take)
+        stats = await asyncio.to_thread(snapshot.compare_to, self._last, 'lineno')
+        path = await asyncio.to_thread(self._dump, snapshot, taken)
+        since = self._last_taken
+        self._last, self._last_taken = snapshot, taken
+        return stats[:count], since, path
+
+
+    def traced(self) -> Tuple[int, int]:
+        """
+        :returns: The memory currently traced and the peak since tracing started, in bytes.
+        """
+        return tracemalloc.get_traced_memory()
+
+
+# the tracemalloc session used by the memory admin command
+memory_tracer = MemoryTracer()
@@ -0,0 +1,193 @@
+"""
+Metrics.py
+
+Prometheus metrics for BRB's own code paths. These are registered on prometheus_client's default
+registry, so they are served by the same HTTP endpoint as the PrometheusCog loaded in application.py.
+
+Depends on: none
+"""
+# import libraries
+from prometheus_client import Counter, Gauge, Histogram
+
+
+METRIC_PREFIX = 'buttonrolebot_'
+
+
+# role resolution
+ROLE_INDEX_LOOKUPS = Counter(
+    METRIC_PREFIX + 'role_index_lookups',
+    'Role lookups served by the role index, by result',
+    ['result'] # hit / miss / absent
+)
+
+# role mutation scheduling
+ROLE_SCHEDULER_QUEUE_DEPTH = Gauge(
+    METRIC_PREFIX + 'role_scheduler_queue_depth',
+    'Role mutations waiting to be sent, by priority lane',
+    ['lane']
+)
+
+# role clicks
+# labels are kept to small fixed sets (never role, member or message IDs) so the series count can't grow with the guild
+CLICK_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 1.5, 2, 2.5, 3, 5, 10, 30, 60)
+ROLE_CLICK_ACK_SECONDS = Histogram(
+    METRIC_PREFIX + 'role_click_ack_seconds',
+    'Time from a role click reaching us to its first response being sent, by component',
+    ['component'], # button / select
+    buckets=CLICK_LATENCY_BUCKETS
+)
+ROLE_CLICK_SECONDS = Histogram(
+    METRIC_PREFIX + 'role_click_seconds',
+    'Time from a role click reaching us to its final answer, by action',
+    ['action'], # give / take / toggle / select
+    buckets=CLICK_LATENCY_BUCKETS
+)
+ROLE_CLICKS = Counter(
+    METRIC_PREFIX + 'role_clicks',
+    'Role clicks handled, by action and outcome',
+    ['action', 'outcome'] # outcome: granted / removed / already / dont_have / forbidden / timeout / error / throttled /
+                          # ineligible / full / short_circuited
+)
+ROLE_MUTATION_SECONDS = Histogram(
+    METRIC_PREFIX + 'role_mutation_seconds',
+    'Time to apply a batch of role changes for a member, including queueing and retries, by priority lane',
+    ['lane'],
+    buckets=CLICK_LATENCY_BUCKETS
+)
+
+# editor commands
+EDITOR_COMMAND_SECONDS = Histogram(
+    METRIC_PREFIX + 'editor_command_seconds',
+    'Time spent handling an editor command, by command',
+    ['command'],
+    buckets=CLICK_LATENCY_BUCKETS
+)
+EDITOR_COMMANDS = Counter(
+    METRIC_PREFIX + 'editor_commands',
+    'Editor commands handled, by command and outcome',
+    ['command', 'outcome'] # ok / error / unanswered
+)
+
+# Discord HTTP API
+# routes are URL templates with IDs and tokens replaced, so there's one series per endpoint we use, not per guild or member
+DISCORD_HTTP_SECONDS = Histogram(
+    METRIC_PREFIX + 'discord_http_seconds',
+    'Discord HTTP API request latency, by method and route',
+    ['method', 'route'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DISCORD_HTTP_RESPONSES = Counter(
+    METRIC_PREFIX + 'discord_http_responses',
+    'Discord HTTP API responses, by method, route and status code (0 for requests that got no response)',
+    ['method', 'route', 'status']
+)
+DISCORD_HTTP_RATE_LIMITS = Counter(
+    METRIC_PREFIX + 'discord_http_rate_limits',
+    'Discord HTTP API 429 responses, by route and scope',
+    ['route', 'scope'] # scope: user / global / shared
+)
+DISCORD_HTTP_RETRY_AFTER = Histogram(
+    METRIC_PREFIX + 'discord_http_retry_after_seconds',
+    'Retry-After given with Discord HTTP API 429 responses, by route',
+    ['route'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+DISCORD_HTTP_BUCKET_REMAINING = Gauge(
+    METRIC_PREFIX + 'discord_http_bucket_remaining',
+    'Requests left in the rate limit bucket, as of the last response, by route',
+    ['route']
+)
+
+# role mutation retries
+ROLE_MUTATION_RETRIES = Counter(
+    METRIC_PREFIX + 'role_mutation_retries',
+    'Role mutations retried after a transient error, by reason',
+    ['reason'] # server_error / rate_limited / network
+)
+ROLE_MUTATION_RESULTS = Counter(
+    METRIC_PREFIX + 'role_mutation_results',
+    'Role mutations finished, by result',
+    ['result'] # ok / retried_ok / permanent / exhausted
+)
+ROLE_CLICK_TIMEOUTS = Counter(
+    METRIC_PREFIX + 'role_click_timeouts',
+    'Role clicks that ran out of time before their change was applied'
+)
+
+# click throttling
+ROLE_CLICKS_THROTTLED = Counter(
+    METRIC_PREFIX + 'role_clicks_throttled',
+    'Clicks turned away for coming too fast, by the limit they hit',
+    ['scope'] # user / button
+)
+
+# circuit breakers
+ROLE_BREAKER_EVENTS = Counter(
+    METRIC_PREFIX + 'role_breaker_events',
+    'Role circuit breaker activity, by event',
+    ['event'] # opened / short_circuited / reset
+)
+
+# capacity-limited buttons
+ROLE_CAPACITY_EVENTS = Counter(
+    METRIC_PREFIX + 'role_capacity_events',
+    'Capacity-limited button activity, by event',
+    ['event'] # reserved / full
+)
+
+# temporary roles
+ROLE_EXPIRY_PENDING = Gauge(
+    METRIC_PREFIX + 'role_expiry_pending',
+    'Temporary roles waiting to be taken away'
+)
+ROLE_EXPIRY_REMOVALS = Counter(
+    METRIC_PREFIX + 'role_expiry_removals',
+    'Expired roles processed, by result',
+    ['result'] # removed / gone / forbidden / retried
+)
+
+# event loop health
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    METRIC_PREFIX + 'event_loop_lag_seconds',
+    'How late the event loop woke a sleeping task, i.e. how long something else kept it blocked',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+EVENT_LOOP_STALLS = Counter(
+    METRIC_PREFIX + 'event_loop_stalls',
+    'Times the event loop was blocked for longer than the stall threshold'
+)
+
+# memory
+# set from callbacks at scrape time, see MemoryStats.py; process RSS comes from prometheus_client's own
+# process_resident_memory_bytes
+VIEW_STORE_ITEMS = Gauge(
+    METRIC_PREFIX + 'view_store_items',
+    "Entries in discord.py's view store, by kind",
+    ['kind'] # view / modal / message_view / dynamic_item
+)
+EDITOR_SESSIONS = Gauge(
+    METRIC_PREFIX + 'editor_sessions',
+    'Button and embed editor data still held in memory, by editor',
+    ['editor'] # button / embed
+)
+
+# tracing
+TRACE_SPANS = Counter(
+    METRIC_PREFIX + 'trace_spans',
+    'Finished interaction spans, by what happened to them',
+    ['result'] # exported / dropped
+)
+
+# logging
+LOG_RECORDS_DROPPED = Counter(
+    METRIC_PREFIX + 'log_records_dropped',
+    'Log records not written, by reason',
+    ['reason'] # queue_full / sampled
+)
+
+# interaction recording
+RECORDED_INTERACTIONS = Counter(
+    METRIC_PREFIX + 'recorded_interactions',
+    'Role component interactions recorded for replay, by what happened to them',
+    ['result'] # written / dropped
+)
@@ -0,0 +1,176 @@
+"""
+Profiler.py
+
+A sampling profiler that can be switched on in the running bot, so a sluggish production bot can be looked at
+without redeploying it.
+
+A thread wakes every few milliseconds and records the event loop thread's current stack. Nothing is hooked into
+the code being profiled, unlike cProfile which traces every call, so the cost is a stack walk per sample taken
+from the side: well under a percent of one core at the default rate, which is fine to leave running against live
+traffic for a few minutes. Samples where the loop is waiting in select() are counted as idle rather than as
+hotspots.
+
+Each session's stacks are written to DATA_DIR in the "folded" format read by flamegraph.pl and speedscope, next
+to a plain text summary of the hottest functions.
+
+Depends on: Constants
+"""
+# import libraries
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import FrameType
+from typing import List, Optional, Tuple
+
+# import local constants
+from ptn.buttonrolebot.constants import DATA_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_STACK_DEPTH
+
+
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+
+FunctionKey = Tuple[str, int, str] # filename, first line, function name
+
+# the event loop's own frames sit under everything it runs, so they'd top every inclusive ranking
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def _describe(function: FunctionKey) -> str:
+    filename, line, name = function
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _is_idle(frame: FrameType) -> bool:
+    # the loop blocks in its selector's select() whenever it has nothing to run
+    return frame.f_code.co_name in ('select', 'poll', 'control') and frame.f_code.co_filename.endswith('selectors.py')
+
+
+class ProfileResult:
+
+    def __init__(self, started: float, interval: float):
+        """
+        Class represents the samples collected by one profiling session.
+        """
+        self.started = started # POSIX timestamp
+        self.interval = interval
+        self.duration = 0.0
+        self.samples = 0
+        self.idle = 0
+        self.self_counts: Counter = Counter() # samples with the function on top of the stack
+        self.total_counts: Counter = Counter() # samples with the function anywhere in the stack
+        self.stacks: Counter = Counter() # folded stack -> samples
+
+
+    def add(self, frame: FrameType):
+        self.samples += 1
+        if _is_idle(frame):
+            self.idle += 1
+            return
+
+        functions: List[FunctionKey] = []
+        while frame is not None and len(functions) < PROFILE_STACK_DEPTH:
+            code = frame.f_code
+            functions.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+
+        self.self_counts[functions[0]] += 1
+        # recursive functions count once per sample
+        self.total_counts.update({function for function in functions if not function[0].startswith(ASYNCIO_DIR)})
+        self.stacks[';'.join(_describe(function) for function in reversed(functions))] += 1
+
+
+    @property
+    def busy(self) -> int:
+        return self.samples - self.idle
+
+
+    def top(self, count: int, inclusive: bool = False) -> List[Tuple[str, int]]:
+        """
+        The functions most often seen running.
+
+        :param inclusive: Count samples anywhere in a function's call stack, rather than in its own code.
+        :returns: (description, samples) pairs, hottest first.
+        """
+        counts = self.total_counts if inclusive else self.self_counts
+        return [(_describe(function), samples) for function, samples in counts.most_common(count)]
+
+
+    def summary(self, count: int) -> str:
+        busy = max(self.busy, 1)
+        lines = [f"{self.samples} samples over {self.duration:.1f}s every {self.interval * 1000:.0f}ms, "
+                 f"{self.busy} busy ({self.busy / max(self.samples, 1):.0%})",
+                 '', 'Own time:']
+        lines += [f"{samples / busy:6.1%} {samples:>6}  {function}" for function, samples in self.top(count)]
+        lines += ['', 'Including callees:']
+        lines += [f"{samples / busy:6.1%} {samples:>6}  {function}" for function, samples in self.top(count, inclusive=True)]
+        return '\n'.join(lines)
+
+
+    def write(self, directory: str = PROFILE_DIR, count: int = 50) -> str:
+        """
+        Saves the folded stacks and a summary, blocking, so best called from a thread.
+
+        :returns: The path of the folded stacks file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.fromtimestamp(self.started, timezone.utc).strftime('profile-%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f'{name}.folded')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(f"{stack} {samples}\n" for stack, samples in self.stacks.most_common())
+        with open(os.path.join(directory, f'{name}.txt'), 'w', encoding='utf-8') as file:
+            file.write(self.summary(count) + '\n')
+        return path
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        """
+        Class represents the profiler for the bot's event loop. Only one session runs at a time.
+        """
+        self.interval = interval
+        self._session: Optional[ProfileResult] = None
+
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+
+    async def profile(self, duration: float) -> ProfileResult:
+        """
+        Samples the event loop for the given number of seconds. Must be called from the event loop.
+
+        :raises RuntimeError: If a session is already running.
+        """
+        if self._session is not None:
+            raise RuntimeError("A profiling session is already running")
+        result = self._session = ProfileResult(time.time(), self.interval)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._sample, args=(result, threading.get_ident(), stop),
+                                  name='brb-profiler', daemon=True)
+        started = time.monotonic()
+        thread.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            result.duration = time.monotonic() - started
+            self._session = None
+        return result
+
+
+    def _sample(self, result: ProfileResult, thread_id: int, stop: threading.Event):
+        # runs in its own thread so it sees the loop thread from outside, whatever it's doing
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                result.add(frame)
+
+
+# the profiler used by the profile admin command
+profiler = SamplingProfiler()
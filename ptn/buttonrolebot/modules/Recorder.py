@@ -0,0 +1,184 @@
+"""
+Recorder.py
+
+Records role clicks as they arrive, so real traffic (the bursts after an announcement, the mix of toggles, gives and
+takes) can be replayed offline against a new version of the bot; see benchmarks/replay_interactions.py.
+
+Recording is off unless ROLE_BOT_RECORD_INTERACTIONS is True. Each click is kept as one small JSON object: when it
+arrived, how old it was by then, the component's custom_id, the member's roles that the component could look at
+or change, and for an exclusive group or a select menu the other roles it covers. Nothing else is kept: members are
+numbered in the order they first click, and the numbering is only held in memory, so a recording can't be tied back
+to anyone, or to another recording. Names, tokens, message content and the like are never recorded.
+
+Clicks are buffered and written by a background task to a gzipped JSON lines file in DATA_DIR, a new one each
+time the bot starts. The first line describes the recording.
+
+Depends on: Constants, CustomId, Metrics
+"""
+# import libraries
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+# import discord
+import discord
+
+# import local constants
+from ptn.buttonrolebot._metadata import __version__
+from ptn.buttonrolebot.constants import DATA_DIR, RECORD_INTERACTIONS, RECORDING_BUFFER_SIZE, RECORDING_FLUSH_INTERVAL
+
+# import local modules
+from ptn.buttonrolebot.modules.CustomId import decode_custom_id, decode_select_custom_id
+from ptn.buttonrolebot.modules.Metrics import RECORDED_INTERACTIONS
+
+log = logging.getLogger(__name__)
+
+
+RECORDING_DIR = os.path.join(DATA_DIR, 'recordings')
+RECORDING_FORMAT = 'brb-interactions'
+RECORDING_VERSION = 1
+
+
+def _message_components(message: Optional[discord.Message]):
+    if message is None:
+        return
+    for row in message.components:
+        yield from getattr(row, 'children', [])
+
+
+class InteractionRecorder:
+
+    def __init__(self, directory: str = RECORDING_DIR, enabled: bool = RECORD_INTERACTIONS):
+        """
+        Class represents a recording of the role clicks the bot has received since it started.
+        """
+        self.directory = directory
+        self.enabled = enabled
+        self.path: Optional[str] = None
+        self._started: Optional[float] = None # monotonic
+        self._header: Optional[dict] = None
+        self._members: Dict[int, int] = {} # user ID -> the number they're recorded as
+        self._buffer: Deque[dict] = deque(maxlen=RECORDING_BUFFER_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        # writes happen on a worker thread, and the final flush can start while one is still going
+        self._write_lock = threading.Lock()
+
+
+    def start(self):
+        """
+        Starts a new recording, if recording is on. Must be called from the event loop.
+        """
+        if not self.enabled or self._task is not None:
+            return
+        started = datetime.now(timezone.utc)
+        self.path = os.path.join(self.directory, started.strftime('interactions-%Y%m%d-%H%M%S.jsonl.gz'))
+        self._started = time.monotonic()
+        self._header = {'format': RECORDING_FORMAT, 'version': RECORDING_VERSION, 'started': started.isoformat(),
+                        'bot': __version__}
+        self._task = asyncio.create_task(self._run(), name='brb-interaction-recorder')
+        log.info('⏺ Recording role clicks to %s', self.path)
+
+
+    def record(self, interaction: discord.Interaction):
+        """
+        Adds a role click to the recording. Anything other than one of our role buttons or menus is ignored.
+        """
+        if self._task is None or interaction.type != discord.InteractionType.component or not interaction.data:
+            return
+        custom_id = interaction.data.get('custom_id', '')
+
+        entry = self._describe_component(interaction, custom_id)
+        if entry is None:
+            return
+        related = entry.pop('_related')
+        entry['t'] = round((time.monotonic() - self._started) * 1000)
+        entry['a'] = max(0, round((discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000))
+        entry['m'] = self._members.setdefault(interaction.user.id, len(self._members))
+        entry['r'] = [role.id for role in getattr(interaction.user, 'roles', []) if role.id in related]
+
+        if len(self._buffer) == self._buffer.maxlen:
+            RECORDED_INTERACTIONS.labels(result='dropped').inc()
+        self._buffer.append(entry)
+
+
+    def _describe_component(self, interaction: discord.Interaction, custom_id: str) -> Optional[dict]:
+        # the custom_id, any other roles the click depends on, and every role it could involve
+        decoded = decode_custom_id(custom_id)
+        if decoded is not None:
+            entry = {'c': custom_id}
+            related = {*decoded.role_ids, *decoded.required, *decoded.forbidden}
+            if decoded.group:
+                # the other buttons in its exclusive group, whose roles a click takes away
+                group = []
+                for component in _message_components(interaction.message):
+                    other = getattr(component, 'custom_id', None)
+                    other_decoded = decode_custom_id(other) if other and other != custom_id else None
+                    if other_decoded is not None and other_decoded.group == decoded.group:
+                        group.append(other)
+                        related.update(other_decoded.role_ids)
+                entry['g'] = group
+            entry['_related'] = related
+            return entry
+
+        if decode_select_custom_id(custom_id) is not None:
+            options = []
+            for component in _message_components(interaction.message):
+                if getattr(component, 'custom_id', None) == custom_id:
+                    options = [option.value for option in component.options]
+                    break
+            return {'c': custom_id, 'o': options, 'v': list(interaction.data.get('values', [])),
+                    '_related': {int(value) for value in options if value.isdigit()}}
+        return None
+
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(RECORDING_FLUSH_INTERVAL)
+            if self._buffer:
+                await asyncio.to_thread(self._write, self._drain())
+
+
+    def _drain(self) -> List[dict]:
+        entries = list(self._buffer)
+        self._buffer.clear()
+        return entries
+
+
+    def flush(self):
+        """
+        Writes any buffered clicks now, blocking, and stops recording, e.g. on shutdown. Waits for any write
+        already in progress to finish first.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._buffer:
+            self._write(self._drain())
+
+
+    def _write(self, entries: List[dict]):
+        # one writer at a time, so gzip members don't interleave and the header is only written once
+        with self._write_lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                new_file = not os.path.exists(self.path)
+                # each write adds a gzip member; gzip reads them back as one stream
+                with gzip.open(self.path, 'at', encoding='utf-8') as file:
+                    if new_file:
+                        file.write(json.dumps(self._header, separators=(',', ':')) + '\n')
+                    file.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+                RECORDED_INTERACTIONS.labels(result='written').inc(len(entries))
+            except OSError as e:
+                log.warning("⚠ Couldn't write %s recorded clicks to %s: %s", len(entries), self.path, e)
+                RECORDED_INTERACTIONS.labels(result='dropped').inc(len(entries))
+
+
+# the recording role clicks are added to
+interaction_recorder = InteractionRecorder()
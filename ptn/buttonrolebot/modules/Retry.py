@@ -0,0 +1,122 @@
+"""
+Retry.py
+
+Retries role mutations that fail for reasons that pass, like a Discord 5xx or a dropped connection.
+
+Errors are split into permanent ones, which no amount of retrying will fix (Forbidden, NotFound, any other 4xx),
+and transient ones (5xx, 429, network errors and timeouts). Transient errors are retried with full-jitter
+exponential backoff so a burst of failures doesn't come back as a burst of retries, but never past the caller's
+deadline: a retry that couldn't finish in time isn't attempted, and the last error is raised instead.
+
+discord.py already retries some 5xx and 429 responses inside a single request; this covers what gets through.
+
+Depends on: Constants, Metrics
+"""
+# import libraries
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import aiohttp
+
+# import discord
+from discord import Forbidden, HTTPException, NotFound
+
+# import local constants
+from ptn.buttonrolebot.constants import ROLE_MUTATION_ATTEMPTS, ROLE_MUTATION_BACKOFF_BASE, ROLE_MUTATION_BACKOFF_MAX
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_MUTATION_RETRIES, ROLE_MUTATION_RESULTS
+
+log = logging.getLogger(__name__)
+
+
+T = TypeVar('T')
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """
+    Works out whether an error is worth retrying.
+
+    :returns: The reason to retry (server_error, rate_limited or network), or None if the error is permanent.
+    """
+    if isinstance(error, (Forbidden, NotFound)):
+        return None
+    if isinstance(error, HTTPException):
+        if error.status == 429:
+            return 'rate_limited'
+        if error.status >= 500:
+            return 'server_error'
+        return None
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)):
+        return 'network'
+    return None
+
+
+class RetryPolicy:
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float):
+        """
+        Class represents how often and how patiently to retry transient errors.
+
+        :param attempts: Tries in total, including the first.
+        :param base_delay: The most the first retry waits, in seconds. Doubles with each attempt.
+        :param max_delay: The most any retry waits, in seconds.
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Seconds to wait before the given retry (1 for the first retry).
+        """
+        # Discord knows best when it's telling us to slow down
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None and isinstance(error, HTTPException) and error.status == 429:
+            retry_after = error.response.headers.get('Retry-After')
+        if retry_after:
+            # but never wait longer than we would for anything else, e.g. on a long global rate limit
+            return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+    async def run(self, call: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """
+        Calls and awaits call(), retrying transient errors.
+
+        :param call: A zero-argument function returning a fresh awaitable for each attempt.
+        :param deadline: A time.monotonic() timestamp after which no retry will be started.
+        :raises: The error from the last attempt, if none succeeded.
+        """
+        attempt = 1
+        while True:
+            try:
+                result = await call()
+            except Exception as e:
+                reason = classify_error(e)
+                if reason is None:
+                    ROLE_MUTATION_RESULTS.labels(result='permanent').inc()
+                    raise
+
+                delay = self.backoff(attempt, e)
+                if attempt >= self.attempts or (deadline is not None and time.monotonic() + delay >= deadline):
+                    log.warning('⚠ Giving up after %s attempt(s): %s', attempt, e)
+                    ROLE_MUTATION_RESULTS.labels(result='exhausted').inc()
+                    raise
+
+                log.warning('🔁 Attempt %s failed (%s: %s), retrying in %.2fs', attempt, reason, e, delay)
+                ROLE_MUTATION_RETRIES.labels(reason=reason).inc()
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            ROLE_MUTATION_RESULTS.labels(result='ok' if attempt == 1 else 'retried_ok').inc()
+            return result
+
+
+# the policy for role mutations
+role_retry = RetryPolicy(ROLE_MUTATION_ATTEMPTS, ROLE_MUTATION_BACKOFF_BASE, ROLE_MUTATION_BACKOFF_MAX)
@@ -0,0 +1,285 @@
+"""
+RoleActor.py
+
+Serialises and coalesces role changes per member.
+
+Each member gets a MemberRoleActor the first time they click a role button. Clicks queue up as
+RoleOperations on that actor; whenever the actor is free it takes everything pending, works out which
+roles that gives and takes, and applies them in a single request: add_roles or remove_roles for a lone
+role, otherwise member.edit(roles=...) with the member's latest known roles plus and minus the batch's
+changes, so roles changed by anyone else in the meantime are left as they are. Every queued
+interaction is then answered with the final state of its role(s). Bundle buttons queue a single
+operation covering all their roles, so a bundle also costs one call, and buttons in an exclusive group
+remove the group's other roles in that same call. Once nothing is pending the actor
+removes itself from the registry, so idle members cost nothing. Transient failures are retried
+(see Retry.py) until the latest deadline of the operations in the batch.
+
+Depends on: Logger, Metrics, Retry, RoleScheduler, Tracing
+"""
+# import libraries
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+# import discord
+import discord
+
+# import local modules
+from ptn.buttonrolebot.modules.Logger import click_log
+from ptn.buttonrolebot.modules.Retry import role_retry
+from ptn.buttonrolebot.modules.Metrics import ROLE_MUTATION_SECONDS
+from ptn.buttonrolebot.modules.RoleScheduler import role_scheduler, PRIORITY_INTERACTIVE, LANE_NAMES
+from ptn.buttonrolebot.modules.Tracing import span
+
+
+class RoleOperation:
+
+    def __init__(self, roles: List[discord.Role], action: str, priority: int = PRIORITY_INTERACTIVE,
+                 exclusive_of: Optional[List[discord.Role]] = None, deadline: Optional[float] = None):
+        """
+        Class represents a single requested role change for a member.
+
+        :param roles: The role(s) to manage. Several roles are managed together as a bundle.
+        :param action: One of give, take or toggle.
+        :param priority: The RoleScheduler lane to send the change in.
+        :param exclusive_of: Roles to remove whenever this operation gives its roles, e.g. the other
+                             roles in an exclusive group.
+        :param deadline: A time.monotonic() timestamp after which the operation shouldn't be retried.
+        """
+        self.roles = roles
+        self.action = action
+        self.priority = priority
+        self.exclusive_of = exclusive_of or []
+        self.deadline = deadline
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def is_duplicate_of(self, other: 'RoleOperation'):
+        """
+        Whether this operation asks for the same thing as another, e.g. from a double-click.
+        """
+        return self.action == other.action and {role.id for role in self.roles} == {role.id for role in other.roles} \
+            and {role.id for role in self.exclusive_of} == {role.id for role in other.exclusive_of}
+
+    def overlaps(self, other: 'RoleOperation'):
+        """
+        Whether this operation and another could change any of the same roles.
+        """
+        return not {role.id for role in self.roles + self.exclusive_of}.isdisjoint(
+            role.id for role in other.roles + other.exclusive_of)
+
+
+class MemberRoleActor:
+
+    def __init__(self, registry: 'RoleActorRegistry', member: discord.Member):
+        """
+        Class represents the role change queue for a single member.
+        """
+        self.registry = registry
+        self.member: discord.Member = member
+        self.pending: List[RoleOperation] = []
+        self.in_flight: List[RoleOperation] = []
+        self.task: Optional[asyncio.Task] = None
+
+
+    def submit(self, member: discord.Member, roles: List[discord.Role], action: str, priority: int,
+               exclusive_of: Optional[List[discord.Role]] = None, deadline: Optional[float] = None) -> asyncio.Future:
+        """
+        Queues a role change, returning a future for its result.
+
+        A request identical to the last one queued or being applied for the same roles shares that
+        request's result instead of being applied twice, so double-clicking a toggle doesn't immediately
+        undo itself. If a different change to those roles was queued in between, the request is queued
+        after it as usual, so its answer reflects the order the clicks came in.
+        """
+        operation = RoleOperation(roles, action, priority, exclusive_of, deadline)
+        for existing in reversed(self.in_flight + self.pending):
+            if not operation.overlaps(existing):
+                continue
+            if operation.is_duplicate_of(existing):
+                click_log.debug('♻ Coalescing duplicate %s of %s for %s', action, roles, member)
+                return existing.future
+            break
+
+        if self.task is None:
+            # nothing in progress, so the interaction's member data is the freshest we have
+            self.member = member
+
+        self.pending.append(operation)
+
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(), name=f'brb-role-actor-{member.id}')
+
+        return operation.future
+
+
+    async def _run(self):
+        try:
+            while self.pending:
+                self.in_flight, self.pending = self.pending, []
+                await self._apply(self.in_flight)
+                self.in_flight = []
+        finally:
+            self.task = None
+            if not self.pending:
+                self.registry.evict(self.member.id)
+
+
+    async def _send(self, added: Dict[int, discord.Role], removed: Dict[int, discord.Role]):
+        # one attempt at applying a batch's changes
+        member = self.member
+        if len(added) + len(removed) == 1:
+            # a single role can be given or taken on its own, which can't touch any of the member's other roles
+            if added:
+                await member.add_roles(*added.values())
+            else:
+                await member.remove_roles(*removed.values())
+            role_ids = (set(member._roles) | added.keys()) - removed.keys()
+            # remember the change, as add_roles and remove_roles don't give us the updated member
+            member._roles = discord.utils.SnowflakeList(role_ids)
+            return
+
+        # a full role set, so start from the member's roles as we know them now rather than when the batch started:
+        # changes made meanwhile by staff, AutoMod or other bots then aren't undone, even after a retry's backoff
+        role_ids = (set(member._roles) | added.keys()) - removed.keys()
+        updated_member = await member.edit(roles=[discord.Object(role_id) for role_id in role_ids])
+        if updated_member is not None:
+            self.member = updated_member
+
+
+    async def _apply(self, batch: List[RoleOperation]):
+        click_log.debug('⏳ Applying %s role operation(s) for %s', len(batch), self.member)
+        try:
+            current_roles = {role.id: role for role in self.member.roles if not role.is_default()}
+            new_roles = dict(current_roles)
+
+            # work out the resulting role set, in click order
+            for operation in batch:
+                action = operation.action
+                if action == 'toggle':
+                    # a bundle toggles as one: if the member has all of it, take it all, otherwise give the rest
+                    action = 'take' if all(role.id in new_roles for role in operation.roles) else 'give'
+                for role in operation.roles:
+                    if action == 'give':
+                        new_roles[role.id] = role
+                    else:
+                        new_roles.pop(role.id, None)
+                if action == 'give':
+                    for role in operation.exclusive_of:
+                        new_roles.pop(role.id, None)
+
+            added = {role_id: role for role_id, role in new_roles.items() if role_id not in current_roles}
+            removed = {role_id: role for role_id, role in current_roles.items() if role_id not in new_roles}
+            if added or removed:
+                priority = min(operation.priority for operation in batch)
+                # keep retrying as long as any click in the batch is still waiting on us
+                deadlines = [operation.deadline for operation in batch]
+                deadline = None if None in deadlines else max(deadlines)
+                # each retry queues again, so retries are rate limited like everything else
+                with ROLE_MUTATION_SECONDS.labels(lane=LANE_NAMES[priority]).time(), \
+                        span('role_mutation', lane=LANE_NAMES[priority], operations=len(batch)):
+                    await role_retry.run(
+                        lambda: role_scheduler.run(lambda: self._send(added, removed), priority),
+                        deadline
+                    )
+                if click_log.isEnabledFor(logging.DEBUG):
+                    # the role name lists are built here rather than lazily, so only when they'll be logged
+                    click_log.debug('✅ Updated roles for %s: ➕ %s ➖ %s', self.member,
+                                    [role.name for role in added.values()], [role.name for role in removed.values()])
+            else:
+                click_log.debug('No role changes required for %s', self.member)
+
+        except Exception as e:
+            for operation in batch:
+                if not operation.future.done():
+                    operation.future.set_exception(e)
+            return
+
+        # answer each operation with the final state of each of its roles
+        for operation in batch:
+            adverbs = []
+            for role in operation.roles + operation.exclusive_of:
+                had_role = role.id in current_roles
+                has_role = role.id in new_roles
+                if has_role:
+                    adverbs.append('already' if had_role else 'now')
+                else:
+                    adverbs.append('no longer' if had_role else 'don\'t')
+            if not operation.future.done():
+                operation.future.set_result(adverbs)
+
+
+class RoleActorRegistry:
+
+    def __init__(self):
+        """
+        Class represents the live MemberRoleActors, keyed by member ID. Actors are created on demand
+        and evict themselves once their queue is empty.
+        """
+        self._actors: Dict[int, MemberRoleActor] = {}
+
+
+    async def apply(self, member: discord.Member, role: discord.Role, action: str,
+                    priority: int = PRIORITY_INTERACTIVE) -> str:
+        """
+        Queues a role change for a member and waits for the outcome.
+
+        :returns: The adverb describing the member's final relationship to the role: now, no longer,
+                  already or don't.
+        """
+        adverbs = await self.apply_bundle(member, [role], action, priority)
+        return adverbs[0]
+
+
+    async def apply_bundle(self, member: discord.Member, roles: List[discord.Role], action: str,
+                           priority: int = PRIORITY_INTERACTIVE,
+                           exclusive_of: Optional[List[discord.Role]] = None,
+                           deadline: Optional[float] = None) -> List[str]:
+        """
+        Queues a change to several roles at once for a member and waits for the outcome. The roles are
+        always changed together, in the same request.
+
+        :param exclusive_of: Roles to remove in the same request if the roles are given.
+        :param deadline: A time.monotonic() timestamp after which transient failures aren't retried.
+        :returns: The adverb for each role, in the order given, followed by one for each exclusive_of role.
+        """
+        actor = self._actors.get(member.id)
+        if actor is None:
+            actor = MemberRoleActor(self, member)
+            self._actors[member.id] = actor
+
+        future = actor.submit(member, roles, action, priority, exclusive_of, deadline)
+
+        # shield the future: it may be shared with other waiters, and if our caller times out
+        # we still want the others (and the actor) to see the result
+        return await asyncio.shield(future)
+
+
+    def is_busy(self, member_id: int) -> bool:
+        """
+        Whether a member has role changes queued or being applied.
+        """
+        return member_id in self._actors
+
+
+    def member_updated(self, member: discord.Member):
+        """
+        Hands a member's latest roles, e.g. from a gateway member update, to their actor if they have one, so its
+        next request starts from them.
+        """
+        actor = self._actors.get(member.id)
+        if actor is not None:
+            actor.member = member
+
+
+    def evict(self, member_id: int):
+        actor = self._actors.get(member_id)
+        if actor is not None and actor.task is None and not actor.pending:
+            del self._actors[member_id]
+
+
+    def __len__(self):
+        return len(self._actors)
+
+
+# the registry used by role buttons
+role_actors = RoleActorRegistry()
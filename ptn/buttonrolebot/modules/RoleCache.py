@@ -0,0 +1,165 @@
+"""
+RoleCache.py
+
+Maintained role lookups for the click path and the button editor.
+
+guild.roles returns a freshly sorted sequence on every access, so discord.utils.get(guild.roles, id=...)
+costs a sort and a linear scan per lookup. The RoleIndex keeps a role_id -> Role dict instead, which is
+populated when a guild becomes available, kept current from the on_guild_role_* events in bot.py, and emptied
+of a guild's roles when the bot leaves it.
+
+The BotRoleSnapshot holds the bot's top-role position and the set of role IDs it is able to manage, so the
+click path doesn't need to resolve the bot's own Member (potentially an HTTP fetch_member, since member caching
+is disabled) for every click. It is rebuilt only when the role hierarchy or the bot's own roles change.
+
+Depends on: Metrics
+"""
+# import libraries
+import logging
+from typing import Dict, FrozenSet, Optional, Tuple
+
+# import discord
+import discord
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_INDEX_LOOKUPS
+
+log = logging.getLogger(__name__)
+
+
+class RoleIndex:
+
+    def __init__(self):
+        """
+        Class represents a role_id -> discord.Role index for the guild(s) the bot is in.
+
+        Role IDs are snowflakes and therefore unique across guilds, so one flat dict serves every guild.
+        """
+        self._roles: Dict[int, discord.Role] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def rebuild(self, guild: discord.Guild):
+        """
+        Replaces all indexed roles for a guild with its current role list.
+        """
+        self.remove_guild(guild)
+        for role in guild.roles:
+            self._roles[role.id] = role
+        log.debug('🗂 Indexed %s roles for %s', len(guild.roles), guild)
+
+
+    def add(self, role: discord.Role):
+        """
+        Adds or replaces a single role, e.g. from on_guild_role_create/update.
+        """
+        self._roles[role.id] = role
+
+
+    def remove(self, role: discord.Role):
+        """
+        Removes a single role, e.g. from on_guild_role_delete.
+        """
+        self._roles.pop(role.id, None)
+
+
+    def remove_guild(self, guild: discord.Guild):
+        """
+        Forgets every role of a guild, e.g. from on_guild_remove when the bot leaves it.
+        """
+        self._roles = {role_id: role for role_id, role in self._roles.items() if role.guild.id != guild.id}
+
+
+    def get(self, guild: Optional[discord.Guild], role_id: int) -> Optional[discord.Role]:
+        """
+        Returns the role with the given ID in the given guild, or None if it doesn't exist there.
+
+        Falls back to the guild's own role cache on a miss, and indexes the result so the next lookup hits.
+        """
+        role = self._roles.get(role_id)
+        if role is not None and (guild is None or role.guild.id == guild.id):
+            self.hits += 1
+            ROLE_INDEX_LOOKUPS.labels(result='hit').inc()
+            return role
+
+        self.misses += 1
+        role = guild.get_role(role_id) if guild is not None else None
+        if role is None:
+            ROLE_INDEX_LOOKUPS.labels(result='absent').inc()
+            return None
+
+        ROLE_INDEX_LOOKUPS.labels(result='miss').inc()
+        self._roles[role.id] = role
+        return role
+
+
+    def __len__(self):
+        return len(self._roles)
+
+
+class BotRoleSnapshot:
+
+    def __init__(self):
+        """
+        Class represents which roles the bot can manage, per guild.
+
+        A role can be managed if it sits below the bot's top role and isn't managed by an integration.
+        """
+        self._snapshots: Dict[int, Tuple[int, FrozenSet[int]]] = {}
+
+
+    def rebuild(self, guild: discord.Guild, bot_member: Optional[discord.Member] = None):
+        """
+        Recalculates the snapshot for a guild from the bot's member object.
+
+        :param bot_member: The bot's Member, if already known. Defaults to guild.me.
+        """
+        bot_member = bot_member or guild.me
+        if bot_member is None:
+            log.warning("⚠ No bot member available for %s, can't snapshot manageable roles", guild)
+            self._snapshots.pop(guild.id, None)
+            return
+
+        top_role: discord.Role = bot_member.top_role
+        manageable = frozenset(
+            role.id for role in guild.roles
+            if role < top_role and not role.managed and not role.is_default()
+        )
+        self._snapshots[guild.id] = (top_role.position, manageable)
+        log.debug('🗂 Bot top role in %s is %s at position %s, can manage %s roles', guild, top_role, top_role.position, len(manageable))
+
+
+    def remove_guild(self, guild: discord.Guild):
+        """
+        Forgets the snapshot for a guild, e.g. from on_guild_remove when the bot leaves it.
+        """
+        self._snapshots.pop(guild.id, None)
+
+
+    def is_ready(self, guild: discord.Guild) -> bool:
+        """
+        Whether a snapshot exists for this guild.
+        """
+        return guild.id in self._snapshots
+
+
+    def top_role_position(self, guild: discord.Guild) -> Optional[int]:
+        """
+        Returns the position of the bot's top role in this guild, if snapshotted.
+        """
+        snapshot = self._snapshots.get(guild.id)
+        return snapshot[0] if snapshot else None
+
+
+    def can_manage(self, role: discord.Role) -> bool:
+        """
+        Whether the bot can grant/remove this role, according to the snapshot for the role's guild.
+        """
+        snapshot = self._snapshots.get(role.guild.id)
+        return snapshot is not None and role.id in snapshot[1]
+
+
+# the index and snapshot used throughout the bot
+role_index = RoleIndex()
+bot_roles = BotRoleSnapshot()
@@ -0,0 +1,306 @@
+"""
+RoleExpiry.py
+
+Takes temporary roles away again once they expire, e.g. a 24h LFG ping role.
+
+Every pending expiry lives in one heap ordered by due time, served by a single task that sleeps until the earliest
+is due, so tens of thousands of them cost a heap entry each rather than a task each. Due removals are taken off
+the heap in batches and sent through the RoleScheduler's bulk lane, so they're rate limited and never hold up
+member clicks; several roles expiring for the same cached member go in a single request.
+
+Rescheduling or cancelling an expiry just updates its entry in a dict; the stale heap entry is skipped when it
+comes up. Expiries are persisted to SQLite in DATA_DIR, batched like the capacity counters, so a restart picks
+up where it left off and removes anything that fell due while the bot was down.
+
+Depends on: Constants, Capacity, Metrics, RoleActor, RoleCache, RoleScheduler
+"""
+# import libraries
+import asyncio
+import heapq
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# import discord
+import discord
+from discord import Forbidden, NotFound
+
+# import local constants
+from ptn.buttonrolebot.constants import DATA_DIR, EXPIRY_FLUSH_DELAY, EXPIRY_BATCH_SIZE, EXPIRY_RETRY_DELAY
+
+# import local modules
+from ptn.buttonrolebot.modules.Capacity import role_capacity
+from ptn.buttonrolebot.modules.Metrics import ROLE_EXPIRY_PENDING, ROLE_EXPIRY_REMOVALS
+from ptn.buttonrolebot.modules.RoleActor import role_actors
+from ptn.buttonrolebot.modules.RoleCache import role_index
+from ptn.buttonrolebot.modules.RoleScheduler import role_scheduler, PRIORITY_BULK
+
+log = logging.getLogger(__name__)
+
+
+EXPIRY_DB_PATH = os.path.join(DATA_DIR, 'role_expiry.sqlite3')
+
+ExpiryKey = Tuple[int, int, int] # guild ID, member ID, role ID
+
+
+class RoleExpiryScheduler:
+
+    def __init__(self, path: str = EXPIRY_DB_PATH):
+        """
+        Class represents the pending removals of temporary roles, and their SQLite store.
+        """
+        self.path = path
+        self._heap: List[Tuple[float, int, int, int]] = [] # (due, guild ID, member ID, role ID), may hold stale entries
+        self._due: Dict[ExpiryKey, float] = {} # the live due time of each expiry
+        self._by_member: Dict[Tuple[int, int], Set[int]] = {} # (guild ID, member ID) -> role IDs with an expiry
+        self._dirty: Dict[ExpiryKey, Optional[float]] = {} # changes waiting to be written, None for deletions
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[discord.Client] = None
+
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE IF NOT EXISTS role_expiry (guild_id INTEGER NOT NULL, member_id INTEGER NOT NULL, '
+                           'role_id INTEGER NOT NULL, due REAL NOT NULL, PRIMARY KEY (guild_id, member_id, role_id))')
+        return connection
+
+
+    def load(self):
+        """
+        Reads every pending expiry from disk.
+        """
+        try:
+            with self._connect() as connection:
+                for guild_id, member_id, role_id, due in connection.execute('SELECT guild_id, member_id, role_id, due FROM role_expiry'):
+                    self._set((guild_id, member_id, role_id), due)
+            connection.close()
+            log.info('⌛ Loaded %s pending role expiries from %s', len(self._due), self.path)
+        except sqlite3.Error as e:
+            log.warning("⚠ Couldn't load role expiries from %s: %s", self.path, e)
+
+
+    def start(self, client: discord.Client):
+        """
+        Starts the task that removes expired roles, once the client is ready.
+        """
+        self._client = client
+        self._wake = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name='brb-role-expiry')
+
+
+    def __len__(self):
+        return len(self._due)
+
+
+    def expiry_of(self, guild_id: int, member_id: int, role_id: int) -> Optional[float]:
+        """
+        When a member's role is due to be taken away, as a POSIX timestamp, or None if it isn't temporary.
+        """
+        return self._due.get((guild_id, member_id, role_id))
+
+
+    def schedule(self, guild_id: int, member_id: int, role_id: int, due: float):
+        """
+        Takes a member's role away at the given POSIX timestamp, replacing any expiry it already has.
+        """
+        key = (guild_id, member_id, role_id)
+        self._set(key, due)
+        self._dirty[key] = due
+        self._schedule_flush()
+        if self._wake is not None and self._heap[0][0] == due:
+            # it's our new earliest, so cut the current sleep short
+            self._wake.set()
+
+
+    def cancel(self, guild_id: int, member_id: int, role_id: int):
+        """
+        Forgets an expiry, e.g. because the member has already lost the role.
+        """
+        key = (guild_id, member_id, role_id)
+        if key in self._due:
+            self._unset(key)
+            self._dirty[key] = None
+            self._schedule_flush()
+
+
+    def cancel_member(self, guild_id: int, member_id: int):
+        for role_id in list(self._by_member.get((guild_id, member_id), ())):
+            self.cancel(guild_id, member_id, role_id)
+
+
+    def cancel_role(self, role_id: int):
+        for guild_id, member_id, expiring_role_id in [key for key in self._due if key[2] == role_id]:
+            self.cancel(guild_id, member_id, expiring_role_id)
+
+
+    def reconcile(self, member: discord.Member):
+        """
+        Drops the expiries of any temporary roles the member no longer holds.
+        """
+        role_ids = self._by_member.get((member.guild.id, member.id))
+        if not role_ids:
+            return
+        for role_id in [role_id for role_id in role_ids if member.get_role(role_id) is None]:
+            self.cancel(member.guild.id, member.id, role_id)
+
+
+    def _set(self, key: ExpiryKey, due: float):
+        self._due[key] = due
+        self._by_member.setdefault(key[:2], set()).add(key[2])
+        heapq.heappush(self._heap, (due, *key))
+        # every reschedule leaves a stale entry behind; tidy up before they outnumber the live ones
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due, *key) for key, due in self._due.items()]
+            heapq.heapify(self._heap)
+        ROLE_EXPIRY_PENDING.set(len(self._due))
+
+
+    def _unset(self, key: ExpiryKey):
+        del self._due[key]
+        member_roles = self._by_member.get(key[:2])
+        if member_roles is not None:
+            member_roles.discard(key[2])
+            if not member_roles:
+                del self._by_member[key[:2]]
+        ROLE_EXPIRY_PENDING.set(len(self._due))
+
+
+    def _pop_due(self, now: float) -> List[ExpiryKey]:
+        # take up to a batch of due expiries off the heap, skipping stale entries
+        batch = []
+        while self._heap and len(batch) < EXPIRY_BATCH_SIZE:
+            due, *key = self._heap[0]
+            key = tuple(key)
+            if self._due.get(key) != due:
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            self._unset(key)
+            self._dirty[key] = None
+            batch.append(key)
+        if batch:
+            self._schedule_flush()
+        return batch
+
+
+    async def _run(self):
+        await self._client.wait_until_ready()
+        log.info('⌛ Role expiry scheduler started with %s pending', len(self._due))
+        while True:
+            self._wake.clear()
+            batch = self._pop_due(time.time())
+            if batch:
+                await self._remove_batch(batch)
+                continue
+
+            # sleep until the next expiry is due, or something earlier is scheduled
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+    async def _remove_batch(self, batch: List[ExpiryKey]):
+        log.info('⌛ Removing %s expired role(s)', len(batch))
+        by_member: Dict[Tuple[int, int], List[int]] = {}
+        for guild_id, member_id, role_id in batch:
+            by_member.setdefault((guild_id, member_id), []).append(role_id)
+        await asyncio.gather(*(self._remove(guild_id, member_id, role_ids) for (guild_id, member_id), role_ids in by_member.items()))
+
+
+    async def _remove(self, guild_id: int, member_id: int, role_ids: List[int]):
+        guild = self._client.get_guild(guild_id)
+        if guild is None:
+            # the guild is unavailable right now, try again later
+            self._retry(guild_id, member_id, role_ids)
+            return
+
+        # roles deleted since they were given have nothing left to remove
+        roles = [role for role in (role_index.get(guild, role_id) for role_id in role_ids) if role is not None]
+        try:
+            member = guild.get_member(member_id)
+            if member is not None:
+                # one request for all of this member's expired roles, through their actor so it can't race their clicks
+                await role_actors.apply_bundle(member, roles, 'take', PRIORITY_BULK)
+            elif role_actors.is_busy(member_id):
+                # a click of theirs is queued or being applied, and would put the roles back from its own snapshot of
+                # their roles; try again once it's done
+                log.debug('⌛ %s has role changes in progress, putting off removing expired roles %s', member_id, role_ids)
+                self._retry(guild_id, member_id, [role.id for role in roles])
+                return
+            else:
+                # uncached, so remove each role directly rather than spending a request fetching the member
+                for role in roles:
+                    await role_scheduler.run(
+                        lambda role=role: self._client.http.remove_role(guild_id, member_id, role.id, reason='Temporary role expired'),
+                        PRIORITY_BULK
+                    )
+            ROLE_EXPIRY_REMOVALS.labels(result='removed').inc(len(roles))
+
+        except NotFound:
+            # the member has left, so there's nothing to take away
+            ROLE_EXPIRY_REMOVALS.labels(result='gone').inc(len(roles))
+        except Forbidden as e:
+            log.warning('⚠ Not allowed to remove expired roles %s from %s: %s', [role.name for role in roles], member_id, e)
+            ROLE_EXPIRY_REMOVALS.labels(result='forbidden').inc(len(roles))
+        except Exception as e:
+            log.warning('⚠ Failed removing expired roles %s from %s, will retry: %s', [role.name for role in roles], member_id, e)
+            ROLE_EXPIRY_REMOVALS.labels(result='retried').inc(len(roles))
+            self._retry(guild_id, member_id, [role.id for role in roles])
+            return
+
+        for role in roles:
+            if role_capacity.get(role.id) is not None:
+                role_capacity.release(role.id, member_id, holds=False)
+
+
+    def _retry(self, guild_id: int, member_id: int, role_ids: List[int]):
+        due = time.time() + EXPIRY_RETRY_DELAY
+        for role_id in role_ids:
+            # don't overwrite an expiry the member has been given again since
+            if (guild_id, member_id, role_id) not in self._due:
+                self.schedule(guild_id, member_id, role_id, due)
+
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(EXPIRY_FLUSH_DELAY, self.flush)
+
+
+    def flush(self):
+        """
+        Writes every change since the last flush to disk.
+        """
+        self._flush_handle = None
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        try:
+            with self._connect() as connection:
+                connection.executemany('INSERT OR REPLACE INTO role_expiry (guild_id, member_id, role_id, due) VALUES (?, ?, ?, ?)',
+                                       [(*key, due) for key, due in dirty.items() if due is not None])
+                connection.executemany('DELETE FROM role_expiry WHERE guild_id = ? AND member_id = ? AND role_id = ?',
+                                       [key for key, due in dirty.items() if due is None])
+            connection.close()
+        except sqlite3.Error as e:
+            log.warning("⚠ Couldn't save role expiries to %s: %s", self.path, e)
+            self._dirty = {**dirty, **self._dirty}
+
+
+# the scheduler for every temporary role
+role_expiry = RoleExpiryScheduler()
@@ -0,0 +1,186 @@
+"""
+RoleScheduler.py
+
+The single place role mutations are sent to Discord from.
+
+Every role PATCH goes through the RoleMutationScheduler, which paces requests with a token bucket modelled
+on Discord's per-guild member-modify rate limit and serves them by priority lane: interactive clicks first,
+then bulk/background work. Because it knows how deep its queue is it can estimate how long a new click will
+wait, which the click path shows the user instead of leaving them staring at a spinner.
+
+Depends on: constants, Metrics
+"""
+# import libraries
+import asyncio
+import contextvars
+import itertools
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional, TypeVar
+
+# import local constants
+from ptn.buttonrolebot.constants import ROLE_MUTATION_RATE, ROLE_MUTATION_BURST, ROLE_MUTATION_CONCURRENCY
+
+# import local modules
+from ptn.buttonrolebot.modules.Metrics import ROLE_SCHEDULER_QUEUE_DEPTH
+
+
+T = TypeVar('T')
+
+# priority lanes, lowest number is served first
+PRIORITY_INTERACTIVE = 0 # member clicks
+PRIORITY_BULK = 1 # background work, e.g. migrations and scheduled removals
+
+LANE_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BULK: 'bulk'
+}
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Class represents a token bucket refilling at rate tokens/second up to capacity tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        """
+        Tokens that could be taken right now.
+        """
+        self._refill()
+        return self.tokens
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        """
+        Seconds until the given number of tokens can be taken, 0 if they can be taken now.
+        """
+        return max(0.0, (tokens - self.available()) / self.rate)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """
+        Takes tokens if they're available, without waiting.
+        """
+        if self.time_until_available(tokens) > 0:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+class RoleMutationScheduler:
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        """
+        Class represents a prioritised, rate-limited queue of role mutations.
+
+        :param rate: Sustained mutations per second.
+        :param burst: Mutations allowed back-to-back before pacing kicks in.
+        :param concurrency: Maximum mutations awaiting a response from Discord at once.
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sequence = itertools.count()
+        self._lane_depth = Counter()
+        self.in_flight = 0
+
+
+    def _ensure_started(self):
+        # asyncio primitives are created lazily so they bind to the running loop
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name='brb-role-scheduler')
+
+
+    def depth(self, priority: int = PRIORITY_BULK) -> int:
+        """
+        Number of queued mutations that would be served before or alongside one of the given priority.
+        """
+        return sum(count for lane, count in self._lane_depth.items() if lane <= priority)
+
+
+    def estimate_wait(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Estimated seconds before a mutation submitted now at the given priority would be sent.
+        """
+        ahead = self.depth(priority) + 1
+        return self.bucket.time_until_available(ahead)
+
+
+    async def run(self, call: Callable[[], Awaitable[T]], priority: int = PRIORITY_INTERACTIVE) -> T:
+        """
+        Queues a role mutation and waits for its result.
+
+        :param call: A zero-argument function returning the awaitable that performs the mutation. It is only
+                     called once the scheduler is ready to send it.
+        :param priority: One of the PRIORITY_ lanes.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        # the call runs in the caller's context rather than the dispatcher's, so context variables such as the
+        # current trace span follow it
+        self._queue.put_nowait((priority, next(self._sequence), call, future, contextvars.copy_context()))
+        self._lane_depth[priority] += 1
+        ROLE_SCHEDULER_QUEUE_DEPTH.labels(lane=LANE_NAMES[priority]).set(self._lane_depth[priority])
+        return await future
+
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            priority, sequence, call, future, context = await self._queue.get()
+
+            if future.cancelled():
+                # whoever queued this has given up on it
+                self._dequeued(priority)
+                self._slots.release()
+                continue
+
+            delay = self.bucket.time_until_available()
+            if delay > 0:
+                # put it back while we wait for a token, so anything more urgent arriving meanwhile goes first
+                self._queue.put_nowait((priority, sequence, call, future, context))
+                self._slots.release()
+                await asyncio.sleep(delay)
+                continue
+
+            self.bucket.try_acquire()
+            self._dequeued(priority)
+            context.run(asyncio.create_task, self._execute(call, future))
+
+
+    def _dequeued(self, priority: int):
+        self._lane_depth[priority] -= 1
+        ROLE_SCHEDULER_QUEUE_DEPTH.labels(lane=LANE_NAMES[priority]).set(self._lane_depth[priority])
+
+
+    async def _execute(self, call: Callable[[], Awaitable[T]], future: asyncio.Future):
+        self.in_flight += 1
+        try:
+            result = await call()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+# the scheduler all role mutations go through
+role_scheduler = RoleMutationScheduler(ROLE_MUTATION_RATE, ROLE_MUTATION_BURST, ROLE_MUTATION_CONCURRENCY)
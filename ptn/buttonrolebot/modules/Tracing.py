@@ -0,0 +1,315 @@
+"""
+Tracing.py
+
+Lightweight span tracing, so a slow editor session or click can be broken down into the hops that cost the time.
+
+Every traced callback opens a span for its interaction; the helpers it awaits and every request discord.py makes
+to the Discord API while it runs are recorded as child spans, found through a context variable so nothing has to
+be passed around. Spans are grouped into traces by editor session: all the interactions of one "Manage Role
+Buttons" session share the ID of the command interaction that opened it, so the whole session can be read back in
+order. Interactions outside an editor, like role clicks, are a trace of their own.
+
+Finished spans are kept in a bounded buffer and written out by a background task as JSON lines to a rotating file
+in DATA_DIR, so the only cost on the event loop is building a small dict per span. Spans record the ID of the
+member behind each interaction, so tracing is off unless ROLE_BOT_TRACING is True.
+
+Depends on: Constants, HttpStats, Metrics, EmbedData, RoleButtonData
+"""
+# import libraries
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+import aiohttp
+
+# import discord
+import discord
+
+# import local classes
+from ptn.buttonrolebot.classes.EmbedData import EmbedData
+from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
+
+# import local constants
+from ptn.buttonrolebot.constants import DATA_DIR, TRACING_ENABLED, TRACE_BUFFER_SIZE, TRACE_EXPORT_INTERVAL, \
+    TRACE_FILE_MAX_BYTES, TRACE_FILE_BACKUPS
+
+# import local modules
+from ptn.buttonrolebot.modules.HttpStats import route_template
+from ptn.buttonrolebot.modules.Metrics import TRACE_SPANS
+
+log = logging.getLogger(__name__)
+
+
+TRACE_PATH = os.path.join(DATA_DIR, 'traces', 'spans.jsonl')
+
+
+class Span:
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'interaction_id', 'name', 'started', 'start_time', 'attributes',
+                 'status')
+
+    def __init__(self, name: str, trace_id: str, parent: Optional['Span'] = None, interaction_id: Optional[int] = None,
+                 **attributes):
+        """
+        Class represents one timed step of an interaction.
+
+        :param trace_id: The editor session or interaction the span belongs to.
+        :param parent: The span this step was taken from, if any.
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent.span_id if parent else None
+        self.interaction_id = interaction_id if interaction_id is not None else (parent.interaction_id if parent else None)
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+        self.attributes: Dict[str, Any] = attributes
+        self.status = 'ok'
+
+
+    def to_dictionary(self, seconds: float) -> dict:
+        record = {
+            'trace': self.trace_id,
+            'span': self.span_id,
+            'parent': self.parent_id,
+            'interaction': str(self.interaction_id) if self.interaction_id else None,
+            'name': self.name,
+            'start': round(self.start_time, 6),
+            'ms': round(seconds * 1000, 3),
+            'status': self.status
+        }
+        if self.attributes:
+            record['attrs'] = self.attributes
+        return record
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('brb_current_span', default=None)
+
+# embed editors don't carry the interaction that opened them, so their sessions are bound explicitly
+_embed_sessions: 'weakref.WeakKeyDictionary[EmbedData, str]' = weakref.WeakKeyDictionary()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _session_of(args) -> Optional[str]:
+    # the editor session a callback belongs to, from its button or embed data, or the view/modal/button holding it
+    for arg in args:
+        data = arg if isinstance(arg, (RoleButtonData, EmbedData)) else \
+            getattr(arg, 'button_data', None) or getattr(arg, 'embed_data', None)
+        if isinstance(data, RoleButtonData) and isinstance(data.preview_message, discord.Interaction):
+            return str(data.preview_message.id)
+        if isinstance(data, EmbedData) and data in _embed_sessions:
+            return _embed_sessions[data]
+    return None
+
+
+def bind_session(embed_data: EmbedData):
+    """
+    Makes later interactions with an embed editor part of the current trace.
+    """
+    span = current_span()
+    if span is not None:
+        _embed_sessions[embed_data] = span.trace_id
+
+
+class SpanExporter:
+
+    def __init__(self, path: str = TRACE_PATH, max_bytes: int = TRACE_FILE_MAX_BYTES, backups: int = TRACE_FILE_BACKUPS):
+        """
+        Class represents the buffer of finished spans and the task that writes them to disk.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer: Deque[dict] = deque(maxlen=TRACE_BUFFER_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        # writes happen on a worker thread, and the final flush can start while one is still going
+        self._write_lock = threading.Lock()
+
+
+    def submit(self, record: dict):
+        if len(self._buffer) == self._buffer.maxlen:
+            # the oldest span falls out; the exporter's fallen behind or the disk is unhappy
+            TRACE_SPANS.labels(result='dropped').inc()
+        self._buffer.append(record)
+
+
+    def start(self):
+        """
+        Starts the background export. Must be called from the event loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name='brb-span-exporter')
+
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TRACE_EXPORT_INTERVAL)
+            if self._buffer:
+                await asyncio.to_thread(self._write, self._drain())
+
+
+    def _drain(self) -> List[dict]:
+        records = list(self._buffer)
+        self._buffer.clear()
+        return records
+
+
+    def flush(self):
+        """
+        Writes any buffered spans now, blocking, e.g. on shutdown. Waits for any write already in progress to
+        finish first.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._buffer:
+            self._write(self._drain())
+
+
+    def _write(self, records: List[dict]):
+        # one writer at a time, so lines don't interleave and two writers can't rotate the files at once
+        with self._write_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'a', encoding='utf-8') as file:
+                    file.writelines(json.dumps(record, separators=(',', ':'), default=str) + '\n' for record in records)
+                TRACE_SPANS.labels(result='exported').inc(len(records))
+            except OSError as e:
+                log.warning("⚠ Couldn't write %s trace spans to %s: %s", len(records), self.path, e)
+                TRACE_SPANS.labels(result='dropped').inc(len(records))
+
+
+    def _rotate(self):
+        # spans.jsonl -> spans.jsonl.1 -> ... -> spans.jsonl.<backups>, the oldest is dropped
+        for index in range(self.backups - 1, 0, -1):
+            older = f'{self.path}.{index}'
+            if os.path.exists(older):
+                os.replace(older, f'{self.path}.{index + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+
+# the exporter every span is written through
+span_exporter = SpanExporter()
+
+
+def _finish(span: Span, error: Optional[BaseException] = None):
+    if error is not None:
+        span.status = 'cancelled' if isinstance(error, asyncio.CancelledError) else 'error'
+        span.attributes['error'] = type(error).__name__
+    span_exporter.submit(span.to_dictionary(time.perf_counter() - span.started))
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Times a step of the current interaction. Does nothing outside a traced callback.
+
+    Works around awaits as well as synchronous code:
+
+        with span('fetch_message'):
+            message = await channel.fetch_message(message_id)
+    """
+    parent = _current_span.get()
+    if parent is None or not TRACING_ENABLED:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent, **attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        _finish(child, e)
+        raise
+    else:
+        _finish(child)
+    finally:
+        _current_span.reset(token)
+
+
+def traced(func):
+    """
+    Decorator recording a span for each call of an async function.
+
+    Called with an Interaction and no span open, e.g. as a component callback or command, it starts a new span
+    for that interaction, in its editor session's trace if it has one. Otherwise it's a child of the current span.
+    """
+    if not TRACING_ENABLED:
+        return func
+    if not inspect.iscoroutinefunction(func):
+        raise TypeError(f"traced only wraps async functions, not {func.__qualname__}")
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        parent = _current_span.get()
+        if parent is not None:
+            current = Span(name, parent.trace_id, parent)
+        else:
+            interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+            if interaction is None:
+                return await func(*args, **kwargs)
+            trace_id = _session_of(args) or str(interaction.id)
+            attributes = {'user': str(interaction.user.id)}
+            if interaction.data and 'custom_id' in interaction.data:
+                attributes['custom_id'] = interaction.data['custom_id']
+            current = Span(name, trace_id, interaction_id=interaction.id, **attributes)
+
+        token = _current_span.set(current)
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            _finish(current, e)
+            raise
+        else:
+            _finish(current)
+            return result
+        finally:
+            _current_span.reset(token)
+    return wrapper
+
+
+def instrument_trace_config(trace_config: aiohttp.TraceConfig) -> aiohttp.TraceConfig:
+    """
+    Adds a span for every Discord API request made during a traced interaction to discord.py's TraceConfig.
+    """
+    if not TRACING_ENABLED:
+        return trace_config
+
+    async def on_request_start(session, context, params: aiohttp.TraceRequestStartParams):
+        parent = _current_span.get()
+        context.brb_span = Span('http', parent.trace_id, parent, method=params.method,
+                                route=route_template(params.url.path)) if parent is not None else None
+
+    async def on_request_end(session, context, params: aiohttp.TraceRequestEndParams):
+        request_span = getattr(context, 'brb_span', None)
+        if request_span is not None:
+            request_span.attributes['status'] = params.response.status
+            if params.response.status >= 400:
+                request_span.status = 'error'
+            _finish(request_span)
+
+    async def on_request_exception(session, context, params: aiohttp.TraceRequestExceptionParams):
+        request_span = getattr(context, 'brb_span', None)
+        if request_span is not None:
+            _finish(request_span, params.exception)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
@@ -4,6 +4,7 @@ A set of discord.ui elements for customising buttons added by BRB.
 """
 # import libraries
 import emoji
+import logging
 import random
 import re
 import traceback
@@ -13,7 +14,7 @@ import uuid
 import discord
 from discord import HTTPException
 from discord.interactions import Interaction
-from discord.ui import View, Modal, Button
+from discord.ui import View, Modal, Button, Select
 
 # import bot
 from ptn.buttonrolebot.bot import bot
@@ -23,25 +24,31 @@ from ptn.buttonrolebot.classes.RoleButtonData import RoleButtonData
 
 # import local constants
 import ptn.buttonrolebot.constants as constants
-from ptn.buttonrolebot.constants import channel_botspam, DEFAULT_BUTTON_LABEL, DEFAULT_BUTTON_LABELS, HOORAY_GIFS
+from ptn.buttonrolebot.constants import channel_botspam, DEFAULT_BUTTON_LABEL, DEFAULT_BUTTON_LABELS, HOORAY_GIFS, EXCLUSIVE_GROUPS
 
 # import local modules
+from ptn.buttonrolebot.modules.CustomId import MAX_BUNDLE_ROLES, MAX_SELECT_OPTIONS, encode_custom_id
+from ptn.buttonrolebot.modules.DateString import parse_duration, format_duration
 from ptn.buttonrolebot.modules.ErrorHandler import GenericError, on_generic_error, CustomError, BadRequestError
 from ptn.buttonrolebot.modules.Embeds import button_config_embed, stress_embed, amazing_embed, button_edit_heading_embed
 from ptn.buttonrolebot.modules.Helpers import check_role_exists, _add_role_buttons_to_view, button_role_checks
+from ptn.buttonrolebot.modules.RoleCache import role_index
+from ptn.buttonrolebot.modules.Tracing import traced
+
+log = logging.getLogger(__name__)
 
 
 spamchannel = bot.get_channel(channel_botspam())
 
 
 def _find_lowest_available_row(buttons: list):
-    print(f'Called _find_lowest_available_row for {buttons}')
+    log.debug('Called _find_lowest_available_row for %s', buttons)
     # Initialize a dictionary to count the number of instances in each row
     row_counts = {0: 0, 1: 0, 2: 0, 3: 0}
 
-    # Count the instances in each row
+    # Count the instances in each row, where a select menu fills a row by itself
     for button_data_instance in buttons:
-        row_counts[button_data_instance.button_row] += 1
+        row_counts[button_data_instance.button_row] += button_data_instance.row_width()
 
     # Find the lowest available row number (between 0 and 3) with fewer than 5 instances
     for row in range(4):
@@ -52,28 +59,74 @@ def _find_lowest_available_row(buttons: list):
     return None
 
 
+# group buttons by row, keeping their order within each row
+def _order_buttons_by_row(buttons: list):
+    button_rows = {}
+    for button_data_instance in buttons:
+        if button_data_instance.button_row not in button_rows:
+            button_rows[button_data_instance.button_row] = []
+        button_rows[button_data_instance.button_row].append(button_data_instance)
+
+    # Re-order the list based on row allocations
+    ordered_buttons = []
+    for row in sorted(button_rows.keys()):  # Sort rows in ascending order
+        ordered_buttons.extend(button_rows[row])
+    return ordered_buttons
+
+
+def _find_empty_row(buttons: list):
+    log.debug('Called _find_empty_row for %s', buttons)
+    # select menus need a row to themselves
+    used_rows = {button_data_instance.button_row for button_data_instance in buttons}
+    for row in range(4):
+        if row not in used_rows:
+            return row
+
+    return None
+
+
+# check a button's settings fit in a custom_id, returning an error message if they don't
+def _custom_id_error(button_data: RoleButtonData):
+    try:
+        encode_custom_id(
+            button_data.button_action or 'toggle',
+            tuple(button_data.role_ids) or (button_data.message.id,), # any snowflake will do to measure
+            button_data.message.id,
+            button_data.exclusive_group,
+            tuple(button_data.required_role_ids),
+            tuple(button_data.forbidden_role_ids),
+            button_data.capacity,
+            button_data.duration
+        )
+    except ValueError:
+        return "That's too many roles for one button: between its own roles and its prerequisites, " \
+               "a button can hold about 6 role IDs. Try removing some."
+    return None
+
+
+@traced
 async def _reposition_button(interaction: discord.Interaction, buttons, button_data: RoleButtonData, action):
-    print(f'Called {_reposition_button.__name__} with action: {action}')
+    log.debug('Called %s with action: %s', _reposition_button.__name__, action)
     row = button_data.button_row
     target_id = button_data.unique_id
     current_index = None
 
     try:
-        print("⏳ Searching for current button in buttons list...")
+        log.debug("⏳ Searching for current button in buttons list...")
         for i, button_data_instance in enumerate(buttons):
             if button_data_instance.unique_id == target_id:
-                print(f"Found button {button_data_instance.unique_id}")
+                log.debug('Found button %s', button_data_instance.unique_id)
                 current_index = i
                 break
 
         def move_button(new_index, button_to_move):
-            print("▶ Moving button in list")
+            log.debug("▶ Moving button in list")
             button_to_move = buttons.pop(current_index)
             buttons.insert(new_index, button_to_move)
-            print(buttons)
+            log.debug('%s', buttons)
 
         if action == 'left' or action == 'right':
-            print("Horizontal movement")
+            log.debug("Horizontal movement")
             # edit position in buttons list
             
             if action == 'left' and current_index >= 1:
@@ -83,7 +136,7 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
                 new_index = current_index + 1
                 move_button(new_index, current_index)
             else:
-                print(f"Button in position {current_index} cannot be moved {action}")
+                log.debug('Button in position %s cannot be moved %s', current_index, action)
                 return
 
 
@@ -91,7 +144,7 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
             if action == 'down':
                 # edit row down within bounds
                 if row == 3:
-                    print("Button can't go further down, ignoring")
+                    log.debug("Button can't go further down, ignoring")
                     embed = discord.Embed(
                         description="⚠ Button already in ⏬ bottom row. Move other buttons 🔼 up if needed.",
                         color=constants.EMBED_COLOUR_ERROR
@@ -104,7 +157,7 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
             elif  action == 'up':
                 # edit row up within bounds
                 if row == 0:
-                    print("Button can't go further up, ignoring")
+                    log.debug("Button can't go further up, ignoring")
                     embed = discord.Embed(
                         description="⚠ Button already in ⏫ top row. Move other buttons 🔽 down if needed.",
                         color=constants.EMBED_COLOUR_ERROR
@@ -115,9 +168,9 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
                     new_row = row - 1
 
             # check we don't have too many buttons in this row already
-            count = sum(1 for button in buttons if button.button_row == new_row)
+            count = sum(button.row_width() for button in buttons if button.button_row == new_row)
             if count >= 5:
-                print("Could not move button to row: Row already full.")
+                log.debug("Could not move button to row: Row already full.")
                 embed = discord.Embed(
                     description='⚠ Could not move button because target row already has the maximum number of buttons (5). '\
                                 'You may need to move a button out of the target row to move your button in.',
@@ -126,24 +179,14 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
                 embed.set_footer(text="You can dismiss this message.")
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            print(f"▶ Updating row from {row} to {new_row}")
+            log.debug('▶ Updating row from %s to %s', row, new_row)
             button_data.button_row = new_row
             buttons[current_index] = button_data
 
             # re-order our list by row
-            button_rows = {}
-            # Group buttons by row
-            print('▶ Repacking list based on new row hierarchy.')
-            for button_data_instance in buttons:
-                if button_data_instance.button_row not in button_rows:
-                    button_rows[button_data_instance.button_row] = []
-                button_rows[button_data_instance.button_row].append(button_data_instance)
-
-            # Re-order the list based on row allocations
-            ordered_buttons = []
-            for row in sorted(button_rows.keys()):  # Sort rows in ascending order
-                ordered_buttons.extend(button_rows[row])
-            print(f"Original button list: {buttons}\nOrdered list: {ordered_buttons}")
+            log.debug('▶ Repacking list based on new row hierarchy.')
+            ordered_buttons = _order_buttons_by_row(buttons)
+            log.debug('Original button list: %s\nOrdered list: %s', buttons, ordered_buttons)
             buttons = ordered_buttons
 
         # update preview
@@ -158,28 +201,29 @@ async def _reposition_button(interaction: discord.Interaction, buttons, button_d
             await on_generic_error(spamchannel, interaction, e)
 
 
+@traced
 async def _check_for_button_conflict(interaction: discord.Interaction, buttons: list, button_data: RoleButtonData):
-    print(f"Called _check_for_button_conflict with  {button_data}")
+    log.debug('Called _check_for_button_conflict with  %s', button_data)
     try:
-        role_id = button_data.role_id
+        role_ids = set(button_data.role_ids)
         action = button_data.button_action
         unique_id = button_data.unique_id
 
         conflicting_data = None
 
-        print("⏳ Searching for conflicts in buttons list...")
+        log.debug("⏳ Searching for conflicts in buttons list...")
         for i, button_data_instance in enumerate(buttons):
-            if button_data_instance.role_id == role_id and button_data_instance.button_action == action:
+            if set(button_data_instance.role_ids) == role_ids and button_data_instance.button_action == action:
                 if button_data_instance.unique_id != unique_id:
-                    print(f"⚠ Found conflict with {button_data_instance.unique_id}")
+                    log.warning('⚠ Found conflict with %s', button_data_instance.unique_id)
                     conflicting_data = button_data_instance
                     break
 
         if conflicting_data is not None:
-            print("▶ Notifying user of conflict.")
+            log.debug("▶ Notifying user of conflict.")
             embed = discord.Embed(
                 description="❌ Each message can only have one button with a given role and action combination. " \
-                           f"You already have a button with role <@&{button_data_instance.role_id}> and "
+                           f"You already have a button with role {button_data_instance.role_mentions()} and "
                             f"action {button_data_instance.button_action} attached to this message as " \
                             f"**{button_data_instance.button_emoji} {button_data_instance.button_label}**",
                             
@@ -190,7 +234,7 @@ async def _check_for_button_conflict(interaction: discord.Interaction, buttons:
             return True
 
         else:
-            print("✅ No conflict detected.")
+            log.debug("✅ No conflict detected.")
             return False
 
     except Exception as e:
@@ -200,8 +244,9 @@ async def _check_for_button_conflict(interaction: discord.Interaction, buttons:
             await on_generic_error(spamchannel, interaction, e)
 
 
+@traced
 async def _remove_button(interaction: discord.Interaction, buttons: list, button_data: RoleButtonData):
-    print(f'Called _remove_button with {button_data}')
+    log.debug('Called _remove_button with %s', button_data)
     try:
         original_interaction: discord.Interaction = button_data.preview_message
         view = View(timeout=None)
@@ -210,26 +255,27 @@ async def _remove_button(interaction: discord.Interaction, buttons: list, button
 
         index_to_delete = None
 
-        print("⏳ Searching for current button in buttons list...")
+        log.debug("⏳ Searching for current button in buttons list...")
         for i, button_data_instance in enumerate(buttons):
             if button_data_instance.unique_id == target_id:
-                print(f"Found button {button_data_instance.unique_id}")
+                log.debug('Found button %s', button_data_instance.unique_id)
                 index_to_delete = i
                 break
 
         if index_to_delete is not None:
-            print("▶ Removing this button_data instance")
+            log.debug("▶ Removing this button_data instance")
             del buttons[index_to_delete]
-            print(buttons)
+            log.debug('%s', buttons)
 
-        print("⏳ Updating view with remaining buttons...")
+        log.debug("⏳ Updating view with remaining buttons...")
         for button_data_instance in buttons:
-            button = NewButton(buttons, button_data_instance)
-            print(f"🔘 Generated button from set {button_data_instance.unique_id}")
+            button = _preview_component(buttons, button_data_instance)
+            log.debug('🔘 Generated button from set %s', button_data_instance.unique_id)
             view.add_item(button)
 
         view.add_item(MasterCancelButton())
         view.add_item(MasterAddButton(buttons, button_data))
+        view.add_item(MasterAddMenuButton(buttons, button_data))
         if buttons:
             view.add_item(MasterCommitButton(buttons, button_data))
 
@@ -242,8 +288,9 @@ async def _remove_button(interaction: discord.Interaction, buttons: list, button
             await on_generic_error(spamchannel, interaction, e)
 
 
+@traced
 async def _update_preview(interaction, buttons: list, button_data: RoleButtonData):
-    print(f'Called update_preview with {button_data}')
+    log.debug('Called update_preview with %s', button_data)
     try:
         original_interaction: discord.Interaction = button_data.preview_message
         view = View(timeout=None)
@@ -254,36 +301,37 @@ async def _update_preview(interaction, buttons: list, button_data: RoleButtonDat
 
         # we need to differentiate our current button in the list of buttons attached to the view
         # we then need to replace it with our updated button, insert it into the list, and add them all back
-        print("⏳ Searching for current button in buttons list...")
+        log.debug("⏳ Searching for current button in buttons list...")
         for i, button_data_instance in enumerate(buttons):
             if button_data_instance.unique_id == target_id:
-                print(f"Found button {button_data_instance.unique_id}")
+                log.debug('Found button %s', button_data_instance.unique_id)
                 index_to_replace = i
                 break
 
         if index_to_replace is not None:
-            print("▶ Replacing existing button_data instance with updated button_data")
+            log.debug("▶ Replacing existing button_data instance with updated button_data")
             buttons[index_to_replace] = button_data
         else:
-            print("▶ No existing button_data instance found, appending to list")
+            log.debug("▶ No existing button_data instance found, appending to list")
             buttons.append(button_data)
 
-        print("⏳ Adding list items to view...")
+        log.debug("⏳ Adding list items to view...")
         for button_data_instance in buttons:
-            button = NewButton(buttons, button_data_instance)
-            print(f"🔘 Generated button from set {button_data_instance.unique_id}")
+            button = _preview_component(buttons, button_data_instance)
+            log.debug('🔘 Generated button from set %s', button_data_instance.unique_id)
             view.add_item(button)
 
         view.add_item(MasterCancelButton())
         view.add_item(MasterAddButton(buttons, button_data))
+        view.add_item(MasterAddMenuButton(buttons, button_data))
         if buttons:
             view.add_item(MasterCommitButton(buttons, button_data))
 
-        print("▶ Updating master view.")
+        log.debug("▶ Updating master view.")
         await original_interaction.edit_original_response(view=view)
 
     except Exception as e:
-        print(e)
+        log.error('%s', e)
         traceback.print_exc()
         try:
             raise GenericError(e)
@@ -305,8 +353,9 @@ class NewButton(Button):
             row=self.button_data.button_row
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print(f"Received NewButton callback with {self.button_data}")
+        log.debug('Received NewButton callback with %s', self.button_data)
         try:
             """# instantiate an instance of our RoleButtonData based on current params
             button_params = {
@@ -330,13 +379,49 @@ class NewButton(Button):
             # send message with view and embed
             await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
         except Exception as e:
-            print(e)
+            log.error('%s', e)
             try:
                 raise GenericError(e)
             except Exception as e:
                 await on_generic_error(self.spamchannel, interaction, e)
 
 
+class NewSelect(Select):
+    def __init__(self, buttons, button_data):
+        self.buttons = buttons
+        self.button_data: RoleButtonData = button_data
+        self.spamchannel = bot.get_channel(channel_botspam())
+        options = [discord.SelectOption(label=role.name[:100], value=str(role.id)) for role in self.button_data.role_objects]
+        super().__init__(
+            placeholder=str(self.button_data.button_label) if self.button_data.button_label else None,
+            options=options or [discord.SelectOption(label='No roles yet', value='0')],
+            min_values=0,
+            max_values=max(1, len(options)),
+            custom_id=self.button_data.unique_id,
+            row=self.button_data.button_row
+        )
+
+    @traced
+    async def callback(self, interaction: discord.Interaction):
+        log.debug('Received NewSelect callback with %s', self.button_data)
+        try:
+            # menus are edited in one go from a modal
+            await interaction.response.send_modal(EnterMenuModal(self.buttons, self.button_data))
+        except Exception as e:
+            log.error('%s', e)
+            try:
+                raise GenericError(e)
+            except Exception as e:
+                await on_generic_error(self.spamchannel, interaction, e)
+
+
+# the preview component for a button_data instance: a button, or a select menu
+def _preview_component(buttons, button_data: RoleButtonData):
+    if button_data.is_select():
+        return NewSelect(buttons, button_data)
+    return NewButton(buttons, button_data)
+
+
 """
 Multi-part message supported by embeds:
 1. Choose role - click button to pop-up modal
@@ -354,31 +439,31 @@ INDEX FUNCTIONS
 """
 # a function to choose view based on index
 def _select_view_from_index(index, buttons, button_data: RoleButtonData):
-    print("Called _select_view_from_index")
+    log.debug("Called _select_view_from_index")
     if index == 0:
-        print("Assigning 0: ChooseRoleView")
+        log.debug("Assigning 0: ChooseRoleView")
         view = ChooseRoleView(buttons, button_data)
     elif index == 1:
-        print("Assigning 1: ConfirmRoleView")
+        log.debug("Assigning 1: ConfirmRoleView")
         view = ConfirmRoleView(buttons, button_data)
     elif index == 2:
-        print("Assigning 2: ButtonActionView")
+        log.debug("Assigning 2: ButtonActionView")
         view = ButtonActionView(buttons, button_data)
     elif index == 3:
-        print("Assigning 3: ButtonStyleView")
+        log.debug("Assigning 3: ButtonStyleView")
         view = ButtonStyleView(buttons, button_data)
     elif index == 4:
-        print("Assigning 4: LabelEmojiView")
+        log.debug("Assigning 4: LabelEmojiView")
         view = LabelEmojiView(buttons, button_data)
     elif index == 5:
-        print("Assigning 5: RepositionButtonView")
+        log.debug("Assigning 5: RepositionButtonView")
         view = RepositionButtonView(buttons, button_data)
     return view
 
 
 # function to increment index by one
 def _increment_index(index, buttons, button_data: RoleButtonData):
-    print("Called _increment_index")
+    log.debug("Called _increment_index")
     if index <= 4: 
         index += 1
         # generate new embed
@@ -390,7 +475,7 @@ def _increment_index(index, buttons, button_data: RoleButtonData):
 
 # function to decrement index by one
 def _decrement_index(index, buttons, button_data: RoleButtonData):
-    print("Called _decrement_index")
+    log.debug("Called _decrement_index")
     if index >= 1:
         index -= 1
         # generate new embed
@@ -405,7 +490,7 @@ GLOBAL COMPONENT BUTTONS
 """
 class MasterCommitButton(Button):
     def __init__(self, buttons, button_data):
-        print("Initialising MasterCommitButton")
+        log.debug("Initialising MasterCommitButton")
         self.buttons: list = buttons
         self.button_data: RoleButtonData = button_data
         self.message: discord.Message = self.button_data.message
@@ -417,8 +502,9 @@ class MasterCommitButton(Button):
             row=4 # max row number
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ✔ master_commit_button click")
+        log.debug("Received ✔ master_commit_button click")
 
         button_incomplete = False
 
@@ -432,7 +518,7 @@ class MasterCommitButton(Button):
                 embed.set_footer(text="You can dismiss this message.")
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             else:
-                print("✔ Button list is populated.")
+                log.debug("✔ Button list is populated.")
 
             # make sure our buttons have the needed data
             for button_data_instance in self.buttons:
@@ -454,16 +540,17 @@ class MasterCommitButton(Button):
                     embed.set_footer(text="You can dismiss this message.")
                     return await interaction.response.send_message(embed=embed, ephemeral=True)
                 else:
-                    print("✔ No incomplete buttons found.")
+                    log.debug("✔ No incomplete buttons found.")
 
-            # make sure our user has permission for all the buttons' roles
+            # make sure our user has permission for all the buttons' roles, including every role in a bundle
             for button_data_instance in self.buttons:
-                role = discord.utils.get(interaction.guild.roles, id=button_data_instance.role_id)
-                permission = await button_role_checks(interaction, role, button_data_instance)
-                if not permission:
-                    return
+                for role_id in button_data_instance.role_ids:
+                    role = role_index.get(interaction.guild, role_id)
+                    permission = await button_role_checks(interaction, role, button_data_instance)
+                    if not permission:
+                        return
 
-            print("✔ User has permission for all button roles")
+            log.debug("✔ User has permission for all button roles")
 
             # create the buttons
 
@@ -499,7 +586,7 @@ class MasterCommitButton(Button):
 
 class MasterCancelButton(Button):
     def __init__(self):
-        print("Initialising MasterCancelButton")
+        log.debug("Initialising MasterCancelButton")
         super().__init__(
             label="✗",
             style=discord.ButtonStyle.danger,
@@ -507,8 +594,9 @@ class MasterCancelButton(Button):
             row=4 # max row number
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ✖ master_cancel_button click")
+        log.debug("Received ✖ master_cancel_button click")
         embed = discord.Embed(
             description="❎ **Button Manager closed without making changes.**.",
             color=constants.EMBED_COLOUR_QU
@@ -518,7 +606,7 @@ class MasterCancelButton(Button):
 
 class MasterAddButton(Button):
     def __init__(self, buttons, button_data):
-        print("Initialising MasterAddButton")
+        log.debug("Initialising MasterAddButton")
         self.buttons: list = buttons
         self.button_data: RoleButtonData = button_data
         self.spamchannel = bot.get_channel(channel_botspam())
@@ -530,14 +618,15 @@ class MasterAddButton(Button):
             row=4 # max row number
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ➕ master_add_button click")
+        log.debug("Received ➕ master_add_button click")
         try:
             view = View(timeout=None)
 
             # check we don't have too many buttons
             if len(self.buttons) >= 20:
-                print("⚠ Too many buttons! Can't add any more.")
+                log.warning("⚠ Too many buttons! Can't add any more.")
                 embed = discord.Embed(
                     description="❌ Can't add any more buttons: this message already has the maximum amount of buttons this bot will allow (20).",
                     color=constants.EMBED_COLOUR_ERROR
@@ -545,15 +634,15 @@ class MasterAddButton(Button):
                 embed.set_footer(text="You can dismiss this message.")
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             else:
-                print(f"Number of buttons: {len(self.buttons)}")
+                log.debug('Number of buttons: %s', len(self.buttons))
 
             # check for lowest free row number
             lowest_available_row = _find_lowest_available_row(self.buttons)
-            print(f'Lowest available row: {lowest_available_row}')
+            log.debug('Lowest available row: %s', lowest_available_row)
             if lowest_available_row is not None:
                 button_row = lowest_available_row
             else:
-                print("⚠ All rows are full! Can't add any more buttons.")
+                log.warning("⚠ All rows are full! Can't add any more buttons.")
                 embed = discord.Embed(
                     description="❌ Couldn't find any free rows to add a button to. Maximum is 4 rows of 5 buttons.",
                     color=constants.EMBED_COLOUR_ERROR
@@ -562,7 +651,7 @@ class MasterAddButton(Button):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
 
             # create new default button_data instance with its own unique identifier
-            print("⏳ Generating UUID and defining new button_data...")
+            log.debug("⏳ Generating UUID and defining new button_data...")
             unique_id = str(uuid.uuid4())
             button_data_info_dict = {
                 'message': self.button_data.message,
@@ -571,26 +660,83 @@ class MasterAddButton(Button):
                 'button_row': button_row
             }
             button_data = RoleButtonData(button_data_info_dict)
-            print(button_data)
+            log.debug('%s', button_data)
 
-            print("⏳ Appending to buttons list...")
+            log.debug("⏳ Appending to buttons list...")
             self.buttons.append(button_data)
 
-            print("⏳ Adding list items to view...")
+            log.debug("⏳ Adding list items to view...")
             for button_data_instance in self.buttons:
-                button = NewButton(self.buttons, button_data_instance)
-                print(f"🔘 Generated button from set {button_data_instance.unique_id}")
+                button = _preview_component(self.buttons, button_data_instance)
+                log.debug('🔘 Generated button from set %s', button_data_instance.unique_id)
                 view.add_item(button)
 
             view.add_item(MasterCancelButton())
             if len(self.buttons) < 20: view.add_item(MasterAddButton(self.buttons, self.button_data)) # only add this if there's room for more buttons
+            view.add_item(MasterAddMenuButton(self.buttons, self.button_data))
             view.add_item(MasterCommitButton(self.buttons, button_data))
 
-            print("▶ Updating message with view.")
+            log.debug("▶ Updating message with view.")
             return await interaction.response.edit_message(view=view)
 
         except Exception as e:
-            print(e)
+            log.error('%s', e)
+            traceback.print_exc()
+            try:
+                raise GenericError(e)
+            except Exception as e:
+                await on_generic_error(self.spamchannel, interaction, e)
+
+
+class MasterAddMenuButton(Button):
+    def __init__(self, buttons, button_data):
+        log.debug("Initialising MasterAddMenuButton")
+        self.buttons: list = buttons
+        self.button_data: RoleButtonData = button_data
+        self.spamchannel = bot.get_channel(channel_botspam())
+        super().__init__(
+            label=None,
+            emoji='📋',
+            style=discord.ButtonStyle.primary,
+            custom_id="master_add_menu_button",
+            row=4 # max row number
+        )
+
+    @traced
+    async def callback(self, interaction: discord.Interaction):
+        log.debug("Received 📋 master_add_menu_button click")
+        try:
+            # a select menu needs a row of its own
+            empty_row = _find_empty_row(self.buttons)
+            if empty_row is None:
+                log.warning("⚠ No empty rows! Can't add a menu.")
+                embed = discord.Embed(
+                    description="❌ Couldn't find an empty row to add a role menu to. Menus need a row to themselves: " \
+                                "remove or move buttons to free one up.",
+                    color=constants.EMBED_COLOUR_ERROR
+                )
+                embed.set_footer(text="You can dismiss this message.")
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+            # create new select button_data instance with its own unique identifier
+            # it's only added to the buttons list once the modal is submitted with roles
+            log.debug("⏳ Generating UUID and defining new menu button_data...")
+            button_data_info_dict = {
+                'message': self.button_data.message,
+                'preview_message': self.button_data.preview_message,
+                'unique_id': str(uuid.uuid4()),
+                'button_row': empty_row,
+                'button_label': constants.DEFAULT_SELECT_PLACEHOLDER,
+                'button_emoji': None,
+                'component_type': 'select'
+            }
+            button_data = RoleButtonData(button_data_info_dict)
+            log.debug('%s', button_data)
+
+            await interaction.response.send_modal(EnterMenuModal(self.buttons, button_data))
+
+        except Exception as e:
+            log.error('%s', e)
             traceback.print_exc()
             try:
                 raise GenericError(e)
@@ -613,18 +759,19 @@ class DeleteButton(Button):
             # row=1 if self.index == 2 or self.index == 3 else 0
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ✖ delete_button click")
+        log.debug("Received ✖ delete_button click")
         try:
             await _remove_button(interaction, self.buttons, self.button_data)
 
             await interaction.response.defer()
 
-            print("▶ Deleting button interface.")
+            log.debug("▶ Deleting button interface.")
             await interaction.delete_original_response()
         
         except Exception as e:
-            print(e)
+            log.error('%s', e)
             traceback.print_exc()
             try:
                 raise GenericError(e)
@@ -643,8 +790,9 @@ class PrevButton(Button):
             row=1
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ◄ generic_previous_button click")
+        log.debug("Received ◄ generic_previous_button click")
         # decrement index by 1
         if self.index >= 1:
             embed, view = _decrement_index(self.index, self.buttons, self.button_data)
@@ -667,34 +815,37 @@ class NextButton(Button):
             row=1
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ► generic_next_button click")
+        log.debug("Received ► generic_next_button click")
         # various checks that the user isn't getting ahead of themselves
         if self.index == 0:
-            if self.button_data.role_id == None:
+            if not self.button_data.role_ids:
                 try:
                     raise CustomError("You must enter a Role ID first.")
                 except Exception as e:
                     await on_generic_error(spamchannel, interaction, e)
                     return
         
-            # check int corresponds to a role on this server
-            role = None
-            print(f'Role is {role}')
-            role = await check_role_exists(interaction, self.button_data.role_id)
+            # check each int corresponds to a role on this server
+            roles = []
+            for role_id in self.button_data.role_ids:
+                role = await check_role_exists(interaction, role_id)
+
+                if role == None: 
+                    try:
+                        raise CustomError(f"Can't find a role with ID `{role_id}`.")
+                    except Exception as e:
+                        await on_generic_error(spamchannel, interaction, e)
+                    return
+                roles.append(role)
 
-            if role == None: 
-                try:
-                    raise CustomError(f"Can't find a role with ID `{self.button_data.role_id}`.")
-                except Exception as e:
-                    await on_generic_error(spamchannel, interaction, e)
-                return
-            else:
-                self.button_data.role_object = role
+            self.button_data.set_roles(roles)
 
-            # check if we have permission to manage this role
-            permission = await button_role_checks(interaction, role, self.button_data)
-            if not permission: return
+            # check if we have permission to manage these roles
+            for role in roles:
+                permission = await button_role_checks(interaction, role, self.button_data)
+                if not permission: return
 
 
         elif self.index == 2:
@@ -742,13 +893,14 @@ class CommitButton(Button):
             row=1
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ✅ generic_commit_button click")
+        log.debug("Received ✅ generic_commit_button click")
         # check we have needed input for a full button
         if self.button_data.button_label == DEFAULT_BUTTON_LABEL or \
            self.button_data.role_id == None or \
            self.button_data.role_object == None:
-            print("Received commit button press but user has not entered all required data")
+            log.debug("Received commit button press but user has not entered all required data")
             embed = discord.Embed(
                 description="❌ You must input all required elements before committing a button.",
                 color=constants.EMBED_COLOUR_ERROR
@@ -762,7 +914,7 @@ class CommitButton(Button):
             try:
                 await interaction.delete_original_response()
             except Exception as e:
-                print(e)
+                log.error('%s', e)
 
 class CallRepositionButton(Button):
     def __init__(self, index, buttons, button_data: RoleButtonData):
@@ -776,8 +928,9 @@ class CallRepositionButton(Button):
             row=1
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received 🔀 generic_reposition_button click")
+        log.debug("Received 🔀 generic_reposition_button click")
         # generate new embed
         embed = button_config_embed(5, self.button_data)
         # assign new view
@@ -796,8 +949,9 @@ class CallEditButton(Button):
             row=1
         )
 
+    @traced
     async def callback(self, interaction: discord.Interaction):
-        print("Received ↩️ generic_editor_button click")
+        log.debug("Received ↩️ generic_editor_button click")
         # generate new embed
         embed = button_config_embed(self.index, self.button_data)
         # assign new view
@@ -831,6 +985,7 @@ class ChooseRoleView(View):
         style=discord.ButtonStyle.primary,
         emoji='🎢',
         row=0)
+    @traced
     async def button_enter_role_id(self, interaction, button):
         try:
             await interaction.response.send_modal(EnterRoleIDModal(self.buttons, self.button_data))
@@ -863,8 +1018,9 @@ class ConfirmRoleView(View):
         row=0
     )
 
+    @traced
     async def confirm_role_button(self, interaction: discord.Interaction, button):
-        print("Received ✅ confirm_role_button click")
+        log.debug("Received ✅ confirm_role_button click")
         # increment index by 1
         embed, view = _increment_index(self.index, self.buttons, self.button_data)
         # update message
@@ -885,6 +1041,9 @@ class ButtonActionView(View):
         self.add_item(CommitButton(self.index, self.button_data))
         self.add_item(CallRepositionButton(self.index, self.buttons, self.button_data))
         self.add_item(NextButton(self.index, self.buttons, self.button_data))
+        self.exclusive_group_button.label = f'Exclusive group: {self.button_data.exclusive_group or "None"}'
+        if self.button_data.required_role_ids or self.button_data.forbidden_role_ids or self.button_data.capacity or self.button_data.duration:
+            self.restrictions_button.style = discord.ButtonStyle.success
 
     @discord.ui.button(
         label='Give role',
@@ -892,8 +1051,9 @@ class ButtonActionView(View):
         style=discord.ButtonStyle.success,
         row=0
     )
+    @traced
     async def success_style_button(self, interaction: discord.Interaction, button):
-        print("🔘 Chose give_action_button")
+        log.debug("🔘 Chose give_action_button")
         try:
             self.button_data.button_action = 'give'
             # set some defaults for a role give button
@@ -924,8 +1084,9 @@ class ButtonActionView(View):
         style=discord.ButtonStyle.danger,
         row=0
     )
+    @traced
     async def primary_style_button(self, interaction: discord.Interaction, button):
-        print("🔘 Chose take_action_button")
+        log.debug("🔘 Chose take_action_button")
         try:
             self.button_data.button_action = 'take'
             # set some defaults for a role take button
@@ -948,8 +1109,9 @@ class ButtonActionView(View):
         style=discord.ButtonStyle.primary,
         row=0
     )
+    @traced
     async def secondary_style_button(self, interaction: discord.Interaction, button):
-        print("Chose secondary button")
+        log.debug("Chose secondary button")
         try:
             self.button_data.button_action = 'toggle'
             # set some defaults for a role toggle button
@@ -966,6 +1128,54 @@ class ButtonActionView(View):
             except Exception as e:
                 await on_generic_error(spamchannel, interaction, e)
 
+    @discord.ui.button(
+        label='Exclusive group: None',
+        custom_id='exclusive_group_button',
+        style=discord.ButtonStyle.secondary,
+        emoji='🔘',
+        row=0
+    )
+    @traced
+    async def exclusive_group_button(self, interaction: discord.Interaction, button):
+        log.debug("🔘 Cycling exclusive_group_button")
+        try:
+            # cycle through no group, then each group in turn
+            groups = [None] + EXCLUSIVE_GROUPS
+            current = groups.index(self.button_data.exclusive_group) if self.button_data.exclusive_group in groups else 0
+            self.button_data.exclusive_group = groups[(current + 1) % len(groups)]
+            log.debug('Exclusive group set: %s', self.button_data.exclusive_group)
+
+            # stay on this page so the user can pick an action
+            embed = button_config_embed(self.index, self.button_data)
+            view = ButtonActionView(self.buttons, self.button_data)
+
+            await _update_preview(interaction, self.buttons, self.button_data)
+
+            await interaction.response.edit_message(embed=embed, view=view)
+        except Exception as e:
+            try:
+                raise GenericError(e)
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+
+    @discord.ui.button(
+        label='Restrictions',
+        custom_id='restrictions_button',
+        style=discord.ButtonStyle.secondary,
+        emoji='🔒',
+        row=0
+    )
+    @traced
+    async def restrictions_button(self, interaction: discord.Interaction, button):
+        log.debug("🔒 Chose restrictions_button")
+        try:
+            await interaction.response.send_modal(EnterRestrictionsModal(self.buttons, self.button_data))
+        except Exception as e:
+            try:
+                raise GenericError(e)
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+
 
 """
 Page 4: Set button style
@@ -988,8 +1198,9 @@ class ButtonStyleView(View):
         style=discord.ButtonStyle.success,
         row=0
     )
+    @traced
     async def success_style_button(self, interaction, button):
-        print("Chose green button")
+        log.debug("Chose green button")
         try:
             self.button_data.button_style = discord.ButtonStyle.success
             embed, view = _increment_index(self.index, self.buttons, self.button_data)
@@ -1010,8 +1221,9 @@ class ButtonStyleView(View):
         style=discord.ButtonStyle.primary,
         row=0
     )
+    @traced
     async def primary_style_button(self, interaction, button):
-        print("Chose primary button")
+        log.debug("Chose primary button")
         try:
             self.button_data.button_style = discord.ButtonStyle.primary
             embed, view = _increment_index(self.index, self.buttons, self.button_data)
@@ -1031,8 +1243,9 @@ class ButtonStyleView(View):
         style=discord.ButtonStyle.secondary,
         row=0
     )
+    @traced
     async def secondary_style_button(self, interaction, button):
-        print("Chose secondary button")
+        log.debug("Chose secondary button")
         try:
             self.button_data.button_style = discord.ButtonStyle.secondary
             embed, view = _increment_index(self.index, self.buttons, self.button_data)
@@ -1052,8 +1265,9 @@ class ButtonStyleView(View):
         style=discord.ButtonStyle.danger,
         row=0
     )
+    @traced
     async def danger_style_button(self, interaction, button):
-        print("Chose danger button")
+        log.debug("Chose danger button")
         try:
             self.button_data.button_style = discord.ButtonStyle.danger
             embed, view = _increment_index(self.index, self.buttons, self.button_data)
@@ -1089,8 +1303,9 @@ class LabelEmojiView(View):
         emoji='🏷',
         row=0
     )
+    @traced
     async def label_emoji_button(self, interaction: discord.Interaction, button):
-        print("🔘 Received label_emoji_button click")
+        log.debug("🔘 Received label_emoji_button click")
 
         await interaction.response.send_modal(EnterLabelEmojiModal(self.buttons, self.button_data))
 
@@ -1116,8 +1331,9 @@ class RepositionButtonView(View):
         emoji='◀',
         row=0
     )
+    @traced
     async def move_left_button(self, interaction: discord.Interaction, button):
-        print(f"🔘 Received move_left_button click")
+        log.debug('🔘 Received move_left_button click')
 
         action = 'left'
 
@@ -1130,8 +1346,9 @@ class RepositionButtonView(View):
         emoji='▶',
         row=0
     )
+    @traced
     async def move_right_button(self, interaction: discord.Interaction, button):
-        print(f"🔘 Received move_right_button click")
+        log.debug('🔘 Received move_right_button click')
 
         action = 'right'
 
@@ -1144,8 +1361,9 @@ class RepositionButtonView(View):
         emoji='🔼',
         row=0
     )
+    @traced
     async def move_up_button(self, interaction: discord.Interaction, button):
-        print(f"🔘 Received move_up_button click")
+        log.debug('🔘 Received move_up_button click')
 
         action = 'up'
 
@@ -1158,8 +1376,9 @@ class RepositionButtonView(View):
         emoji='🔽',
         row=0
     )
+    @traced
     async def move_down_button(self, interaction: discord.Interaction, button):
-        print(f"🔘 Received move_down_button click")
+        log.debug('🔘 Received move_down_button click')
 
         action = 'down'
 
@@ -1183,8 +1402,9 @@ class StressButtonView(View):
         row=0
     )
 
+    @traced
     async def stress_button(self, interaction: discord.Interaction, button):
-        print("Received stress_button click")
+        log.debug("Received stress_button click")
         try:
             embed = stress_embed()
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1199,8 +1419,9 @@ class StressButtonView(View):
         row=0
     )
 
+    @traced
     async def amazing_button(self, interaction: discord.Interaction, button):
-        print("Received amazing_button click")
+        log.debug("Received amazing_button click")
         try:
             embed = amazing_embed()
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1217,53 +1438,246 @@ class EnterRoleIDModal(Modal):
         self.buttons = buttons
         self.button_data = button_data
         self.index = 0
-        if self.button_data.role_id:
-            self.role_id.default = self.button_data.role_id
+        if self.button_data.role_ids:
+            self.role_id.default = ' '.join(str(role_id) for role_id in self.button_data.role_ids)
         else:
             self.role_id.default = None
         super().__init__(title=title, timeout=timeout)
 
     role_id = discord.ui.TextInput(
-        label='Enter Role ID',
-        placeholder='e.g. 800091021852803072',
+        label='Enter Role ID(s)',
+        placeholder=f'e.g. 800091021852803072. Enter up to {MAX_BUNDLE_ROLES} IDs, separated by spaces, for a bundle.',
         required=True,
-        max_length=24
+        max_length=24 * MAX_BUNDLE_ROLES
     )
 
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
-        # remove anything that isn't a number
-        str_role_id = self.role_id.value
-        int_role_id = re.sub(r'[^0-9]', '', str_role_id)
+        # pull out each run of numbers, so mentions and any separator work; ignore repeats
+        str_role_ids = re.findall(r'[0-9]+', self.role_id.value)
+        role_ids = list(dict.fromkeys(int(str_role_id) for str_role_id in str_role_ids))
 
-        # try to convert to int
-        try:
-            self.button_data.role_id = int(int_role_id)
-            print(f'Stored Role ID: {self.button_data.role_id}')
-        except ValueError as e:
+        if not role_ids:
             try:
-                raise GenericError(e)
+                raise CustomError(f"No role ID found in ```{self.role_id.value}```")
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+
+        if len(role_ids) > MAX_BUNDLE_ROLES:
+            try:
+                raise CustomError(f"A button can manage at most {MAX_BUNDLE_ROLES} roles, but you entered {len(role_ids)}.")
             except Exception as e:
                 await on_generic_error(spamchannel, interaction, e)
             return
-        
-        # check int corresponds to a role on this server
-        role: discord.Role = None
-        print(f'Role is {role}')
-        role = await check_role_exists(interaction, self.button_data.role_id)
-        if role == None: return # stop here if there's no valid role
 
-        self.button_data.role_object = role
+        log.debug('Received Role ID(s): %s', role_ids)
 
-        # check if we have permission to manage this role
-        permission = await button_role_checks(interaction, role, self.button_data)
-        if not permission: return
+        # check each int corresponds to a role on this server
+        roles = []
+        for role_id in role_ids:
+            role: discord.Role = await check_role_exists(interaction, role_id)
+            if role == None: return # stop here if there's no valid role
+            roles.append(role)
+
+        previous_roles = self.button_data.role_objects
+        self.button_data.set_roles(roles)
+
+        error = _custom_id_error(self.button_data)
+        if error:
+            self.button_data.set_roles(previous_roles)
+            try:
+                raise CustomError(error)
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+
+        log.debug('Stored Role ID(s): %s', self.button_data.role_ids)
+
+        # check if we have permission to manage these roles
+        for role in roles:
+            permission = await button_role_checks(interaction, role, self.button_data)
+            if not permission: return
 
         embed, view = _increment_index(self.index, self.buttons, self.button_data)
 
         # edit our message to next in sequence
-        print("Updating message with new embed and view...")
+        log.debug("Updating message with new embed and view...")
         await interaction.response.edit_message(embed=embed, view=view)
 
+# modal to input a button's prerequisite roles, capacity and expiry
+class EnterRestrictionsModal(Modal):
+    def __init__(self, buttons, button_data: RoleButtonData, title = 'Set Restrictions', timeout = None):
+        self.buttons = buttons
+        self.button_data = button_data
+        self.index = 2
+        self.required_roles.default = ' '.join(str(role_id) for role_id in self.button_data.required_role_ids) or None
+        self.forbidden_roles.default = ' '.join(str(role_id) for role_id in self.button_data.forbidden_role_ids) or None
+        self.capacity.default = str(self.button_data.capacity) if self.button_data.capacity else None
+        self.duration.default = format_duration(self.button_data.duration) if self.button_data.duration else None
+        super().__init__(title=title, timeout=timeout)
+
+    required_roles = discord.ui.TextInput(
+        label='Members must have ALL of these roles',
+        placeholder='Role IDs separated by spaces, e.g. 800091021852803072. Leave empty for none.',
+        style=discord.TextStyle.short,
+        required=False,
+        max_length=120
+    )
+    forbidden_roles = discord.ui.TextInput(
+        label='Members must have NONE of these roles',
+        placeholder='Role IDs separated by spaces. Leave empty for none.',
+        style=discord.TextStyle.short,
+        required=False,
+        max_length=120
+    )
+    capacity = discord.ui.TextInput(
+        label='Most members who can hold the role',
+        placeholder='e.g. 10 for 10 places. Leave empty for no limit.',
+        style=discord.TextStyle.short,
+        required=False,
+        max_length=6
+    )
+    duration = discord.ui.TextInput(
+        label='Take the role away again after',
+        placeholder='e.g. 30m, 24h or 1d12h. Leave empty to keep it.',
+        style=discord.TextStyle.short,
+        required=False,
+        max_length=20
+    )
+
+    @traced
+    async def on_submit(self, interaction: discord.Interaction):
+        # pull out each run of numbers, so mentions and any separator work; ignore repeats
+        required_role_ids = list(dict.fromkeys(int(role_id) for role_id in re.findall(r'[0-9]+', self.required_roles.value)))
+        forbidden_role_ids = list(dict.fromkeys(int(role_id) for role_id in re.findall(r'[0-9]+', self.forbidden_roles.value)))
+
+        # check each int corresponds to a role on this server
+        for role_id in required_role_ids + forbidden_role_ids:
+            role = await check_role_exists(interaction, role_id)
+            if role == None: return # stop here if there's no valid role
+
+        if set(required_role_ids) & set(forbidden_role_ids):
+            try:
+                raise CustomError("A role can't be both required and forbidden: nobody could ever use the button.")
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+
+        capacity = self.capacity.value.strip()
+        if capacity and (not capacity.isdigit() or int(capacity) < 1):
+            try:
+                raise CustomError(f"The limit must be a whole number of members, like 10, not `{capacity}`.")
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+        capacity = int(capacity) if capacity else 0
+
+        duration = 0
+        if self.duration.value.strip():
+            try:
+                duration = parse_duration(self.duration.value)
+                if not 60 <= duration <= constants.EXPIRY_MAX_DURATION:
+                    raise ValueError(f"Temporary roles must last between 1m and {format_duration(constants.EXPIRY_MAX_DURATION)}.")
+                if self.button_data.button_action == 'take':
+                    raise ValueError("A button that only takes roles away can't give a temporary role. Choose Give or Toggle first.")
+            except ValueError as e:
+                try:
+                    raise CustomError(str(e))
+                except Exception as e:
+                    await on_generic_error(spamchannel, interaction, e)
+                return
+
+        previous = self.button_data.required_role_ids, self.button_data.forbidden_role_ids, self.button_data.capacity, self.button_data.duration
+        self.button_data.required_role_ids = required_role_ids
+        self.button_data.forbidden_role_ids = forbidden_role_ids
+        self.button_data.capacity = capacity
+        self.button_data.duration = duration
+
+        error = _custom_id_error(self.button_data)
+        if error:
+            self.button_data.required_role_ids, self.button_data.forbidden_role_ids, self.button_data.capacity, self.button_data.duration = previous
+            try:
+                raise CustomError(error)
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+
+        log.debug('Stored restrictions: required %s, forbidden %s, capacity %s, duration %s', required_role_ids, forbidden_role_ids, capacity, duration)
+
+        # stay on the action page
+        embed = button_config_embed(self.index, self.button_data)
+        view = ButtonActionView(self.buttons, self.button_data)
+
+        await _update_preview(interaction, self.buttons, self.button_data)
+
+        await interaction.response.edit_message(embed=embed, view=view)
+
+# modal to set up a role select menu
+class EnterMenuModal(Modal):
+    def __init__(self, buttons, button_data: RoleButtonData, title = 'Set Up Role Menu', timeout = None):
+        self.buttons = buttons
+        self.button_data = button_data
+        self.placeholder.default = str(self.button_data.button_label) if self.button_data.button_label else None
+        if self.button_data.role_ids:
+            self.role_ids.default = '\n'.join(str(role_id) for role_id in self.button_data.role_ids)
+        else:
+            self.role_ids.default = None
+        super().__init__(title=title, timeout=timeout)
+
+    placeholder = discord.ui.TextInput(
+        label='Placeholder',
+        placeholder='The text shown on the menu before anything is chosen.',
+        style=discord.TextStyle.short,
+        required=False,
+        max_length=150
+    )
+    role_ids = discord.ui.TextInput(
+        label=f'Role IDs (up to {MAX_SELECT_OPTIONS})',
+        placeholder='One role ID per line, in the order they should appear. Leave empty to remove the menu.',
+        style=discord.TextStyle.paragraph,
+        required=False,
+        max_length=24 * MAX_SELECT_OPTIONS
+    )
+
+    @traced
+    async def on_submit(self, interaction: discord.Interaction):
+        # pull out each run of numbers, so mentions and any separator work; ignore repeats
+        str_role_ids = re.findall(r'[0-9]+', self.role_ids.value)
+        role_ids = list(dict.fromkeys(int(str_role_id) for str_role_id in str_role_ids))
+
+        if not role_ids:
+            log.debug("🔴 Received no role IDs, removing menu")
+            await _remove_button(interaction, self.buttons, self.button_data)
+            return await interaction.response.defer()
+
+        if len(role_ids) > MAX_SELECT_OPTIONS:
+            try:
+                raise CustomError(f"A menu can offer at most {MAX_SELECT_OPTIONS} roles, but you entered {len(role_ids)}.")
+            except Exception as e:
+                await on_generic_error(spamchannel, interaction, e)
+            return
+
+        # check each int corresponds to a role on this server
+        roles = []
+        for role_id in role_ids:
+            role: discord.Role = await check_role_exists(interaction, role_id)
+            if role == None: return # stop here if there's no valid role
+            roles.append(role)
+
+        # check if we have permission to manage these roles
+        for role in roles:
+            permission = await button_role_checks(interaction, role, self.button_data)
+            if not permission: return
+
+        self.button_data.set_roles(roles)
+        self.button_data.button_label = self.placeholder.value or None
+        log.debug('Stored menu role ID(s): %s', self.button_data.role_ids)
+
+        # add or replace the menu in the preview
+        await _update_preview(interaction, self.buttons, self.button_data)
+        await interaction.response.defer()
+
 # modal to input button label/emoji
 class EnterLabelEmojiModal(Modal):
     def __init__(self, buttons, button_data: RoleButtonData, title = 'Set Label & Emoji', timeout = None):
@@ -1271,12 +1685,12 @@ class EnterLabelEmojiModal(Modal):
         self.button_data = button_data
         self.index = 4
         if self.button_data.button_label:
-            print(f'Default set to {self.button_data.button_label}')
+            log.debug('Default set to %s', self.button_data.button_label)
             self.button_label.default = str(self.button_data.button_label)
         else:
             self.button_label.default = None
         if self.button_data.button_emoji:
-            print(f'Default set to {self.button_data.button_emoji}')
+            log.debug('Default set to %s', self.button_data.button_emoji)
             self.button_emoji.default = str(self.button_data.button_emoji)
         else:
             self.button_emoji.default = None
@@ -1298,6 +1712,7 @@ class EnterLabelEmojiModal(Modal):
         max_length=60
     )
 
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
         if self.button_label.value == "" and self.button_emoji.value == "":
             try:
@@ -1307,28 +1722,28 @@ class EnterLabelEmojiModal(Modal):
             return
         
         if self.button_label.value == "":
-            print("🔴 Received empty string for Label")
+            log.debug("🔴 Received empty string for Label")
             self.button_data.button_label = None
         else: 
             self.button_data.button_label = self.button_label
 
-        print(f'Button label set: {self.button_data.button_label}')
+        log.debug('Button label set: %s', self.button_data.button_label)
 
         if self.button_emoji.value == "":
-            print("🔴 Received empty string for Emoji")
+            log.debug("🔴 Received empty string for Emoji")
             self.button_data.button_emoji = None
         else:
             # check if user has entered Discord emoji
             if ':' in self.button_emoji.value and not '<' in self.button_emoji.value:
-                print(f"⏳ User seems to have entered Discord emoji as {self.button_emoji.value}, attempting to resolve against library...")
+                log.debug('⏳ User seems to have entered Discord emoji as %s, attempting to resolve against library...', self.button_emoji.value)
                 unicode_emoji = emoji.emojize(self.button_emoji.value)
-                print(f"Updated emoji: {unicode_emoji}")
+                log.debug('Updated emoji: %s', unicode_emoji)
                 self.button_data.button_emoji = str(unicode_emoji)
             else:
                 self.button_data.button_emoji = str(self.button_emoji.value)
 
             if ':' in self.button_data.button_emoji and not '<' in self.button_data.button_emoji: # triggered if we failed to convert a : to an emoji and its not custom
-                print("Found Discord non-custom code in emoji value")
+                log.debug("Found Discord non-custom code in emoji value")
                 try:
                     error = f'**Could not resolve the emoji you entered against its unicode name**.\n' \
                             'Not all Discord emojis have the same shortcode as the unicode name, for example `:heart:` in Discord is `:red_heart:` in unicode.\n' \
@@ -1339,7 +1754,7 @@ class EnterLabelEmojiModal(Modal):
                 return
             
             elif emoji.emoji_count(self.button_data.button_emoji) > 1: # should trigger if we have a ZWJ emoji or too many emojis
-                print("number of emojis in input is not 1")
+                log.debug("number of emojis in input is not 1")
                 try:
                     error = f'The emoji you entered does not seem to be valid: {self.button_data.button_emoji}\n' \
                              'It may be a non-standard or unicode-unsupported emoji. ' \
@@ -1349,10 +1764,10 @@ class EnterLabelEmojiModal(Modal):
                     await on_generic_error(spamchannel, interaction, e)
                 return
 
-        print(f'Button emoji set: {self.button_data.button_emoji}')
+        log.debug('Button emoji set: %s', self.button_data.button_emoji)
 
         if self.button_data.button_emoji:
-            print("✅ Bot thinks we have an emoji")
+            log.debug("✅ Bot thinks we have an emoji")
 
         # update preview
         await _update_preview(interaction, self.buttons, self.button_data)
@@ -1364,5 +1779,5 @@ class EnterLabelEmojiModal(Modal):
         try:
             await interaction.delete_original_response()
         except Exception as e:
-            print(e)
+            log.error('%s', e)
 
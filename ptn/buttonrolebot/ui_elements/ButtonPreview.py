@@ -3,6 +3,7 @@ A view for previewing buttons before adding them.
 
 """
 # import libraries
+import logging
 from typing import Optional
 import emoji
 
@@ -30,6 +31,8 @@ from ptn.buttonrolebot.modules.ErrorHandler import GenericError, on_generic_erro
 from ptn.buttonrolebot.modules.Embeds import button_config_embed, stress_embed, amazing_embed
 from ptn.buttonrolebot.modules.Helpers import check_role_exists, _add_role_button_to_view
 
+log = logging.getLogger(__name__)
+
 """
 1. Generate an embed, heading_embed, declaring the below embed to be our preview.
    (Done in ButtonRoleCommands.py)
@@ -79,7 +82,7 @@ class ButtonPreviewView(View):
             # send message with view and embed
             await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
         except Exception as e:
-            print(e)
+            log.error('%s', e)
             try:
                 raise GenericError(e)
             except Exception as e:
@@ -2,6 +2,9 @@
 A discord.ui element for removing buttons added by BRB.
 
 """
+# import libraries
+import logging
+
 # import discord
 import discord
 from discord.interactions import Interaction
@@ -20,6 +23,8 @@ from ptn.buttonrolebot.constants import channel_botspam
 # import local modules
 from ptn.buttonrolebot.modules.ErrorHandler import GenericError, on_generic_error, CustomError
 
+log = logging.getLogger(__name__)
+
 
 class ConfirmRemoveButtonsView(View):
     def __init__(self, message: discord.Message):
@@ -32,7 +37,7 @@ class ConfirmRemoveButtonsView(View):
         style=discord.ButtonStyle.secondary,
     )
     async def cancel_remove_button(self, interaction: discord.Interaction, button):
-        print(f"User cancelled button removal from {self.message}")
+        log.debug('User cancelled button removal from %s', self.message)
         embed = discord.Embed(
             description='❎ **Cancelled**.',
             color=constants.EMBED_COLOUR_OK
@@ -48,12 +53,12 @@ class ConfirmRemoveButtonsView(View):
     )
 
     async def confirm_remove_button(self, interaction: discord.Interaction, button):
-        print(f"User confirmed button removal from {self.message}")
+        log.debug('User confirmed button removal from %s', self.message)
         try:
-            print("Removing the view")
+            log.debug("Removing the view")
             await self.message.edit(view=None)
 
-            print("Notifying bot-spam")
+            log.debug("Notifying bot-spam")
             spamchannel = bot.get_channel(channel_botspam())
       
             embed = discord.Embed(
@@ -63,7 +68,7 @@ class ConfirmRemoveButtonsView(View):
 
             await spamchannel.send(embed=embed)
 
-            print("Notifying user")
+            log.debug("Notifying user")
             embed = discord.Embed(
                 description=f'✅ **Buttons removed from {self.message.jump_url}**.',
                 color=constants.EMBED_COLOUR_OK
@@ -1,11 +1,12 @@
 """
 Define classes for Embed Creator
 
-Depends on: constants, Embeds, ErrorHandler, Helpers
+Depends on: constants, Embeds, ErrorHandler, Helpers, Tracing
 
 """
 # import libraries
 import json
+import logging
 import re
 import traceback
 
@@ -28,11 +29,15 @@ from ptn.buttonrolebot.classes.FieldData import FieldData
 from ptn.buttonrolebot.modules.Embeds import  _generate_embed_from_dict, _color_hex_to_int
 from ptn.buttonrolebot.modules.ErrorHandler import GenericError, on_generic_error, CustomError
 from ptn.buttonrolebot.modules.Helpers import is_valid_extension, _get_embed_from_message, _format_embed_dict
+from ptn.buttonrolebot.modules.Tracing import traced, bind_session
+
+log = logging.getLogger(__name__)
 
 
 # function shared by Edit Bot Embed and /edit_embed to edit an embed sent by the bot
+@traced
 async def _edit_bot_embed(interaction: discord.Interaction, message: discord.Message):
-    print("Called _edit_bot_embed")
+    log.debug("Called _edit_bot_embed")
     spamchannel = bot.get_channel(channel_botspam())
     try:
         instruction_embed = discord.Embed(
@@ -52,7 +57,7 @@ async def _edit_bot_embed(interaction: discord.Interaction, message: discord.Mes
         await interaction.response.send_message(embeds=embeds, view=view, ephemeral=True)
 
     except Exception as e:
-        print(e)
+        log.error('%s', e)
         traceback.print_exc()
         try:
             raise GenericError(e)
@@ -103,6 +108,7 @@ class EmbedGenButtons(View):
         self.spamchannel: discord.TextChannel = bot.get_channel(channel_botspam())
         self.instruction_embed: discord.Embed = instruction_embed # our original embed
         self.embed_data: EmbedData = embed_data # an instance of EmbedData to send to our embed creators
+        bind_session(self.embed_data) # so the editor's interactions are traced together with the command that opened it
         super().__init__(timeout=None)
         self.set_embed_author_button.style=discord.ButtonStyle.success if self.embed_data.embed_author_name else discord.ButtonStyle.secondary
         self.set_embed_avatar_button.style=discord.ButtonStyle.success if self.embed_data.embed_author_avatar_url else discord.ButtonStyle.secondary
@@ -116,8 +122,9 @@ class EmbedGenButtons(View):
 
 
     @discord.ui.button(label="Title", style=discord.ButtonStyle.secondary, emoji="🏷", custom_id="embed_gen_title_button", row=0)
+    @traced
     async def set_embed_title_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_title_button click")
+        log.debug("Received set_embed_title_button click")
 
         # set our modal field info
         field_info = {
@@ -131,16 +138,17 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
 
     @discord.ui.button(label="Main Text", style=discord.ButtonStyle.primary, emoji="📄", custom_id="embed_gen_desc_button", row=0)
+    @traced
     async def set_embed_desc_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_desc_button click")
+        log.debug("Received set_embed_desc_button click")
 
         # set our modal field info
         field_info = {
@@ -156,16 +164,17 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
 
     @discord.ui.button(label="Main Image", style=discord.ButtonStyle.secondary, emoji="🖼", custom_id="embed_gen_img_button", row=0)
+    @traced
     async def set_embed_img_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_img_button click")
+        log.debug("Received set_embed_img_button click")
 
         # set our modal field info
         field_info = {
@@ -178,15 +187,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="Footer", style=discord.ButtonStyle.secondary, emoji="🦶", custom_id="embed_gen_footer_button", row=0)
+    @traced
     async def set_embed_footer_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_footer_button click")
+        log.debug("Received set_embed_footer_button click")
 
         # set our modal field info
         field_info = {
@@ -200,31 +210,32 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
 
     @discord.ui.button(label="Color", style=discord.ButtonStyle.secondary, emoji="🎨", custom_id="embed_gen_color_button", row=1)
+    @traced
     async def set_embed_color_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_color_button click")
+        log.debug("Received set_embed_color_button click")
 
         try:
             if callable(getattr(self.embed_data.embed_color, 'to_rgb', None)):
                 # we got a Discord color object
-                print(f"⏳ Discord color object {self.embed_data.embed_color} returned, converting to int...")
+                log.debug('⏳ Discord color object %s returned, converting to int...', self.embed_data.embed_color)
                 red, green, blue = self.embed_data.embed_color.to_rgb()
-                print(f'🎨 RGB values: {red} {green} {blue}')
+                log.debug('🎨 RGB values: %s %s %s', red, green, blue)
                 hex_color = "0x{:02x}{:02x}{:02x}".format(red, green, blue)
-                print(f'▶ Hex code: {hex_color}')
+                log.debug('▶ Hex code: %s', hex_color)
             else:
-                print("⏳ Converting existing color to hex in format 0x000000...")
+                log.debug("⏳ Converting existing color to hex in format 0x000000...")
                 hex_color = '0x{:06X}'.format(self.embed_data.embed_color)
-                print(f'▶ Hex color: {hex_color}') 
+                log.debug('▶ Hex color: %s', hex_color) 
         except Exception as e:
-            print(e)
+            log.error('%s', e)
 
         # set our modal field info
         field_info = {
@@ -239,15 +250,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="Thumbnail", style=discord.ButtonStyle.secondary, emoji="🖼", custom_id="embed_gen_thumb_button", row=1)
+    @traced
     async def set_embed_thumb_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_thumb_button click")
+        log.debug("Received set_embed_thumb_button click")
 
         # set our modal field info
         field_info = {
@@ -260,15 +272,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="Author", style=discord.ButtonStyle.secondary, emoji="🧑", custom_id="embed_gen_author_button", row=1)
+    @traced
     async def set_embed_author_button(self, interaction: discord.Interaction, button):
-        print("Received set_embedset_embed_author_button_avatar_button click")
+        log.debug("Received set_embedset_embed_author_button_avatar_button click")
 
         # set our modal field info
         field_info = {
@@ -283,15 +296,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="Avatar", style=discord.ButtonStyle.secondary, emoji="🖼", custom_id="embed_gen_avatar_button", row=1)
+    @traced
     async def set_embed_avatar_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_avatar_button click")
+        log.debug("Received set_embed_avatar_button click")
 
         # set our modal field info
         field_info = {
@@ -304,15 +318,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="📤 JSON Export", style=discord.ButtonStyle.success, custom_id="embed_gen_json_export_button", row=2)
+    @traced
     async def set_embed_json_export_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_json_export_button click")
+        log.debug("Received set_embed_json_export_button click")
 
         # set our modal field info
         field_info = {
@@ -326,15 +341,16 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
     @discord.ui.button(label="📥 JSON Import", style=discord.ButtonStyle.danger, custom_id="embed_gen_json_import_button", row=2)
+    @traced
     async def set_embed_json_import_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_json_import_button click")
+        log.debug("Received set_embed_json_import_button click")
 
         # set our modal field info
         field_info = {
@@ -348,16 +364,17 @@ class EmbedGenButtons(View):
 
         # instantiate it into FieldData to send to the modal
         field_data = FieldData(field_info)
-        print(f'Sending modal field data: {field_data}')
+        log.debug('Sending modal field data: %s', field_data)
 
-        print(f'Sending modal embed data: {self.embed_data}')
+        log.debug('Sending modal embed data: %s', self.embed_data)
 
         await interaction.response.send_modal(EmbedContentModal(self.instruction_embed, field_data, self.embed_data, button, view=self))
 
 
     @discord.ui.button(label="✗ Cancel", style=discord.ButtonStyle.danger, custom_id="embed_gen_cancel_button", row=3)
+    @traced
     async def set_embed_cancel_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_cancel_button click")
+        log.debug("Received set_embed_cancel_button click")
         embed = discord.Embed(
             description="❎ **Embed generation cancelled**.",
             color=constants.EMBED_COLOUR_QU
@@ -366,8 +383,9 @@ class EmbedGenButtons(View):
         await interaction.response.edit_message(embed=embed, view=None)
 
     @discord.ui.button(label="✔ Send Embed", style=discord.ButtonStyle.success, custom_id="embed_gen_send_button", row=3)
+    @traced
     async def set_embed_send_button(self, interaction: discord.Interaction, button):
-        print("Received set_embed_send_button click")
+        log.debug("Received set_embed_send_button click")
 
         if not self.embed_data.embed_title and not self.embed_data.embed_description:
             error = 'Your embed must have at least a title or main text to be valid.'
@@ -377,12 +395,12 @@ class EmbedGenButtons(View):
                 await on_generic_error(self.spamchannel, interaction, e)       
 
         try:
-            print("Calling function to generate Embed...")
+            log.debug("Calling function to generate Embed...")
             send_embed = await _generate_embed_from_dict(self.embed_data, from_json = True)
 
 
             if self.action == 'edit':
-                print("Updating edited Embed...")
+                log.debug("Updating edited Embed...")
                 await self.message.edit(embed=send_embed)
 
                 embed = discord.Embed(
@@ -392,9 +410,9 @@ class EmbedGenButtons(View):
                 embed.set_footer(text="You can dismiss this message.")
 
             else:
-                print("Sending completed Embed...")
+                log.debug("Sending completed Embed...")
                 message = await interaction.channel.send(embed=send_embed)
-                print(f"Embed sent to {interaction.channel} by {interaction.user}")
+                log.debug('Embed sent to %s by %s', interaction.channel, interaction.user)
                 
                 embed = discord.Embed(
                     description=f"✅ **Embed sent**. Message ID of containing message:\n"
@@ -403,10 +421,10 @@ class EmbedGenButtons(View):
                 )
                 embed.set_footer(text="You can dismiss this message.")
 
-            print("Updating interaction response...")
+            log.debug("Updating interaction response...")
             await interaction.response.edit_message(embed=embed, view=None)
 
-            print("Notifying bot-spam...")
+            log.debug("Notifying bot-spam...")
             embed = discord.Embed(
                 description=f"📄 <@{interaction.user.id}> sent or edited the bot Embed at {interaction.message.jump_url}",
                 color=constants.EMBED_COLOUR_OK
@@ -414,7 +432,7 @@ class EmbedGenButtons(View):
             await self.spamchannel.send(embed=embed)
 
         except Exception as e:
-            print(e)
+            log.error('%s', e)
             try:
                 raise GenericError(e)
             except Exception as e:
@@ -425,7 +443,7 @@ class EmbedGenButtons(View):
 class EmbedContentModal(Modal):
     def __init__(self, instruction_embed, field_data: FieldData, embed_data, button, view, timeout = None) -> None:
         super().__init__(title=field_data.title, timeout=timeout)
-        print('▶ Defining variables')
+        log.debug('▶ Defining variables')
         self.spamchannel: discord.TextChannel = bot.get_channel(channel_botspam())
         self.instruction_embed: discord.Embed = instruction_embed
         self.embed_data: EmbedData = embed_data
@@ -433,32 +451,33 @@ class EmbedContentModal(Modal):
         self.field_data: FieldData = field_data
         self.button: discord.ui.Button = button
         # define our field data
-        print('▶ Defining field data')
+        log.debug('▶ Defining field data')
         self.embed_field.label = self.field_data.label
         self.embed_field.placeholder = self.field_data.placeholder
         self.embed_field.style = self.field_data.style
         self.embed_field.required = self.field_data.required
         self.embed_field.max_length = self.field_data.max_length
         self.embed_field.default = self.field_data.default
-        print('☑ Finished definitions.')
+        log.debug('☑ Finished definitions.')
 
     embed_field = discord.ui.TextInput(
         label="Label"
     )
 
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
-        print(f'Received EmbedContentModal submit for {self.field_data.attr}')
+        log.debug('Received EmbedContentModal submit for %s', self.field_data.attr)
 
         if self.field_data.attr == 'embed_json_export':
             # this is read-only, we don't need to do anything
-            print("Export JSON complete.")
+            log.debug("Export JSON complete.")
             await interaction.response.defer()
             return
 
         elif self.field_data.attr == 'embed_json':
             # check for empty input
             if self.embed_field.value == "":
-                print("User left this field blank, doing nothing.")
+                log.debug("User left this field blank, doing nothing.")
                 try:
                     # notify user
                     raise CustomError(f"Please input a valid JSON to import.")
@@ -473,7 +492,7 @@ class EmbedContentModal(Modal):
                     self.embed_data.embed_json = self.embed_field.value
 
                     # update our preview embed
-                    print('Updating preview embed')
+                    log.debug('Updating preview embed')
                     preview_embed = await _generate_embed_from_dict(self.embed_data, from_json = True)
 
                     # repopulate embed_data from new embed
@@ -491,7 +510,7 @@ class EmbedContentModal(Modal):
                     for key, value in embed_fields.items():
                         setattr(self.embed_data, key, value)
 
-                    print(f'▶ Updated embed_data: {self.embed_data}')
+                    log.debug('▶ Updated embed_data: %s', self.embed_data)
 
                 except json.JSONDecodeError as e:
                     try:
@@ -513,19 +532,19 @@ class EmbedContentModal(Modal):
 
 
         elif self.field_data.attr == 'embed_color':
-            print('Received COLOR input')
+            log.debug('Received COLOR input')
         # turn color input into an INT and store it
             if self.embed_field.value:
-                print(f"User entered color as {self.embed_field.value}, we'll check it's valid and convert it to int")
+                log.debug("User entered color as %s, we'll check it's valid and convert it to int", self.embed_field.value)
                 if re.match(constants.HEX_COLOR_PATTERN, self.embed_field.value):
-                    print('Received valid hex match')
+                    log.debug('Received valid hex match')
                     try:
                         color_int = await _color_hex_to_int(self.embed_field.value)
                         self.embed_data.embed_color = color_int
-                        print(self.embed_data.embed_color)
+                        log.debug('%s', self.embed_data.embed_color)
 
                     except ValueError as e:
-                        print(e)
+                        log.error('%s', e)
                         try:
                             raise GenericError(e)
                         except Exception as e:
@@ -540,30 +559,30 @@ class EmbedContentModal(Modal):
                         await on_generic_error(self.spamchannel, interaction, e)
                     return
             else:
-                print("No user color entry, re-assigning default.")
+                log.debug("No user color entry, re-assigning default.")
                 self.embed_data.embed_color = constants.EMBED_COLOUR_PTN_DEFAULT
-                print(self.embed_data.embed_color)
+                log.debug('%s', self.embed_data.embed_color)
 
         else: # i.e. if anything else is being set
             if self.embed_field.value == "":
-                print("User left this field blank.")
+                log.debug("User left this field blank.")
                 self.embed_data.set_attribute(self.field_data.attr, None)
             else:
-                print('Checking if URL type')
+                log.debug('Checking if URL type')
                 string_to_check = str(self.field_data.attr)
                 if "url" in string_to_check:
-                    print('Validating URLs')
+                    log.debug('Validating URLs')
                     # validate image URLs
                     if not is_valid_extension(self.embed_field.value) and self.embed_field.value is not None:
                         error = f"Image not valid: {self.embed_field.value}"
-                        print(error)
+                        log.warning('%s', error)
                         try:
                             raise CustomError(error)
                         except Exception as e:
                             await on_generic_error(self.spamchannel, interaction, e)
                         return
 
-            print('Updating embed_data')
+            log.debug('Updating embed_data')
             # define our embed_data attribute to the user-inputted value
             if self.embed_field.value:
                 self.embed_data.set_attribute(self.field_data.attr, self.embed_field.value)
@@ -573,10 +592,10 @@ class EmbedContentModal(Modal):
 
         if 'json' not in self.field_data.attr:
             # update the embed the old-fashioned way
-            print(f'▶ Updated embed_data: {self.embed_data}')
+            log.debug('▶ Updated embed_data: %s', self.embed_data)
 
             # update our preview embed
-            print('Updating preview embed')
+            log.debug('Updating preview embed')
             preview_embed = await _generate_embed_from_dict(self.embed_data)
 
             # tidy up our json field so it's in the right order
@@ -585,14 +604,14 @@ class EmbedContentModal(Modal):
         embeds = [self.instruction_embed, preview_embed]
 
         # update button style
-        print("Updating button style...")
+        log.debug("Updating button style...")
         if self.embed_field.value:
             self.button.style = discord.ButtonStyle.success
         else:
             self.button.style = discord.ButtonStyle.secondary
 
         # update the view in case we added the send button
-        print("Sending updated embeds")
+        log.debug("Sending updated embeds")
         await interaction.response.edit_message(embeds=embeds, view=self.view)
 
     async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
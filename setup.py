@@ -42,6 +42,7 @@ setup(
         'discord.py==2.5.2',
         'discord-ext-prometheus>=0.2.0',
         'emoji>=2.8.0',
+        'prometheus-client>=0.16.0',
         'python-dotenv==0.15.0',
         'python-dateutil>=2.8.1',
         'validators>=0.22.0'